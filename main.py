@@ -1,9 +1,9 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Header, Depends, WebSocket, WebSocketDisconnect, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, RedirectResponse, FileResponse
+from fastapi.responses import StreamingResponse, RedirectResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 import uvicorn
 import os
 import json
@@ -12,16 +12,26 @@ import base64
 import time
 import math
 import asyncio
+from functools import partial
 from dotenv import load_dotenv
 
 # Import Services
 from services.vision import analyze_face_image
 from services.audio import text_to_speech_stream
 from services.llm import GeminiClient
-from services.video_processor import process_frame, crop_detections
+from services.video_processor import Frame, process_frame, crop_detections, get_inference_scheduler
 from services.spatial_memory import SpatialMemory
 from services.frame_annotator import annotate_frame
 from services.socket_manager import ConnectionManager
+from services.frame_pipeline import FramePipeline, ProbeMailbox, AdaptiveStride
+from services.frame_protocol import decode_frame_message, FrameProtocolError
+from services.frame_store import get_frame_store
+from services.tracking import get_tracker_registry
+from services.pose import pose_from_orientation, parse_pose_matrix
+from services.event_bus import create_event_bus
+from services.scan_store import create_scan_store
+from services.position_index import position_xyz
+from services.answer_cache import get_answer_cache
 
 load_dotenv()
 
@@ -43,9 +53,18 @@ app.add_middleware(
 )
 
 # Initialize Managers
+# Dashboard broadcasts and scan state go through pluggable backends so several
+# workers can share them (SPATIAL_EVENT_BUS / SPATIAL_SCAN_STORE = sqlite).
+# Spatial memory (vector store, its indexes and the answer cache) is per process
+# and is not opened when running more than one worker (see services/vector_store.py).
 spatial_memory = SpatialMemory()
-socket_manager = ConnectionManager()
-spatial_scans: Dict[str, dict] = {}
+answer_cache = get_answer_cache()
+event_bus = create_event_bus()
+socket_manager = ConnectionManager(bus=event_bus)
+scan_store = create_scan_store()
+frame_store = get_frame_store()
+# scan_id -> object key -> Gemini label shown on dashboards (per worker; display only)
+gemini_label_caches: Dict[str, dict] = {}
 
 def _int_env(name: str, default: int, minimum: int = 1) -> int:
     raw = os.getenv(name)
@@ -61,23 +80,11 @@ GEMINI_FRAME_STRIDE = _int_env("SPATIAL_GEMINI_FRAME_STRIDE", 3)
 MAX_GEMINI_CROPS = _int_env("SPATIAL_MAX_GEMINI_CROPS", 3, minimum=1)
 FALLBACK_KEY_BUCKET_PX = _int_env("SPATIAL_FALLBACK_KEY_BUCKET_PX", 96, minimum=16)
 GEMINI_LABEL_TTL_SEC = float(os.getenv("SPATIAL_GEMINI_LABEL_TTL_SEC", "20"))
-
-
-def _ensure_scan(scan_id: str, source: Optional[str] = None) -> dict:
-    if scan_id not in spatial_scans:
-        spatial_scans[scan_id] = {
-            "scan_id": scan_id,
-            "status": "scanning",
-            "source": source,
-            "frames": 0,
-            "object_count": 0,
-            "objects": [],
-            "detections": [],
-            "gemini_label_cache": {},
-            "last_frame_path": None,
-            "updated_at": None,
-        }
-    return spatial_scans[scan_id]
+# Adaptive load shedding: strides float between the base values above and
+# SPATIAL_MAX_FRAME_STRIDE to keep end-to-end latency under the target budget.
+TARGET_LATENCY_MS = float(os.getenv("SPATIAL_TARGET_LATENCY_MS", "800"))
+MAX_FRAME_STRIDE = _int_env("SPATIAL_MAX_FRAME_STRIDE", 8)
+PROBE_MAX_IN_FLIGHT = _int_env("SPATIAL_PROBE_MAX_IN_FLIGHT", 2)
 
 
 def _object_key_from_detection(det: dict) -> str:
@@ -97,61 +104,9 @@ def _object_key_from_detection(det: dict) -> str:
     return f"{label}_cell_{cell_x}_{cell_y}_{z_bucket}"
 
 
-def _rotation_matrix_from_orientation(alpha: float, beta: float, gamma: float):
-    """
-    Convert device orientation angles (degrees) to a 3x3 rotation matrix.
-    Approximation: R = Rz(alpha) * Rx(beta) * Ry(gamma).
-    """
-    a = math.radians(alpha)
-    b = math.radians(beta)
-    g = math.radians(gamma)
-
-    ca, sa = math.cos(a), math.sin(a)
-    cb, sb = math.cos(b), math.sin(b)
-    cg, sg = math.cos(g), math.sin(g)
-
-    rz = [
-        [ca, -sa, 0.0],
-        [sa, ca, 0.0],
-        [0.0, 0.0, 1.0],
-    ]
-    rx = [
-        [1.0, 0.0, 0.0],
-        [0.0, cb, -sb],
-        [0.0, sb, cb],
-    ]
-    ry = [
-        [cg, 0.0, sg],
-        [0.0, 1.0, 0.0],
-        [-sg, 0.0, cg],
-    ]
-
-    def matmul(a3, b3):
-        return [
-            [
-                a3[i][0] * b3[0][j] + a3[i][1] * b3[1][j] + a3[i][2] * b3[2][j]
-                for j in range(3)
-            ]
-            for i in range(3)
-        ]
-
-    return matmul(matmul(rz, rx), ry)
-
-
-def _pose_matrix_str_from_orientation(alpha: float, beta: float, gamma: float) -> str:
-    rot = _rotation_matrix_from_orientation(alpha, beta, gamma)
-    pose = [
-        [rot[0][0], rot[0][1], rot[0][2], 0.0],
-        [rot[1][0], rot[1][1], rot[1][2], 0.0],
-        [rot[2][0], rot[2][1], rot[2][2], 0.0],
-        [0.0, 0.0, 0.0, 1.0],
-    ]
-    return ",".join(str(pose[r][c]) for r in range(4) for c in range(4))
-
-
-def _record_detections(scan_record: dict, detections: list, timestamp: float):
-    for det in detections:
-        scan_record["detections"].append({
+def _detection_records(detections: list, timestamp: float) -> list:
+    return [
+        {
             "label": det.get("label", ""),
             "yolo_label": det.get("yolo_label", det.get("label", "")),
             "gemini_name": det.get("gemini_name", ""),
@@ -159,7 +114,9 @@ def _record_detections(scan_record: dict, detections: list, timestamp: float):
             "position_3d": det.get("position_3d", {}),
             "timestamp": timestamp,
             "frame_path": det.get("frame_path", ""),
-        })
+        }
+        for det in detections
+    ]
 
 
 def _euclidean_distance(a: dict, b: dict) -> float:
@@ -199,6 +156,314 @@ def get_gemini_client(x_api_key: Optional[str] = Header(None)):
         raise HTTPException(status_code=401, detail="Missing X-API-Key header or GEMINI_API_KEY env var")
     return GeminiClient(api_key)
 
+# ============================================================
+# Probe Frame Pipeline
+# ============================================================
+# The probe socket only receives and enqueues; each frame then flows through
+# decode → detect → enrich → index → broadcast on stage-specific executors.
+
+def _decode_stage(job: dict) -> dict:
+    """Base64 → JPEG bytes → decoded Frame, orientation → pose matrix (io pool)."""
+    # Binary protocol frames arrive with the JPEG payload already attached.
+    if job.get("image_bytes") is None:
+        image_b64 = job.pop("image_b64", "")
+        # Strip data URL prefix if present (e.g. "data:image/jpeg;base64,")
+        if "," in image_b64:
+            image_b64 = image_b64.split(",", 1)[1]
+        try:
+            job["image_bytes"] = base64.b64decode(image_b64)
+        except Exception:
+            raise ValueError("Invalid base64 image")
+
+    # Decode once here (off the inference thread); detect/crop reuse the array.
+    job["frame"] = Frame(job.pop("image_bytes"))
+    if job["run_yolo"] and job["frame"].array is None:
+        raise ValueError("Invalid JPEG image")
+
+    # Web sends {alpha, beta, gamma}; we construct a simplified (cached) pose
+    job["pose"] = pose_from_orientation(job["alpha"], job["beta"], job["gamma"])
+    return job
+
+
+def _detect_stage(job: dict) -> dict:
+    """YOLO detection + 3D coordinate estimation (dedicated inference thread)."""
+    started = time.perf_counter()
+    detections, frame_path = process_frame(
+        job["frame"],
+        job["estimated_depth"],
+        job["pose"],
+        job["scan_id"],
+        # Skipped frames are still saved, without detection, to reduce 8m load spikes.
+        run_detection=job["run_yolo"],
+        return_frame_path=True,
+        # Frames that may become Gemini observations must stay on disk.
+        keep_frame=bool(job["run_gemini"] and job.get("gemini")),
+        stream_id=f"{job['client_id']}:{job['scan_id']}",
+        # Detect workers race each other; the tracker associates in receive order.
+        frame_order=job["received_at"],
+        # Stay columnar until the index stage converts to dicts once.
+        columnar=True,
+    )
+    job["detections"] = detections
+    job["frame_path"] = frame_path
+    if job["run_yolo"]:
+        job["detect_ms"] = (time.perf_counter() - started) * 1000.0
+    return job
+
+
+async def _enrich_stage(job: dict) -> dict:
+    """Gemini semantic description (per-object via crops)."""
+    gemini = job.get("gemini")
+    detections = job["detections"]  # columnar Detections
+    gemini_objects = []
+    job["gemini_objects"] = gemini_objects
+    run_gemini = gemini and job["run_gemini"]
+    if not (run_gemini and len(detections)):
+        return job
+
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        crops = await loop.run_in_executor(
+            frame_pipeline.io_executor, crop_detections, job["frame"], detections
+        )
+        pairs = [(c, i) for i, c in enumerate(crops) if c is not None]
+        pairs = pairs[:MAX_GEMINI_CROPS]
+
+        async def _describe(crop, i):
+            desc = await asyncio.to_thread(gemini.describe_crop, crop, detections.labels[i])
+            return desc, i
+
+        results = await asyncio.gather(*[_describe(c, i) for c, i in pairs])
+        bboxes = detections.bboxes()
+        for desc, i in results:
+            label = detections.labels[i]
+            x, y, z = detections.position[i].tolist()
+            gemini_obj = {
+                "name": desc.get("name", label),
+                "position": {"x": x, "y": y, "z": z},
+                "details": desc.get("details", ""),
+                "bbox": bboxes[i],
+                "track_id": int(detections.track_id[i]),
+                "yolo_label": label,
+                "confidence": float(detections.confidence[i]),
+            }
+            gemini_objects.append(gemini_obj)
+            # Enrich the detection with Gemini description
+            detections.gemini_name[i] = gemini_obj["name"]
+            detections.gemini_details[i] = gemini_obj["details"]
+    except Exception as e:
+        print(f"Gemini crop error: {e}")
+    job["enrich_ms"] = (time.perf_counter() - started) * 1000.0
+    return job
+
+
+async def _index_stage(job: dict) -> dict:
+    """Scan bookkeeping (io pool) + hand-off to the spatial memory ingest buffer."""
+    scan_id = job["scan_id"]
+    client_id = job["client_id"]
+    timestamp = job["timestamp"]
+    # Columnar → dicts exactly once; scan records and broadcasts share them.
+    detections = job["detections"] = job["detections"].to_dicts()
+    frame_path = job["frame_path"]
+    gemini_objects = job["gemini_objects"]
+
+    last_frame_path = frame_path or (detections[0].get("frame_path") if detections else None)
+    detection_records = _detection_records(detections, timestamp)
+
+    observations = []
+    object_records = []
+    for obj in gemini_objects:
+        meta = {
+            "scan_id": scan_id,
+            "frame_path": frame_path or (detections[0]["frame_path"] if detections else ""),
+            "timestamp": timestamp,
+            "bbox": obj.get("bbox"),
+            "track_id": obj.get("track_id", -1),
+            "yolo_label": obj.get("yolo_label", ""),
+            "confidence": obj.get("confidence", 0),
+            "position_3d": obj.get("position"),
+            "source": client_id,
+            # Sightings of the same tracked object merge into one memory entity.
+            "object_key": _object_key_from_detection({
+                "label": obj.get("yolo_label", ""),
+                "track_id": obj.get("track_id", -1),
+                "bbox": obj.get("bbox") or [0, 0, 0, 0],
+                "position_3d": obj.get("position") or {},
+            }),
+        }
+        observations.append((f"{obj.get('name','')} {obj.get('details','')}", meta))
+        object_records.append({
+            "name": obj.get("name", ""),
+            "position": obj.get("position", {}),
+            "details": obj.get("details", ""),
+            "timestamp": timestamp,
+            "frame_path": meta["frame_path"],
+        })
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        frame_pipeline.io_executor,
+        partial(scan_store.record_frame, scan_id, client_id, timestamp,
+                frame_path=last_frame_path, detections=detection_records, objects=object_records),
+    )
+    # Batched with other frames' and probes' observations by the ingest buffer.
+    spatial_memory.enqueue_observations(observations)
+    return job
+
+
+async def _broadcast_stage(job: dict):
+    """Broadcast results to all dashboards and acknowledge to the probe."""
+    scan_id = job["scan_id"]
+    client_id = job["client_id"]
+    timestamp = job["timestamp"]
+    frame_count = job["frame_count"]
+    detections = job["detections"]
+
+    broadcast_objects = []
+    state_vector = {} # Map<ID, Vector>
+    gemini_label_cache = gemini_label_caches.setdefault(scan_id, {})
+
+    for d in detections:
+        tid = d.get("track_id", -1)
+        label = d["label"]
+        obj_key = _object_key_from_detection(d)
+
+        # Preserve the latest Gemini naming for this tracked object so
+        # non-Gemini frames do not revert UI labels back to raw YOLO words.
+        if d.get("gemini_name"):
+            gemini_label_cache[obj_key] = {
+                "name": d.get("gemini_name", label),
+                "details": d.get("gemini_details", ""),
+                "updated_at": float(timestamp),
+            }
+
+        cached = gemini_label_cache.get(obj_key)
+        if cached and (float(timestamp) - float(cached.get("updated_at", 0.0)) <= GEMINI_LABEL_TTL_SEC):
+            display_label = cached.get("name", label)
+            display_details = cached.get("details", d.get("gemini_details", ""))
+        else:
+            display_label = d.get("gemini_name", label)
+            display_details = d.get("gemini_details", "")
+            if cached:
+                gemini_label_cache.pop(obj_key, None)
+
+        # Simplified Vector for Frontend
+        vec = {
+            "x": d.get("position_3d", {}).get("x", 0),
+            "y": d.get("position_3d", {}).get("y", 0),
+            "z": d.get("position_3d", {}).get("z", 0),
+            "confidence": d["confidence"],
+            "track_id": tid,
+            "label": display_label,
+            "yolo_label": d["label"]
+        }
+        state_vector[obj_key] = vec
+
+        broadcast_objects.append({
+            "label": display_label,
+            "yolo_label": d["label"],
+            "details": display_details,
+            "confidence": d["confidence"],
+            "track_id": tid,
+            "bbox": d.get("bbox"),
+            "position": d.get("position_3d", {"x": 0, "y": 0, "z": job["estimated_depth"]})
+        })
+
+
+    await socket_manager.broadcast_to_dashboards({
+        "type": "detection",
+        "source": client_id,
+        "scan_id": scan_id,
+        "frame_number": frame_count,
+        "objects": broadcast_objects,
+        "state_vector": state_vector,
+        "gemini_objects": job["gemini_objects"],
+        "pose": {"alpha": job["alpha"], "beta": job["beta"], "gamma": job["gamma"]},
+        "timestamp": timestamp,
+        "log": f"[{scan_id}] Frame #{frame_count}: {len(detections)} objects detected"
+    })
+
+    stride = job["stride"]
+    stride.observe(
+        (time.perf_counter() - job["received_at"]) * 1000.0,
+        detect_ms=job.get("detect_ms"),
+        enrich_ms=job.get("enrich_ms"),
+    )
+
+    # Acknowledge to Probe
+    ack = {
+        "type": "ack",
+        "frame": frame_count,
+        "objects_found": len(detections),
+        "coalesced": job["mailbox"].coalesced,
+        **stride.snapshot(),
+    }
+    if "seq" in job:
+        ack["seq"] = job["seq"]
+    await socket_manager.send_to_probe(client_id, ack)
+    return None
+
+
+async def _on_pipeline_error(stage: str, job: dict, error: Exception):
+    client_id = job.get("client_id") if isinstance(job, dict) else None
+    if client_id:
+        await socket_manager.send_to_probe(client_id, {"type": "error", "message": str(error)})
+
+
+frame_pipeline = FramePipeline()
+frame_pipeline.add_stage("decode", _decode_stage, executor=frame_pipeline.io_executor)
+frame_pipeline.add_stage(
+    "detect", _detect_stage, executor=frame_pipeline.inference_executor, workers=frame_pipeline.inference_workers
+)
+frame_pipeline.add_stage("enrich", _enrich_stage, workers=_int_env("SPATIAL_PIPELINE_ENRICH_WORKERS", 2))
+# Detect/enrich workers can finish a probe's frames out of order (a Gemini frame
+# waits seconds on describe_crop); index, and the single broadcast worker after
+# it, see each probe's frames in receive order again.
+frame_pipeline.add_stage("index", _index_stage, ordered=True)
+frame_pipeline.add_stage("broadcast", _broadcast_stage)
+frame_pipeline.on_error = _on_pipeline_error
+frame_pipeline.on_done = lambda job: job["mailbox"].release()
+frame_pipeline.sequence_of = lambda job: (job["mailbox"], job["frame_count"])
+
+
+async def _pump_probe_frames(mailbox: ProbeMailbox, stride: AdaptiveStride):
+    """Feed the newest pending probe frame into the pipeline whenever a slot frees up."""
+    frame_count = 0
+    while True:
+        job = await mailbox.get()
+        frame_count += 1
+        job["frame_count"] = frame_count
+        job["run_yolo"] = stride.should_run_yolo(frame_count)
+        job["run_gemini"] = stride.should_run_gemini(frame_count)
+        try:
+            await frame_pipeline.submit(job)
+        except BaseException:
+            mailbox.release()
+            raise
+
+
+@app.on_event("startup")
+async def _start_event_bus():
+    await event_bus.start()
+
+@app.on_event("startup")
+def _warm_spatial_memory():
+    # Lexical search answers /spatial/query while the encoder loads.
+    spatial_memory.warm_up()
+
+@app.on_event("shutdown")
+def _shutdown_pipeline():
+    frame_pipeline.shutdown()
+    frame_store.flush(timeout=5.0)
+    spatial_memory.flush(timeout=5.0)
+    spatial_memory.embedding_cache.flush()
+    spatial_memory.close()
+
+@app.on_event("shutdown")
+async def _close_event_bus():
+    await event_bus.close()
+
 # ============================================================
 # WebSocket Connectors
 # ============================================================
@@ -207,8 +472,13 @@ def get_gemini_client(x_api_key: Optional[str] = Header(None)):
 async def websocket_probe(websocket: WebSocket, client_id: str, api_key: Optional[str] = None):
     """
     WebSocket Endpoint for Mobile Probe (Data Sender).
-    Receives real-time stream of frames + pose data.
-    Full pipeline: Base64 decode → YOLO → Gemini describe → FAISS index → Broadcast.
+    Receives real-time stream of frames + pose data and hands them to the frame
+    pipeline: Base64 decode → YOLO → Gemini describe → FAISS index → Broadcast.
+    Frames that arrive while the probe is still busy are coalesced; only the newest
+    pending frame is processed.
+
+    Frames may be sent either as JSON text messages with a base64 image or as
+    binary messages (header + raw JPEG, see services/frame_protocol.py).
     """
     await socket_manager.connect_probe(websocket, client_id)
     
@@ -216,11 +486,40 @@ async def websocket_probe(websocket: WebSocket, client_id: str, api_key: Optiona
     final_key = api_key or os.getenv("GEMINI_API_KEY")
     gemini = GeminiClient(final_key) if final_key else None
     
-    frame_count = 0
+    mailbox = ProbeMailbox(max_in_flight=PROBE_MAX_IN_FLIGHT)
+    stride = AdaptiveStride(YOLO_FRAME_STRIDE, GEMINI_FRAME_STRIDE, TARGET_LATENCY_MS, max_stride=MAX_FRAME_STRIDE)
+    pump = asyncio.create_task(_pump_probe_frames(mailbox, stride))
 
     try:
         while True:
-            data = await websocket.receive_json()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("bytes") is not None:
+                try:
+                    header, payload = decode_frame_message(message["bytes"])
+                except FrameProtocolError as e:
+                    await socket_manager.send_to_probe(client_id, {"type": "error", "message": str(e)})
+                    continue
+                mailbox.put({
+                    "client_id": client_id,
+                    "gemini": gemini,
+                    "mailbox": mailbox,
+                    "stride": stride,
+                    "received_at": time.perf_counter(),
+                    "scan_id": header["scan_id"] or f"scan_{client_id}",
+                    "timestamp": header["timestamp"] or time.time(),
+                    "seq": header["seq"],
+                    "image_bytes": payload,
+                    "alpha": header["alpha"],
+                    "beta": header["beta"],
+                    "gamma": header["gamma"],
+                    "estimated_depth": 1.5,  # Default assumed distance
+                })
+                continue
+
+            data = json.loads(message.get("text") or "{}")
             # Expected: {"type":"frame", "image":"base64...", "pose":{"alpha":0,"beta":0,"gamma":0}, "scan_id":"room_01"}
 
             if data.get("type") == "auth":
@@ -232,8 +531,11 @@ async def websocket_probe(websocket: WebSocket, client_id: str, api_key: Optiona
 
             if data.get("type") == "stop_scan":
                 scan_id = data.get("scan_id", f"scan_{client_id}")
-                if scan_id in spatial_scans:
-                    spatial_scans[scan_id]["status"] = "completed"
+                await asyncio.get_running_loop().run_in_executor(
+                    frame_pipeline.io_executor, scan_store.set_status, scan_id, "completed"
+                )
+                get_tracker_registry().evict(f"{client_id}:{scan_id}")
+                frame_store.forget(scan_id)
                 # Notify dashboards
                 await socket_manager.broadcast_to_dashboards({
                     "type": "scan_completed",
@@ -250,187 +552,20 @@ async def websocket_probe(websocket: WebSocket, client_id: str, api_key: Optiona
                     except Exception:
                         pass
 
-                scan_id = data.get("scan_id", f"scan_{client_id}")
-                timestamp = data.get("timestamp", time.time())
-                frame_count += 1
-
-                # --- Step 1: Decode Base64 Image ---
-                image_b64 = data.get("image", "")
-                # Strip data URL prefix if present (e.g. "data:image/jpeg;base64,")
-                if "," in image_b64:
-                    image_b64 = image_b64.split(",", 1)[1]
-                try:
-                    image_bytes = base64.b64decode(image_b64)
-                except Exception:
-                    await socket_manager.send_to_probe(client_id, {
-                        "type": "error", "message": "Invalid base64 image"
-                    })
-                    continue
-
-                # --- Step 2: Build Pose string from gyroscope ---
-                # Web sends {alpha, beta, gamma}; we construct a simplified pose
                 pose_data = data.get("pose", {})
-                alpha = float(pose_data.get("alpha", 0) or 0)
-                beta = float(pose_data.get("beta", 0) or 0)
-                gamma = float(pose_data.get("gamma", 0) or 0)
-                pose_str = _pose_matrix_str_from_orientation(alpha, beta, gamma)
-                estimated_depth = 1.5  # Default assumed distance
-
-                # --- Step 3: YOLO Detection + 3D Coordinate Estimation ---
-                detections = []
-                frame_path = ""
-                should_run_yolo = (frame_count % YOLO_FRAME_STRIDE == 1)
-                if should_run_yolo:
-                    detections, frame_path = process_frame(
-                        image_bytes, estimated_depth, pose_str, scan_id, return_frame_path=True
-                    )
-                else:
-                    # Save this frame path without running detection to reduce 8m load spikes.
-                    _, frame_path = process_frame(
-                        image_bytes, estimated_depth, pose_str, scan_id, run_detection=False, return_frame_path=True
-                    )
-
-                # --- Step 4: Gemini Semantic Description (per-object via crops) ---
-                gemini_objects = []
-                run_gemini = gemini and (frame_count % GEMINI_FRAME_STRIDE == 1)
-                if run_gemini and detections:
-                    try:
-                        crops = crop_detections(image_bytes, detections)
-                        pairs = [(c, d) for c, d in zip(crops, detections) if c is not None]
-                        pairs = pairs[:MAX_GEMINI_CROPS]
-
-                        async def _describe(crop, det):
-                            desc = await asyncio.to_thread(gemini.describe_crop, crop, det["label"])
-                            return desc, det
-
-                        results = await asyncio.gather(*[_describe(c, d) for c, d in pairs])
-                        for desc, det in results:
-                            gemini_obj = {
-                                "name": desc.get("name", det["label"]),
-                                "position": det.get("position_3d", {}),
-                                "details": desc.get("details", ""),
-                                "bbox": det.get("bbox"),
-                                "track_id": det.get("track_id", -1),
-                                "yolo_label": det["label"],
-                                "confidence": det["confidence"],
-                            }
-                            gemini_objects.append(gemini_obj)
-                            # Enrich the detection with Gemini description
-                            det["gemini_name"] = gemini_obj["name"]
-                            det["gemini_details"] = gemini_obj["details"]
-                    except Exception as e:
-                        print(f"Gemini crop error: {e}")
-
-                # --- Step 5: Store in Spatial Memory ---
-                scan_record = _ensure_scan(scan_id, source=client_id)
-                scan_record["frames"] += 1
-                scan_record["updated_at"] = timestamp
-                if frame_path:
-                    scan_record["last_frame_path"] = frame_path
-                elif detections:
-                    scan_record["last_frame_path"] = detections[0].get("frame_path")
-
-                if detections:
-                    _record_detections(scan_record, detections, timestamp)
-
-                for obj in gemini_objects:
-                    meta = {
-                        "scan_id": scan_id,
-                        "frame_path": frame_path or (detections[0]["frame_path"] if detections else ""),
-                        "timestamp": timestamp,
-                        "bbox": obj.get("bbox"),
-                        "track_id": obj.get("track_id", -1),
-                        "yolo_label": obj.get("yolo_label", ""),
-                        "confidence": obj.get("confidence", 0),
-                        "position_3d": obj.get("position"),
-                        "source": client_id
-                    }
-                    text_to_index = f"{obj.get('name','')} {obj.get('details','')}"
-                    try:
-                        spatial_memory.add_observation(text_to_index, meta)
-                    except Exception as e:
-                        print(f"Spatial memory add failed: {e}")
-                    scan_record["objects"].append({
-                        "name": obj.get("name", ""),
-                        "position": obj.get("position", {}),
-                        "details": obj.get("details", ""),
-                        "timestamp": timestamp,
-                        "frame_path": meta["frame_path"],
-                    })
-
-                scan_record["object_count"] += len(gemini_objects)
-
-                # --- Step 6: Broadcast Results to All Dashboards ---
-                broadcast_objects = []
-                state_vector = {} # Map<ID, Vector>
-                gemini_label_cache = scan_record.get("gemini_label_cache", {})
-
-                for d in detections:
-                    tid = d.get("track_id", -1)
-                    label = d["label"]
-                    obj_key = _object_key_from_detection(d)
-
-                    # Preserve the latest Gemini naming for this tracked object so
-                    # non-Gemini frames do not revert UI labels back to raw YOLO words.
-                    if d.get("gemini_name"):
-                        gemini_label_cache[obj_key] = {
-                            "name": d.get("gemini_name", label),
-                            "details": d.get("gemini_details", ""),
-                            "updated_at": float(timestamp),
-                        }
-
-                    cached = gemini_label_cache.get(obj_key)
-                    if cached and (float(timestamp) - float(cached.get("updated_at", 0.0)) <= GEMINI_LABEL_TTL_SEC):
-                        display_label = cached.get("name", label)
-                        display_details = cached.get("details", d.get("gemini_details", ""))
-                    else:
-                        display_label = d.get("gemini_name", label)
-                        display_details = d.get("gemini_details", "")
-                        if cached:
-                            gemini_label_cache.pop(obj_key, None)
-
-                    # Simplified Vector for Frontend
-                    vec = {
-                        "x": d.get("position_3d", {}).get("x", 0),
-                        "y": d.get("position_3d", {}).get("y", 0),
-                        "z": d.get("position_3d", {}).get("z", 0),
-                        "confidence": d["confidence"],
-                        "track_id": tid,
-                        "label": display_label,
-                        "yolo_label": d["label"]
-                    }
-                    state_vector[obj_key] = vec
-
-                    broadcast_objects.append({
-                        "label": display_label,
-                        "yolo_label": d["label"],
-                        "details": display_details,
-                        "confidence": d["confidence"],
-                        "track_id": tid,
-                        "bbox": d.get("bbox"),
-                        "position": d.get("position_3d", {"x": 0, "y": 0, "z": estimated_depth})
-                    })
-
-                scan_record["gemini_label_cache"] = gemini_label_cache
-
-                await socket_manager.broadcast_to_dashboards({
-                    "type": "detection",
-                    "source": client_id,
-                    "scan_id": scan_id,
-                    "frame_number": frame_count,
-                    "objects": broadcast_objects,
-                    "state_vector": state_vector,
-                    "gemini_objects": gemini_objects,
-                    "pose": {"alpha": alpha, "beta": beta, "gamma": gamma},
-                    "timestamp": timestamp,
-                    "log": f"[{scan_id}] Frame #{frame_count}: {len(detections)} objects detected"
-                })
-
-                # Acknowledge to Probe
-                await socket_manager.send_to_probe(client_id, {
-                    "type": "ack",
-                    "frame": frame_count,
-                    "objects_found": len(detections)
+                mailbox.put({
+                    "client_id": client_id,
+                    "gemini": gemini,
+                    "mailbox": mailbox,
+                    "stride": stride,
+                    "received_at": time.perf_counter(),
+                    "scan_id": data.get("scan_id", f"scan_{client_id}"),
+                    "timestamp": data.get("timestamp", time.time()),
+                    "image_b64": data.get("image", ""),
+                    "alpha": float(pose_data.get("alpha", 0) or 0),
+                    "beta": float(pose_data.get("beta", 0) or 0),
+                    "gamma": float(pose_data.get("gamma", 0) or 0),
+                    "estimated_depth": 1.5,  # Default assumed distance
                 })
 
     except WebSocketDisconnect:
@@ -444,21 +579,73 @@ async def websocket_probe(websocket: WebSocket, client_id: str, api_key: Optiona
     except Exception as e:
         print(f"Error in probe ws: {e}")
         socket_manager.disconnect_probe(client_id)
+    finally:
+        pump.cancel()
+        get_tracker_registry().evict_prefix(f"{client_id}:")
 
 @app.websocket("/ws/dashboard/{client_id}")
 async def websocket_dashboard(websocket: WebSocket, client_id: str):
     """
     WebSocket Endpoint for Wall Dashboard (Data Receiver).
     Receives real-time updates of detected objects.
+
+    Connect with `?mode=delta` to get `detection_delta` / `detection_keyframe`
+    messages instead of full `detection` state every frame; send
+    {"type": "resync", "scan_id": "..."} (scan_id optional) to get a keyframe.
+    `?encoding=json|orjson|msgpack` picks the wire format (see
+    services/dashboard_codec.py); json is the default.
+
+    By default a dashboard gets every broadcast. To narrow it, send
+    {"type": "subscribe", "scan_ids": [...], "probes": [...], "types": [...],
+     "min_confidence": 0.5} (all fields optional; replaces the previous
+    subscription) or {"type": "unsubscribe"} to get everything again.
+
+    `?max_hz=2` (or {"type": "set_rate", "max_hz": 2}; default
+    SPATIAL_DASHBOARD_MAX_HZ, 0 = every frame) caps detection updates per scan;
+    updates within an interval are merged server-side into one message.
     """
-    await socket_manager.connect_dashboard(websocket, client_id)
+    delta = websocket.query_params.get("mode") == "delta"
+    encoding = websocket.query_params.get("encoding", "json")
+    try:
+        max_hz = float(websocket.query_params["max_hz"]) if "max_hz" in websocket.query_params else None
+    except ValueError:
+        max_hz = None
+    await socket_manager.connect_dashboard(websocket, client_id, delta=delta, encoding=encoding, max_hz=max_hz)
     try:
         while True:
-            # Dashboard might send commands like "Start Recording" etc.
+            # Dashboard control messages; anything unrecognized is ignored.
             data = await websocket.receive_text()
-            # Echo or process commands
+            try:
+                command = json.loads(data)
+            except ValueError:
+                continue
+            if not isinstance(command, dict):
+                continue
+            if command.get("type") == "resync":
+                socket_manager.resync(client_id, command.get("scan_id"))
+            elif command.get("type") == "subscribe":
+                try:
+                    socket_manager.subscribe(
+                        client_id,
+                        scan_ids=command.get("scan_ids"),
+                        probes=command.get("probes"),
+                        types=command.get("types"),
+                        min_confidence=command.get("min_confidence", 0.0),
+                    )
+                except (TypeError, ValueError):
+                    continue
+            elif command.get("type") == "unsubscribe":
+                socket_manager.subscribe(client_id)
+            elif command.get("type") == "set_rate":
+                try:
+                    socket_manager.set_rate(client_id, float(command.get("max_hz") or 0.0))
+                except (TypeError, ValueError):
+                    continue
     except WebSocketDisconnect:
-        socket_manager.disconnect_dashboard(client_id)
+        socket_manager.disconnect_dashboard(client_id, websocket)
+    except Exception:
+        # Evicted as a slow client: the server already closed the socket.
+        socket_manager.disconnect_dashboard(client_id, websocket)
 
 # ============================================================
 # Routes
@@ -470,16 +657,34 @@ if os.path.exists("demo"):
 
 @app.get("/")
 def health_check():
-    from services.video_processor import _get_yolo
+    from services.video_processor import _get_detector
+    detector = _get_detector()
     return {
         "status": "online", 
         "name": "SpatialVCS", 
         "version": "2.1.0", 
         "capabilities": {
             "search": spatial_memory.is_ready(),
-            "yolo": _get_yolo() is not None,
+            "yolo": detector is not None,
+            "detector_backend": detector.backend if detector is not None else None,
             "gemini": os.getenv("GEMINI_API_KEY") is not None
-        }
+        },
+        "embedding_cache": spatial_memory.embedding_cache.stats(),
+    }
+
+
+@app.get("/spatial/pipeline/stats")
+def pipeline_stats():
+    """Per-stage queue depth and latency of the probe frame pipeline, plus dashboard fan-out."""
+    return {
+        "stages": frame_pipeline.stats(),
+        "inference": get_inference_scheduler().stats(),
+        "trackers": get_tracker_registry().stats(),
+        "frame_store": frame_store.stats(),
+        "spatial_memory": spatial_memory.stats(),
+        "answer_cache": answer_cache.stats(),
+        "sockets": socket_manager.stats(),
+        "scan_store": scan_store.name,
     }
 
 
@@ -579,6 +784,24 @@ class SpatialQueryRequest(BaseModel):
     query: str
     scan_id: Optional[str] = None
     top_k: int = 3
+    # Structured filters, applied inside the vector index.
+    since: Optional[float] = None
+    until: Optional[float] = None
+    yolo_label: Optional[Union[str, List[str]]] = None
+    min_confidence: Optional[float] = None
+    source: Optional[str] = None
+    # "vector", "lexical" or "hybrid" (default: SPATIAL_SEARCH_MODE).
+    mode: Optional[str] = None
+
+class SpatialNearbyRequest(BaseModel):
+    scan_id: str
+    # Centre: an explicit position, or an object found by text ("couch").
+    position: Optional[Dict[str, float]] = None
+    anchor: Optional[str] = None
+    radius: Optional[float] = None
+    k: Optional[int] = None
+    # Only objects whose description or label matches this text.
+    query: Optional[str] = None
 
 class SpatialDiffRequest(BaseModel):
     scan_id_before: str
@@ -600,16 +823,18 @@ async def receive_frame(
     timestamp = time.time()
     
     image_bytes = await image.read()
-    detections = process_frame(image_bytes, center_depth, pose, scan_id)
-    scan_record = _ensure_scan(scan_id, source="rest")
-    scan_record["frames"] += 1
-    scan_record["updated_at"] = timestamp
+    loop = asyncio.get_running_loop()
+    # Decode + YOLO run on the pipeline's inference threads, as probe frames do.
+    # REST frames feed Gemini observations directly, so always keep them.
+    detections = await loop.run_in_executor(
+        frame_pipeline.inference_executor,
+        partial(process_frame, image_bytes, center_depth, parse_pose_matrix(pose), scan_id,
+                keep_frame=True, stream_id=f"rest:{scan_id}"),
+    )
+    object_records = []
+    observations = []
     if detections:
-        scan_record["last_frame_path"] = detections[0].get("frame_path")
-        _record_detections(scan_record, detections, timestamp)
-    
-    if detections:
-        description_data = client.describe_for_spatial(image_bytes)
+        description_data = await asyncio.to_thread(client.describe_for_spatial, image_bytes)
         gemini_objects = description_data.get("objects", [])
         
         for obj in gemini_objects:
@@ -618,28 +843,56 @@ async def receive_frame(
                 "frame_path": detections[0]["frame_path"],
                 "timestamp": timestamp,
                 "yolo_detections": detections,
-                "details": obj
+                "details": obj,
+                "source": "rest",
             }
             text_to_index = f"{obj.get('name', '')} {obj.get('position', '')} {obj.get('details', '')}"
-            spatial_memory.add_observation(text_to_index, meta)
-            scan_record["objects"].append({
+            observations.append((text_to_index, meta))
+            object_records.append({
                 "name": obj.get("name", ""),
                 "position": obj.get("position", ""),
                 "details": obj.get("details", ""),
                 "timestamp": timestamp,
                 "frame_path": detections[0]["frame_path"],
             })
-            
-        scan_record["object_count"] += len(gemini_objects)
 
+    # Encoding + upsert is blocking; a REST frame is still searchable once this request returns.
+    await asyncio.to_thread(spatial_memory.add_observations, observations)
+    # The scan store may be SQLite: keep its I/O off the event loop, as the probe path does.
+    await loop.run_in_executor(
+        frame_pipeline.io_executor,
+        partial(scan_store.record_frame, scan_id, "rest", timestamp,
+                frame_path=detections[0].get("frame_path") if detections else None,
+                detections=_detection_records(detections, timestamp),
+                objects=object_records),
+    )
     return {"status": "processed", "objects_found": len(detections)}
 
 @app.post("/spatial/query")
 async def spatial_query(request: SpatialQueryRequest, x_api_key: Optional[str] = Header(None)):
     client = get_gemini_client(x_api_key)
-    results = spatial_memory.search(request.query, request.top_k, scan_id=request.scan_id)
-    answer = client.answer_spatial_query(request.query, results)
-    
+    # Read before searching so an answer is never cached under a newer generation than its results.
+    generation = spatial_memory.generation(request.scan_id)
+    try:
+        results = await asyncio.to_thread(
+            spatial_memory.search,
+            request.query,
+            request.top_k,
+            scan_id=request.scan_id,
+            since=request.since,
+            until=request.until,
+            yolo_label=request.yolo_label,
+            min_confidence=request.min_confidence,
+            source=request.source,
+            mode=request.mode,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    answer, cache_status = await answer_cache.get_or_compute(
+        answer_cache.key(request.query, [r["id"] for r in results], request.scan_id, generation),
+        lambda: asyncio.to_thread(client.answer_spatial_query, request.query, results),
+    )
+
     formatted_results = []
     for r in results:
         meta = r["metadata"]
@@ -649,34 +902,89 @@ async def spatial_query(request: SpatialQueryRequest, x_api_key: Optional[str] =
         
         formatted_results.append({
             "score": r["score"],
+            "match": r["match"],
             "description": r["description"],
             "frame_url": frame_url,
-            "yolo_data": meta.get("yolo_detections", [])
+            "yolo_data": meta.get("yolo_detections", []),
+            "sighting_count": meta.get("sighting_count", 1),
+            "first_seen": meta.get("first_seen", meta.get("timestamp")),
+            "last_seen": meta.get("timestamp"),
         })
 
     return {
         "query": request.query,
         "answer": answer.get("answer"),
+        "answer_cache": cache_status,
         "results": formatted_results
     }
 
+@app.post("/spatial/nearby")
+def spatial_nearby(request: SpatialNearbyRequest):
+    """Objects within `radius` metres of a position or anchor object and/or its `k` nearest (10 by default)."""
+    if request.radius is not None and request.radius < 0:
+        raise HTTPException(status_code=400, detail="radius must be >= 0")
+    anchor = None
+    position = request.position
+    if request.anchor:
+        anchor = spatial_memory.locate(request.scan_id, request.anchor)
+        if anchor is None:
+            raise HTTPException(status_code=404, detail=f"No positioned object matching '{request.anchor}'")
+        position = anchor["metadata"]["position_3d"]
+    if position_xyz(position) is None:
+        raise HTTPException(status_code=400, detail="Provide position {x, y, z} or anchor")
+
+    results = spatial_memory.nearby(
+        request.scan_id,
+        position,
+        radius=request.radius,
+        k=request.k,
+        query=request.query,
+        exclude=anchor["id"] if anchor else None,
+    )
+    return {
+        "scan_id": request.scan_id,
+        "position": position,
+        "anchor": {"id": anchor["id"], "description": anchor["description"]} if anchor else None,
+        "results": [
+            {
+                "id": r["id"],
+                "distance": round(r["distance"], 3),
+                "description": r["description"],
+                "yolo_label": r["metadata"].get("yolo_label"),
+                "position_3d": r["metadata"].get("position_3d"),
+                "frame_url": f"/spatial/frame/{request.scan_id}/{os.path.basename(r['metadata'].get('frame_path', ''))}",
+                "sighting_count": r["metadata"].get("sighting_count", 1),
+                "last_seen": r["metadata"].get("timestamp"),
+            }
+            for r in results
+        ],
+    }
+
 @app.get("/spatial/frame/{scan_id}/{filename}")
 def get_frame(scan_id: str, filename: str):
     if filename != os.path.basename(filename):
         raise HTTPException(status_code=400, detail="Invalid frame filename")
-    path = f"data/frames/{scan_id}/{filename}"
+    path = os.path.join(frame_store.root, scan_id, filename)
+    pending = frame_store.read(path)
+    if pending is not None:
+        # Not flushed to disk yet; serve it from the write-behind buffer.
+        return Response(content=pending, media_type="image/jpeg")
     if os.path.exists(path):
         return FileResponse(path)
     raise HTTPException(status_code=404, detail="Frame not found")
 
 @app.post("/spatial/diff")
 async def spatial_diff(request: SpatialDiffRequest, x_api_key: Optional[str] = Header(None)):
+    scans = {}
+    loop = asyncio.get_running_loop()
     for sid in [request.scan_id_before, request.scan_id_after]:
-        if sid not in spatial_scans:
+        # Loads every detection row of the scan from SQLite; off the event loop.
+        scans[sid] = await loop.run_in_executor(frame_pipeline.io_executor, scan_store.get, sid)
+        if scans[sid] is None:
             raise HTTPException(status_code=404, detail=f"Scan '{sid}' not found")
     
-    before_scan = spatial_scans[request.scan_id_before]
-    after_scan = spatial_scans[request.scan_id_after]
+    before_scan = scans[request.scan_id_before]
+    after_scan = scans[request.scan_id_after]
     before_latest = _latest_position_by_label(before_scan.get("detections", []))
     after_latest = _latest_position_by_label(after_scan.get("detections", []))
 
@@ -737,8 +1045,11 @@ async def reset_spatial_data(x_api_key: Optional[str] = Header(None)):
     # 1. Clear Chroma
     spatial_memory.reset_database()
     
-    # 2. Clear In-Memory Scans
-    spatial_scans.clear()
+    # 2. Clear Scans
+    await asyncio.get_running_loop().run_in_executor(frame_pipeline.io_executor, scan_store.clear)
+    gemini_label_caches.clear()
+    answer_cache.clear()
+    frame_store.reset()
     
     # 3. Notify Dashboards
     await socket_manager.broadcast_to_dashboards({
@@ -750,27 +1061,25 @@ async def reset_spatial_data(x_api_key: Optional[str] = Header(None)):
 
 @app.get("/spatial/scans")
 def list_scans():
-    return {
-        "scans": [
-            {
-                "scan_id": sid,
-                "status": data.get("status", "unknown"),
-                "source": data.get("source"),
-                "frames": data.get("frames", 0),
-                "object_count": data.get("object_count", 0),
-                "detection_count": len(data.get("detections", [])),
-                "updated_at": data.get("updated_at"),
-                "last_frame": os.path.basename(data.get("last_frame_path") or ""),
-            }
-            for sid, data in spatial_scans.items()
-        ]
-    }
+    return {"scans": scan_store.summaries()}
 
 @app.get("/spatial/memory/{scan_id}")
 def get_memory(scan_id: str):
-    if scan_id not in spatial_scans:
+    record = scan_store.get(scan_id)
+    if record is None:
         raise HTTPException(status_code=404, detail=f"Scan '{scan_id}' not found")
-    return spatial_scans[scan_id]
+    return record
+
+@app.get("/spatial/observations")
+def list_observations(scan_id: Optional[str] = None, offset: int = 0, limit: int = 100):
+    """Page through stored spatial-memory observations (limit capped at 500)."""
+    limit = max(1, min(limit, 500))
+    return {
+        "total": spatial_memory.count(),
+        "offset": offset,
+        "limit": limit,
+        "observations": spatial_memory.get_observations(offset, limit, scan_id=scan_id),
+    }
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
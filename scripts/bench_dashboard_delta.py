@@ -0,0 +1,111 @@
+"""
+Replay a dashboard session and compare full `detection` broadcasts with the
+delta encoding, per wire encoding: bytes on the wire and encode time per frame.
+
+    python scripts/bench_dashboard_delta.py [--session session.jsonl] [--encoding json --encoding msgpack]
+
+Record a session by running the server with SPATIAL_DASHBOARD_RECORD=session.jsonl
+(one full `detection` message per line). Without --session, a synthetic static
+scene is replayed: --objects objects with sub-epsilon jitter, YOLO on every
+--stride frame (empty detections in between), at --fps.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.dashboard_codec import ENCODINGS, encode, resolve_encoding  # noqa: E402
+from services.dashboard_delta import DetectionDeltaEncoder  # noqa: E402
+
+
+def load_session(path: str):
+    messages = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                message = json.loads(line)
+                if message.get("type") == "detection":
+                    messages.append(message)
+    return messages
+
+
+def synthetic_session(frames: int, objects: int, stride: int, fps: float):
+    rng = np.random.default_rng(0)
+    base = rng.uniform(-2.0, 2.0, (objects, 3))
+    messages = []
+    for n in range(1, frames + 1):
+        state_vector, broadcast = {}, []
+        if (n - 1) % stride == 0:
+            jitter = base + rng.normal(0.0, 0.004, base.shape)
+            for i, (x, y, z) in enumerate(jitter.tolist()):
+                label = f"class_{i % 20}"
+                vec = {"x": x, "y": y, "z": z, "confidence": 0.8, "track_id": i + 1, "label": label, "yolo_label": label}
+                state_vector[f"{label}_{i + 1}"] = vec
+                broadcast.append({
+                    "label": label, "yolo_label": label, "details": "", "confidence": 0.8, "track_id": i + 1,
+                    "bbox": [10 * i, 20, 10 * i + 60, 90], "position": {"x": x, "y": y, "z": z},
+                })
+        messages.append({
+            "type": "detection", "source": "probe", "scan_id": "bench", "frame_number": n,
+            "objects": broadcast, "state_vector": state_vector, "gemini_objects": [],
+            "pose": {"alpha": 0.0, "beta": 0.0, "gamma": 0.0}, "timestamp": n / fps,
+            "log": f"[bench] Frame #{n}: {len(broadcast)} objects detected",
+        })
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--session", help="recorded JSONL session (SPATIAL_DASHBOARD_RECORD)")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--objects", type=int, default=int(os.getenv("SPATIAL_MAX_DETECTIONS", "30")))
+    parser.add_argument("--stride", type=int, default=int(os.getenv("YOLO_FRAME_STRIDE", "2")))
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--encoding", action="append", choices=ENCODINGS, help="repeatable (default: all available)")
+    args = parser.parse_args()
+
+    messages = load_session(args.session) if args.session else synthetic_session(
+        args.frames, args.objects, args.stride, args.fps
+    )
+    if not messages:
+        print("No detection messages to replay.")
+        return
+
+    encodings = args.encoding or [e for e in ENCODINGS if resolve_encoding(e) == e]
+    n = len(messages)
+    t0 = float(messages[0].get("timestamp") or 0.0)
+    print(f"{n} detection messages")
+    baseline = None
+    for encoding in encodings:
+        started = time.perf_counter()
+        full_bytes = sum(len(encode(m, encoding)) for m in messages)
+        full_s = time.perf_counter() - started
+
+        encoder = DetectionDeltaEncoder()
+        delta_bytes, kinds = 0, {"delta": 0, "keyframe": 0}
+        started = time.perf_counter()
+        for i, m in enumerate(messages):
+            # Replay on the recorded clock so object linger behaves as it did live.
+            now = float(m.get("timestamp") or t0 + i / args.fps) - t0
+            kind, out = encoder.update(m, now=now)
+            kinds[kind] += 1
+            payload = encoder.keyframe(m.get("scan_id"), encoding) if kind == "keyframe" else encode(out, encoding)
+            delta_bytes += len(payload)
+        delta_s = time.perf_counter() - started
+
+        if baseline is None:
+            baseline = (full_bytes, full_s)
+        print(f"{encoding} ({kinds['delta']} deltas, {kinds['keyframe']} keyframes)")
+        print(f"  full   {full_bytes / n:9.0f} B/frame  {full_s / n * 1e6:8.1f} us/frame encode"
+              f"  ({baseline[1] / max(full_s, 1e-12):.1f}x faster than {encodings[0]})")
+        print(f"  delta  {delta_bytes / n:9.0f} B/frame  {delta_s / n * 1e6:8.1f} us/frame diff+encode"
+              f"  ({baseline[0] / max(delta_bytes, 1):.1f}x fewer bytes than full {encodings[0]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Detector backend benchmark: FPS and mAP@0.5 on a fixture for each backend.
+
+    python scripts/bench_detectors.py --fixture path/to/fixture \
+        --backend ultralytics:yolov8n.pt --backend onnx:yolov8n.onnx \
+        --backend onnx:yolov8n_int8.onnx --backend openvino:yolov8n.onnx
+
+The fixture directory holds images plus an `annotations.json` mapping each image
+file name to its ground-truth boxes in COCO class ids:
+    {"desk.jpg": [{"bbox": [x1, y1, x2, y2], "class": 56}, ...], ...}
+Without --fixture, synthetic frames are used and only FPS is reported.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.video_processor import create_detector, _get_target_classes  # noqa: E402
+
+
+def load_fixture(path: str):
+    with open(os.path.join(path, "annotations.json"), "r", encoding="utf-8") as f:
+        annotations = json.load(f)
+    images, truths = [], []
+    for name, boxes in sorted(annotations.items()):
+        img = cv2.imread(os.path.join(path, name), cv2.IMREAD_COLOR)
+        if img is None:
+            print(f"⚠️ Skipping unreadable fixture image {name}")
+            continue
+        images.append(img)
+        truths.append([(int(b["class"]), np.asarray(b["bbox"], dtype=np.float32)) for b in boxes])
+    return images, truths
+
+
+def synthetic_frames(count: int):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(count)], None
+
+
+def _iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.float32)
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def mean_average_precision(predictions, truths, iou_threshold: float = 0.5) -> float:
+    """VOC-style all-point interpolated AP per class, averaged over classes with ground truth."""
+    classes = sorted({c for frame in truths for c, _ in frame})
+    aps = []
+    for c in classes:
+        gt = [np.array([b for cls, b in frame if cls == c]).reshape(-1, 4) for frame in truths]
+        n_gt = sum(len(g) for g in gt)
+        scored = []
+        for i, (xyxy, conf, cls) in enumerate(predictions):
+            for box, score in zip(xyxy[cls == c], conf[cls == c]):
+                scored.append((float(score), i, box))
+        scored.sort(key=lambda item: -item[0])
+        used = [np.zeros(len(g), dtype=bool) for g in gt]
+        tp = np.zeros(len(scored))
+        for k, (_, i, box) in enumerate(scored):
+            ious = _iou(box, gt[i])
+            if len(ious):
+                j = int(np.argmax(ious))
+                if ious[j] >= iou_threshold and not used[i][j]:
+                    used[i][j] = True
+                    tp[k] = 1
+        if n_gt == 0:
+            continue
+        cum_tp = np.cumsum(tp)
+        recall = cum_tp / n_gt
+        precision = cum_tp / np.arange(1, len(scored) + 1) if len(scored) else np.zeros(0)
+        mrec = np.concatenate([[0.0], recall, [1.0]])
+        mpre = np.concatenate([[0.0], precision, [0.0]])
+        mpre = np.maximum.accumulate(mpre[::-1])[::-1]
+        idx = np.nonzero(mrec[1:] != mrec[:-1])[0]
+        aps.append(float(np.sum((mrec[idx + 1] - mrec[idx]) * mpre[idx + 1])))
+    return float(np.mean(aps)) if aps else 0.0
+
+
+def run_backend(spec: str, images, truths, batch: int, warmup: int, args):
+    backend, _, model_path = spec.partition(":")
+    detector = create_detector(backend, model_path or None)
+    kwargs = {"classes": args.classes, "conf": args.conf, "max_det": args.max_det, "imgsz": args.imgsz}
+
+    for _ in range(warmup):
+        detector.detect_batch(images[:batch], **kwargs)
+
+    predictions = []
+    started = time.perf_counter()
+    for start in range(0, len(images), batch):
+        predictions.extend(detector.detect_batch(images[start:start + batch], **kwargs))
+    elapsed = time.perf_counter() - started
+
+    fps = len(images) / elapsed if elapsed else float("inf")
+    line = f"{spec:<40} batch={batch:<3} fps={fps:8.2f}"
+    if truths is not None:
+        line += f"  mAP@0.5={mean_average_precision(predictions, truths):.3f}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", action="append", help="backend[:model_path], repeatable")
+    parser.add_argument("--fixture", help="directory with images + annotations.json")
+    parser.add_argument("--frames", type=int, default=32, help="synthetic frame count without a fixture")
+    parser.add_argument("--batch", type=int, action="append", help="batch sizes to test (default 1 and 8)")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--conf", type=float, default=float(os.getenv("SPATIAL_DETECT_CONF", "0.35")))
+    parser.add_argument("--max-det", type=int, default=int(os.getenv("SPATIAL_MAX_DETECTIONS", "30")))
+    parser.add_argument("--imgsz", type=int, default=int(os.getenv("SPATIAL_MODEL_IMGSZ", "640")))
+    parser.add_argument("--all-classes", action="store_true", help="do not apply SPATIAL_TARGET_CLASSES")
+    args = parser.parse_args()
+    args.classes = None if args.all_classes else _get_target_classes()
+
+    images, truths = load_fixture(args.fixture) if args.fixture else synthetic_frames(args.frames)
+    print(f"{len(images)} frames, imgsz={args.imgsz}, conf={args.conf}")
+    for spec in args.backend or ["ultralytics"]:
+        for batch in args.batch or [1, 8]:
+            try:
+                run_backend(spec, images, truths, batch, args.warmup, args)
+            except Exception as e:
+                print(f"{spec:<40} batch={batch:<3} failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
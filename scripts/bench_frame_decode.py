@@ -0,0 +1,97 @@
+"""
+Per-frame CPU time of the non-inference frame work, before vs after sharing a
+single decoded Frame across pipeline stages.
+
+  before: imdecode in process_frame → imwrite (re-encode) → imdecode again in
+          crop_detections → crop + encode
+  after:  Frame decoded once → original JPEG written verbatim (write-behind)
+          → crops taken from the shared array → crop + encode
+
+Stride-skipped frames (no detection) are measured separately, since they used
+to be decoded and re-encoded just to be saved.
+
+    python scripts/bench_frame_decode.py [--iterations 50] [--detections 3]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.video_processor import Frame, process_frame, crop_detections  # noqa: E402
+from services.frame_store import get_frame_store  # noqa: E402
+from bench_frame_protocol import RESOLUTIONS, synthetic_jpeg  # noqa: E402
+
+
+def fake_detections(width: int, height: int, count: int):
+    rng = np.random.default_rng(1)
+    dets = []
+    for _ in range(count):
+        x1, y1 = int(rng.integers(0, width // 2)), int(rng.integers(0, height // 2))
+        dets.append({"label": "cup", "bbox": [x1, y1, x1 + width // 6, y1 + height // 6]})
+    return dets
+
+
+def legacy_frame(jpeg: bytes, scan_id: str, detections: list, run_detection: bool):
+    frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    save_dir = f"data/frames/{scan_id}"
+    os.makedirs(save_dir, exist_ok=True)
+    cv2.imwrite(os.path.join(save_dir, f"frame_{uuid.uuid4().hex[:8]}.jpg"), frame)
+    if run_detection:
+        # Old crop_detections decoded the JPEG a second time.
+        again = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        for d in detections:
+            x1, y1, x2, y2 = d["bbox"]
+            cv2.imencode(".jpg", again[y1:y2, x1:x2])
+
+
+def shared_frame(jpeg: bytes, scan_id: str, detections: list, run_detection: bool):
+    frame = Frame(jpeg)
+    if run_detection:
+        frame.array  # decoded once by the pipeline's decode stage
+    process_frame(frame, 1.5, np.eye(4), scan_id, run_detection=False)
+    if run_detection:
+        crop_detections(frame, detections)
+
+
+def cpu_ms(fn, iterations: int, *args) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(*args)
+    # Include the background writer's work (process_time covers all threads).
+    get_frame_store().flush()
+    return (time.process_time() - start) / iterations * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--detections", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="spatial_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for label, (w, h) in RESOLUTIONS.items():
+            jpeg = synthetic_jpeg(w, h, 80)
+            dets = fake_detections(w, h, args.detections)
+            print(f"{label} ({w}x{h}, {len(jpeg) / 1024:.1f} KiB, {args.detections} crops)")
+            for run_detection, name in ((True, "detection frame"), (False, "skipped frame")):
+                before = cpu_ms(legacy_frame, args.iterations, jpeg, "bench", dets, run_detection)
+                after = cpu_ms(shared_frame, args.iterations, jpeg, "bench", dets, run_detection)
+                print(f"  {name:<16} before={before:7.2f} ms  after={after:7.2f} ms  "
+                      f"({before / max(after, 1e-6):.1f}x)")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Throughput benchmark: base64-in-JSON vs binary probe frame messages.
+
+Measures bytes on the wire and the CPU time to build (probe side) and parse
+(server side, up to the raw JPEG handed to process_frame) one frame message at
+720p and 1080p.
+
+    python scripts/bench_frame_protocol.py [--iterations 200] [--quality 80]
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.frame_protocol import encode_frame_message, decode_frame_message  # noqa: E402
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080)}
+
+
+def synthetic_jpeg(width: int, height: int, quality: int) -> bytes:
+    """A deterministic, moderately detailed scene so JPEG sizes are realistic."""
+    rng = np.random.default_rng(0)
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    ys = np.linspace(0, 255, height, dtype=np.float32)
+    img = np.zeros((height, width, 3), dtype=np.float32)
+    img[..., 0] = xs[None, :]
+    img[..., 1] = ys[:, None]
+    img[..., 2] = (xs[None, :] + ys[:, None]) / 2
+    for _ in range(40):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        w, h = int(rng.integers(20, width // 4)), int(rng.integers(20, height // 4))
+        color = [float(c) for c in rng.integers(0, 255, 3)]
+        cv2.rectangle(img, (x, y), (x + w, y + h), color, -1)
+    img += rng.normal(0, 6, img.shape).astype(np.float32)
+    ok, buf = cv2.imencode(".jpg", np.clip(img, 0, 255).astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buf.tobytes()
+
+
+def json_roundtrip(jpeg: bytes, seq: int):
+    message = json.dumps({
+        "type": "frame",
+        "image": "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii"),
+        "pose": {"alpha": 10.0, "beta": 20.0, "gamma": 5.0},
+        "scan_id": "bench_scan",
+        "timestamp": time.time(),
+        "seq": seq,
+    })
+    t0 = time.perf_counter()
+    data = json.loads(message)
+    image_b64 = data.get("image", "")
+    if "," in image_b64:
+        image_b64 = image_b64.split(",", 1)[1]
+    payload = base64.b64decode(image_b64)
+    t1 = time.perf_counter()
+    return len(message.encode("utf-8")), payload, t1 - t0
+
+
+def binary_roundtrip(jpeg: bytes, seq: int):
+    message = encode_frame_message(jpeg, "bench_scan", seq, time.time(), 10.0, 20.0, 5.0)
+    t0 = time.perf_counter()
+    _, payload = decode_frame_message(message)
+    np.frombuffer(payload, np.uint8)  # what process_frame does with the payload
+    t1 = time.perf_counter()
+    return len(message), payload, t1 - t0
+
+
+def bench(name, fn, jpeg: bytes, iterations: int):
+    total_build = 0.0
+    total_parse = 0.0
+    wire = 0
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        wire, payload, parse_s = fn(jpeg, i)
+        total_build += time.perf_counter() - t0 - parse_s
+        total_parse += parse_s
+        assert len(payload) == len(jpeg)
+    build_us = total_build / iterations * 1e6
+    parse_us = total_parse / iterations * 1e6
+    fps = iterations / total_parse if total_parse else float("inf")
+    mbps = wire * iterations / total_parse / 1e6 if total_parse else float("inf")
+    print(f"  {name:<7} wire={wire / 1024:8.1f} KiB  build={build_us:9.1f} us  "
+          f"parse={parse_us:9.1f} us  server={fps:10.0f} frames/s ({mbps:8.1f} MB/s)")
+    return wire, parse_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--quality", type=int, default=80)
+    args = parser.parse_args()
+
+    for label, (w, h) in RESOLUTIONS.items():
+        jpeg = synthetic_jpeg(w, h, args.quality)
+        print(f"{label} ({w}x{h}, JPEG q={args.quality}, {len(jpeg) / 1024:.1f} KiB)")
+        json_wire, json_parse = bench("json", json_roundtrip, jpeg, args.iterations)
+        bin_wire, bin_parse = bench("binary", binary_roundtrip, jpeg, args.iterations)
+        print(f"  -> binary saves {100.0 * (1 - bin_wire / json_wire):.1f}% bandwidth, "
+              f"parse {json_parse / max(bin_parse, 1e-9):.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
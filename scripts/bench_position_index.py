@@ -0,0 +1,73 @@
+"""
+Position index latency: radius and k-nearest queries over one scan's objects,
+plus upsert (insert and move) throughput.
+
+    python scripts/bench_position_index.py [--objects 100000] [--extent 20] [--cell 0.5]
+
+Objects are uniformly spread over an extent x extent x 3 m volume. "moves"
+re-upserts 10% of them at new positions, as entity merges do on ingest.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.position_index import PositionIndex  # noqa: E402
+
+
+def _position(rng: random.Random, extent: float) -> dict:
+    return {"x": rng.uniform(0, extent), "y": rng.uniform(0, extent), "z": rng.uniform(0, 3.0)}
+
+
+def _percentiles_us(samples):
+    samples = np.asarray(samples) * 1e6
+    return float(np.percentile(samples, 50)), float(np.percentile(samples, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=100_000)
+    parser.add_argument("--extent", type=float, default=20.0, help="room size in metres")
+    parser.add_argument("--cell", type=float, default=0.5, help="voxel size in metres")
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    index = PositionIndex(args.cell)
+    started = time.perf_counter()
+    for i in range(args.objects):
+        index.upsert(f"obj_{i}", "bench", _position(rng, args.extent))
+    insert_s = time.perf_counter() - started
+    started = time.perf_counter()
+    moves = max(1, args.objects // 10)
+    for i in range(moves):
+        index.upsert(f"obj_{rng.randrange(args.objects)}", "bench", _position(rng, args.extent))
+    move_s = time.perf_counter() - started
+    print(f"{args.objects} objects, {index.stats()['voxels']} voxels of {args.cell} m")
+    print(f"insert {args.objects / insert_s:10.0f}/s   move {moves / move_s:10.0f}/s")
+
+    allowed = {f"obj_{i}" for i in rng.sample(range(args.objects), min(500, args.objects))}
+    cases = [
+        ("radius 0.5 m", lambda c: index.within("bench", c, 0.5)),
+        ("radius 1 m", lambda c: index.within("bench", c, 1.0)),
+        ("radius 1 m, 10 nearest", lambda c: index.nearest("bench", c, 10, max_radius=1.0)),
+        ("10 nearest", lambda c: index.nearest("bench", c, 10)),
+        ("10 nearest of 500 text hits", lambda c: index.nearest("bench", c, 10, allowed=allowed)),
+    ]
+    centers = [_position(rng, args.extent) for _ in range(args.queries)]
+    for name, run in cases:
+        samples, found = [], 0
+        for center in centers:
+            t = time.perf_counter()
+            found += len(run(center))
+            samples.append(time.perf_counter() - t)
+        p50, p95 = _percentiles_us(samples)
+        print(f"{name:28s} p50 {p50:8.1f} us  p95 {p95:8.1f} us  avg hits {found / len(centers):7.1f}")
+
+
+if __name__ == "__main__":
+    main()
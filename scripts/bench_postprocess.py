@@ -0,0 +1,118 @@
+"""
+Micro-benchmark of detection post-processing + 3D back-projection for one
+frame with SPATIAL_MAX_DETECTIONS (default 30) boxes.
+
+  per-box   the previous loop: per-box scalar extraction, intrinsics recomputed
+            and a 4x4 `pose @ P_cam` for every box, dict built per box
+  columnar  back_project() over all boxes + Detections (what the pipeline keeps)
+  +dicts    columnar followed by Detections.to_dicts() (the API boundary)
+
+Boxes are NumPy rows here; the old loop indexed torch tensors per box, which
+is slower still.
+
+    python scripts/bench_postprocess.py [--detections 30] [--iterations 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.video_processor import Detections, back_project  # noqa: E402
+
+
+class _Box:
+    """Per-box view shaped like an ultralytics Boxes row."""
+
+    __slots__ = ("xyxy", "conf", "cls", "id")
+
+    def __init__(self, xyxy, conf, cls, tid):
+        self.xyxy = xyxy[None, :]
+        self.conf = conf[None]
+        self.cls = cls[None]
+        self.id = tid[None]
+
+
+def per_box(boxes, names, img_w, img_h, center_depth, pose, frame_path):
+    detections = []
+    for box in boxes:
+        x1, y1, x2, y2 = box.xyxy[0].tolist()
+        confidence = float(box.conf[0])
+        cls = int(box.cls[0])
+        label = names[cls]
+        track_id = int(box.id[0]) if (box.id is not None) else -1
+        u = (x1 + x2) / 2
+        v = (y1 + y2) / 2
+        fx = img_w * 1.5
+        fy = fx
+        cx = img_w / 2
+        cy = img_h / 2
+        Zc = -center_depth
+        Xc = (u - cx) * center_depth / fx
+        Yc = -(v - cy) * center_depth / fy
+        P_world = pose @ np.array([Xc, Yc, Zc, 1.0])
+        detections.append({
+            "label": label,
+            "confidence": confidence,
+            "track_id": track_id,
+            "bbox": [int(x1), int(y1), int(x2), int(y2)],
+            "position_3d": {"x": float(P_world[0]), "y": float(P_world[1]), "z": float(P_world[2])},
+            "frame_path": frame_path,
+        })
+    return detections
+
+
+def columnar(xyxy, conf, cls, tids, names, img_w, img_h, center_depth, pose, frame_path):
+    labels = [names.get(c, str(c)) for c in cls.tolist()]
+    positions = back_project(xyxy, img_w, img_h, center_depth, pose)
+    return Detections(xyxy, conf, tids, positions, labels, frame_path)
+
+
+def timeit(fn, iterations: int, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(*args)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detections", type=int, default=int(os.getenv("SPATIAL_MAX_DETECTIONS", "30")))
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n, img_w, img_h, depth = args.detections, 1280, 720, 1.5
+    x1 = rng.uniform(0, img_w - 100, n)
+    y1 = rng.uniform(0, img_h - 100, n)
+    xyxy = np.stack([x1, y1, x1 + rng.uniform(20, 100, n), y1 + rng.uniform(20, 100, n)], axis=1).astype(np.float32)
+    conf = rng.uniform(0.35, 0.99, n).astype(np.float32)
+    cls = rng.integers(0, 80, n).astype(np.int64)
+    tids = np.arange(1, n + 1, dtype=np.int64)
+    names = {i: f"class_{i}" for i in range(80)}
+    pose = np.eye(4)
+    pose[:3, :3] = np.array([[0.0, -1.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+    boxes = [_Box(xyxy[i], conf[i], cls[i], tids[i]) for i in range(n)]
+
+    legacy = per_box(boxes, names, img_w, img_h, depth, pose, "f.jpg")
+    fast = columnar(xyxy, conf, cls, tids, names, img_w, img_h, depth, pose, "f.jpg").to_dicts()
+    for a, b in zip(legacy, fast):
+        assert a["bbox"] == b["bbox"] and a["track_id"] == b["track_id"]
+        assert all(abs(a["position_3d"][k] - b["position_3d"][k]) < 1e-9 for k in "xyz")
+
+    t_loop = timeit(per_box, args.iterations, boxes, names, img_w, img_h, depth, pose, "f.jpg")
+    t_cols = timeit(columnar, args.iterations, xyxy, conf, cls, tids, names, img_w, img_h, depth, pose, "f.jpg")
+    t_dicts = timeit(
+        lambda: columnar(xyxy, conf, cls, tids, names, img_w, img_h, depth, pose, "f.jpg").to_dicts(),
+        args.iterations,
+    )
+    print(f"{n} detections/frame")
+    print(f"  per-box   {t_loop:8.1f} us/frame")
+    print(f"  columnar  {t_cols:8.1f} us/frame  ({t_loop / t_cols:.1f}x)")
+    print(f"  +dicts    {t_dicts:8.1f} us/frame  ({t_loop / t_dicts:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
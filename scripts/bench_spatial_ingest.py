@@ -0,0 +1,78 @@
+"""
+Spatial memory ingest throughput: observations/sec through
+SpatialMemory.add_observations at several batch sizes (one batched encode and
+one Chroma add per batch), each into a fresh temporary Chroma directory.
+
+    python scripts/bench_spatial_ingest.py [--observations 512] [--batch-size 1 --batch-size 32]
+
+Batch size 1 is the old per-object add_observation path. The probe pipeline
+batches through the ingest buffer (SPATIAL_MEMORY_INGEST_BATCH, default 32).
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.embedding_cache import EmbeddingCache  # noqa: E402
+from services.spatial_memory import SpatialMemory, _get_encoder  # noqa: E402
+
+NAMES = ["silver laptop", "coffee mug", "office chair", "desk lamp", "backpack", "water bottle", "monitor", "keyboard"]
+DETAILS = ["on the desk", "near the window", "by the door", "on the floor", "left of the shelf", "under the table"]
+
+
+def synthetic_observations(n: int):
+    observations = []
+    for i in range(n):
+        name, details = NAMES[i % len(NAMES)], DETAILS[(i // len(NAMES)) % len(DETAILS)]
+        meta = {
+            "scan_id": f"bench_{i % 4}",
+            "frame_path": f"data/frames/bench/frame_{i:08x}.jpg",
+            "timestamp": 1_700_000_000.0 + i * 0.1,
+            "bbox": [10, 20, 110, 220],
+            "track_id": i % 50,
+            "yolo_label": name.split()[-1],
+            "confidence": 0.8,
+            "position_3d": {"x": i * 0.01, "y": 0.0, "z": 1.5},
+            "source": "bench",
+        }
+        observations.append((f"{name} {details} #{i}", meta))
+    return observations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--observations", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, action="append", help="repeatable (default: 1 8 32 128)")
+    args = parser.parse_args()
+
+    if _get_encoder() is None:
+        print("SentenceTransformer is required (pip install sentence-transformers).")
+        return
+    observations = synthetic_observations(args.observations)
+    baseline = None
+    for batch_size in args.batch_size or [1, 8, 32, 128]:
+        persist_dir = tempfile.mkdtemp(prefix="bench_chroma_")
+        try:
+            memory = SpatialMemory(persist_dir=persist_dir)
+            memory.embedding_cache = EmbeddingCache(0)  # measure encoding, not cache hits
+            if not memory.is_ready():
+                print("ChromaDB is required (pip install chromadb).")
+                return
+            memory.add_observations(observations[:1])  # warm-up: collection + encoder
+            started = time.perf_counter()
+            for i in range(0, len(observations), batch_size):
+                memory.add_observations(observations[i:i + batch_size])
+            elapsed = time.perf_counter() - started
+        finally:
+            shutil.rmtree(persist_dir, ignore_errors=True)
+        rate = len(observations) / elapsed
+        baseline = baseline or rate
+        print(f"batch {batch_size:4d}: {rate:9.1f} obs/s  {elapsed / len(observations) * 1000:7.2f} ms/obs"
+              f"  ({rate / baseline:.1f}x batch {args.batch_size[0] if args.batch_size else 1})")
+
+
+if __name__ == "__main__":
+    main()
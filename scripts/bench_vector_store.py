@@ -0,0 +1,141 @@
+"""
+Compare SpatialMemory vector-store backends: add throughput, search latency
+(unfiltered and scan-filtered) and process RSS at several collection sizes.
+
+    python scripts/bench_vector_store.py [--size 10000 --size 100000 --size 1000000] [--backend faiss]
+
+Each (backend, size) runs in a fresh subprocess against a temporary directory
+so RSS is not shared between runs. Vectors are random unit vectors of the
+SentenceTransformer size (384) with observation-like metadata; no encoder is
+loaded. The faiss backend switches from NumPy brute force to HNSW at
+SPATIAL_VECTOR_HNSW_MIN and to IVF at SPATIAL_VECTOR_IVF_MIN.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.vector_store import VECTOR_STORE_BACKENDS, create_vector_store  # noqa: E402
+
+DIM = 384
+BATCH = 1000
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _batch(rng, start: int, n: int):
+    vectors = rng.normal(size=(n, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"obs_bench_{start + i}" for i in range(n)]
+    docs = [f"object {(start + i) % 80} details {start + i}" for i in range(n)]
+    metas = [
+        {
+            "scan_id": f"scan_{(start + i) % 20}",
+            "timestamp": 1_700_000_000.0 + start + i,
+            "yolo_label": f"class_{(start + i) % 80}",
+            "confidence": ((start + i) % 100) / 100.0,
+            "source": f"probe_{(start + i) % 4}",
+        }
+        for i in range(n)
+    ]
+    return ids, vectors, docs, metas
+
+
+def _percentiles(samples):
+    samples = np.asarray(samples) * 1000.0
+    return round(float(np.percentile(samples, 50)), 3), round(float(np.percentile(samples, 95)), 3)
+
+
+def run_one(backend: str, size: int, queries: int) -> dict:
+    root = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+    try:
+        rss_start = _rss_mb()
+        store = create_vector_store(backend, root)
+        if store is None:
+            return {"backend": backend, "size": size, "error": "backend not available"}
+        rng = np.random.default_rng(0)
+        add_s = 0.0
+        for start in range(0, size, BATCH):
+            ids, vectors, docs, metas = _batch(rng, start, min(BATCH, size - start))
+            started = time.perf_counter()
+            store.add(ids, vectors, docs, metas)
+            add_s += time.perf_counter() - started
+
+        probes = rng.normal(size=(queries, DIM)).astype(np.float32)
+        probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+        unfiltered, filtered = [], []
+        for q in probes:
+            started = time.perf_counter()
+            store.query(q, 10)
+            unfiltered.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            store.query(q, 10, {"scan_id": {"$eq": "scan_3"}})
+            filtered.append(time.perf_counter() - started)
+        return {
+            "backend": backend,
+            "size": size,
+            "add_per_sec": round(size / add_s, 1),
+            "search_p50_p95_ms": _percentiles(unfiltered),
+            "filtered_p50_p95_ms": _percentiles(filtered),
+            "rss_mb": round(_rss_mb() - rss_start, 1),
+            "store": store.stats(),
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, action="append", help="repeatable (default: 10000 100000 1000000)")
+    parser.add_argument("--backend", action="append", choices=VECTOR_STORE_BACKENDS, help="repeatable (default: all)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--one", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_one(args.backend[0], args.size[0], args.queries)))
+        return
+
+    for size in args.size or [10_000, 100_000, 1_000_000]:
+        for backend in args.backend or VECTOR_STORE_BACKENDS:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--one", "--backend", backend,
+                 "--size", str(size), "--queries", str(args.queries)],
+                capture_output=True, text=True,
+            )
+            lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+            if proc.returncode != 0 or not lines:
+                print(f"{backend:7s} {size:>9d}  failed: {(proc.stderr or proc.stdout).strip()[-300:]}")
+                continue
+            r = json.loads(lines[-1])
+            if "error" in r:
+                print(f"{backend:7s} {size:>9d}  {r['error']}")
+                continue
+            print(
+                f"{backend:7s} {size:>9d}  add {r['add_per_sec']:>9.0f}/s"
+                f"  search p50/p95 {r['search_p50_p95_ms'][0]:7.2f}/{r['search_p50_p95_ms'][1]:7.2f} ms"
+                f"  filtered {r['filtered_p50_p95_ms'][0]:7.2f}/{r['filtered_p50_p95_ms'][1]:7.2f} ms"
+                f"  rss +{r['rss_mb']:.0f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
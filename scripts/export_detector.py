@@ -0,0 +1,46 @@
+"""
+Export a YOLOv8 checkpoint to ONNX for the onnx/openvino detector backends,
+optionally with an INT8 (dynamic, weight-only) quantized copy.
+
+    python scripts/export_detector.py yolov8n.pt [--imgsz 640] [--dynamic] [--int8]
+
+Then run the server with e.g.
+    SPATIAL_DETECTOR_BACKEND=onnx SPATIAL_DETECTOR_MODEL=yolov8n_int8.onnx
+"""
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("weights", nargs="?", default="yolov8n.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--dynamic", action="store_true", help="dynamic batch axis (lets the scheduler batch)")
+    parser.add_argument("--int8", action="store_true", help="also write an INT8-quantized <name>_int8.onnx")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    onnx_path = YOLO(args.weights).export(format="onnx", imgsz=args.imgsz, dynamic=args.dynamic, simplify=True)
+    print(f"✅ Exported {onnx_path}")
+
+    if args.int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.splitext(onnx_path)[0] + "_int8.onnx"
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+
+        # Keep the class names (stored as model metadata) on the quantized copy.
+        import onnx
+
+        source, quantized = onnx.load(onnx_path), onnx.load(int8_path)
+        existing = {p.key for p in quantized.metadata_props}
+        for prop in source.metadata_props:
+            if prop.key not in existing:
+                quantized.metadata_props.add(key=prop.key, value=prop.value)
+        onnx.save(quantized, int8_path)
+        print(f"✅ Quantized {int8_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+TTL cache with single-flight coalescing for /spatial/query answers.
+
+An answer depends only on the question and the observations it was given, so
+entries are keyed by (normalized query, result ids, scan_id, memory
+generation). SpatialMemory bumps a scan's generation whenever observations for
+it are written (entities keep their id when merged), so new observations make
+older answers for that scan unreachable; they age out by TTL or LRU.
+Concurrent identical queries share one in-flight Gemini call.
+
+  SPATIAL_ANSWER_CACHE_TTL   seconds an answer is reused (default 300)
+  SPATIAL_ANSWER_CACHE_SIZE  number of cached answers (default 512, 0 disables)
+"""
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def _int_env(name: str, default: int, minimum: int = 0) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        return default
+
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the question."""
+    return _SPACE_RE.sub(" ", (query or "").casefold()).strip().rstrip("?.!").strip()
+
+
+class AnswerCache:
+    def __init__(self, capacity: int, ttl: float):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, Tuple[float, dict]]" = OrderedDict()  # key -> (expires_at, answer)
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(query: str, result_ids: List[str], scan_id: Optional[str], generation: int) -> tuple:
+        return normalize_query(query), tuple(result_ids), scan_id or None, generation
+
+    def _lookup(self, key: tuple) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key: tuple, answer: dict):
+        self._entries[key] = (time.monotonic() + self.ttl, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: tuple, compute: Callable[[], Awaitable[dict]]) -> Tuple[dict, str]:
+        """(answer, "hit" | "coalesced" | "miss"). Only answers without an "error" are cached."""
+        if self.capacity <= 0:
+            self.misses += 1
+            return await compute(), "miss"
+        cached = self._lookup(key)
+        if cached is not None:
+            self.hits += 1
+            return cached, "hit"
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                answer = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # this request was cancelled, not the one it waited on
+                return await self.get_or_compute(key, compute)
+            self.coalesced += 1
+            return answer, "coalesced"
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            answer = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn if there were none
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        if "error" not in answer:
+            self._store(key, answer)
+        future.set_result(answer)
+        return answer, "miss"
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "ttl_sec": self.ttl,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "inflight": len(self._inflight),
+        }
+
+
+_answer_cache = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """Process-wide answer cache (lazily created so env config is read at first use)."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache(
+            _int_env("SPATIAL_ANSWER_CACHE_SIZE", 512),
+            float(_int_env("SPATIAL_ANSWER_CACHE_TTL", 300)),
+        )
+    return _answer_cache
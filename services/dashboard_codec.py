@@ -0,0 +1,96 @@
+"""
+Wire encodings for dashboard streams, negotiated per dashboard with
+`/ws/dashboard/{client_id}?encoding=json|orjson|msgpack` (default json).
+
+  json     stdlib json, text frames (what the bundled frontends expect)
+  orjson   same JSON document via orjson, text frames
+  msgpack  binary frames; detection payloads use a columnar layout where
+           per-object numbers are packed little-endian arrays:
+             {"keys": [...], "label": [...], "yolo_label": [...],
+              "track_id": <int32[N]>, "confidence": <float32[N]>,
+              "xyz": <float32[N*3]>}                  (state vectors, upserts)
+             {..., "details": [...], "bbox": <int32[N*4]>}   (objects)
+           and the message carries "layout": "columnar".
+
+orjson / msgpack are optional; a missing package falls back to json.
+"""
+import json
+from typing import Dict, Union
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+ENCODINGS = ("json", "orjson", "msgpack")
+
+_warned = set()
+
+
+def resolve_encoding(name: str) -> str:
+    """Map a requested encoding to one that is available here (json as the fallback)."""
+    name = (name or "json").lower()
+    available = name == "json" or (name == "orjson" and orjson is not None) or (name == "msgpack" and msgpack is not None)
+    if name in ENCODINGS and available:
+        return name
+    if name not in _warned:
+        _warned.add(name)
+        print(f"⚠️ Dashboard encoding '{name}' not available, using json")
+    return "json"
+
+
+def _columnar_vectors(vectors: Dict[str, dict]) -> dict:
+    items = list(vectors.values())
+    return {
+        "keys": list(vectors.keys()),
+        "label": [v.get("label") for v in items],
+        "yolo_label": [v.get("yolo_label") for v in items],
+        "track_id": np.array([v.get("track_id", -1) for v in items], dtype="<i4").tobytes(),
+        "confidence": np.array([v.get("confidence", 0.0) for v in items], dtype="<f4").tobytes(),
+        "xyz": np.array([(v.get("x", 0.0), v.get("y", 0.0), v.get("z", 0.0)) for v in items], dtype="<f4").tobytes(),
+    }
+
+
+def _columnar_objects(objects: list) -> dict:
+    positions = [o.get("position") or {} for o in objects]
+    return {
+        "label": [o.get("label") for o in objects],
+        "yolo_label": [o.get("yolo_label") for o in objects],
+        "details": [o.get("details", "") for o in objects],
+        "track_id": np.array([o.get("track_id", -1) for o in objects], dtype="<i4").tobytes(),
+        "confidence": np.array([o.get("confidence", 0.0) for o in objects], dtype="<f4").tobytes(),
+        "bbox": np.array([o.get("bbox") or (0, 0, 0, 0) for o in objects], dtype="<i4").tobytes(),
+        "xyz": np.array([(p.get("x", 0.0), p.get("y", 0.0), p.get("z", 0.0)) for p in positions], dtype="<f4").tobytes(),
+    }
+
+
+def to_columnar(message: dict) -> dict:
+    """Columnar copy of a detection / delta / keyframe message (other messages unchanged)."""
+    out = dict(message)
+    changed = False
+    for field in ("state_vector", "upserts"):
+        if isinstance(out.get(field), dict):
+            out[field] = _columnar_vectors(out[field])
+            changed = True
+    if isinstance(out.get("objects"), list):
+        out["objects"] = _columnar_objects(out["objects"])
+        changed = True
+    if changed:
+        out["layout"] = "columnar"
+    return out
+
+
+def encode(message: dict, encoding: str = "json") -> Union[str, bytes]:
+    """Serialize for the wire: str for JSON encodings (text frames), bytes for msgpack."""
+    if encoding == "msgpack" and msgpack is not None:
+        return msgpack.packb(to_columnar(message), use_bin_type=True)
+    if encoding == "orjson" and orjson is not None:
+        return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(message)
@@ -0,0 +1,226 @@
+"""
+Delta encoding of dashboard `detection` broadcasts.
+
+The server keeps the state it last published per scan (object key → vector)
+and turns every full `detection` message into a `detection_delta` carrying
+only upserted and removed keys, with a `detection_keyframe` (the whole state)
+every SPATIAL_DELTA_KEYFRAME_INTERVAL versions. Objects linger for
+SPATIAL_DELTA_LINGER_SEC after they were last detected, like the dashboard's
+own persistence buffer, so YOLO flicker and stride-skipped frames do not
+produce remove/add churn.
+
+Client contract: apply a delta only if its `base` equals the version you hold
+for that scan; otherwise send {"type": "resync", "scan_id": ...}.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from services.dashboard_codec import encode
+
+DELTA_EPSILON = float(os.getenv("SPATIAL_DELTA_EPSILON", "0.02"))
+DELTA_CONF_EPSILON = float(os.getenv("SPATIAL_DELTA_CONF_EPSILON", "0.05"))
+DELTA_KEYFRAME_INTERVAL = int(os.getenv("SPATIAL_DELTA_KEYFRAME_INTERVAL", "50"))
+DELTA_LINGER_SEC = float(os.getenv("SPATIAL_DELTA_LINGER_SEC", "1.8"))
+
+
+def filter_min_confidence(message: dict, min_confidence: float) -> dict:
+    """
+    Copy of a detection / delta / keyframe message without objects below
+    `min_confidence`. Delta upserts that fall below it become removals, so a
+    filtered client's state stays consistent with the unfiltered stream.
+    """
+    if min_confidence <= 0:
+        return message
+    out = dict(message)
+    if isinstance(out.get("objects"), list):
+        out["objects"] = [o for o in out["objects"] if float(o.get("confidence", 0.0)) >= min_confidence]
+    if isinstance(out.get("state_vector"), dict):
+        out["state_vector"] = {
+            k: v for k, v in out["state_vector"].items() if float(v.get("confidence", 0.0)) >= min_confidence
+        }
+    if isinstance(out.get("upserts"), dict):
+        upserts, removed = {}, list(out.get("removed") or ())
+        for k, v in out["upserts"].items():
+            if float(v.get("confidence", 0.0)) >= min_confidence:
+                upserts[k] = v
+            else:
+                removed.append(k)
+        out["upserts"], out["removed"] = upserts, removed
+    return out
+
+
+def _object_key(obj: dict) -> tuple:
+    label = obj.get("yolo_label") or obj.get("label")
+    track_id = obj.get("track_id", -1)
+    if track_id is not None and track_id >= 0:
+        return (label, track_id)
+    return (label, tuple(obj.get("bbox") or ()))
+
+
+def merge_detections(older: dict, newer: dict) -> dict:
+    """
+    Fold two `detection` messages of one scan into one: header fields from the
+    newer message, latest state/object per key from both, Gemini objects of both.
+    """
+    merged = dict(newer)
+    state_vector = dict(older.get("state_vector") or {})
+    state_vector.update(newer.get("state_vector") or {})
+    merged["state_vector"] = state_vector
+    objects = {_object_key(o): o for o in older.get("objects") or ()}
+    objects.update((_object_key(o), o) for o in newer.get("objects") or ())
+    merged["objects"] = list(objects.values())
+    merged["gemini_objects"] = list(older.get("gemini_objects") or ()) + list(newer.get("gemini_objects") or ())
+    merged["merged_frames"] = older.get("merged_frames", 1) + newer.get("merged_frames", 1)
+    return merged
+
+
+def _changed(old: dict, new: dict, epsilon: float, conf_epsilon: float) -> bool:
+    for axis in ("x", "y", "z"):
+        if abs(float(new.get(axis, 0.0)) - float(old.get(axis, 0.0))) > epsilon:
+            return True
+    if abs(float(new.get("confidence", 0.0)) - float(old.get("confidence", 0.0))) > conf_epsilon:
+        return True
+    return (
+        new.get("label") != old.get("label")
+        or new.get("yolo_label") != old.get("yolo_label")
+        or new.get("track_id") != old.get("track_id")
+    )
+
+
+class _ScanState:
+    __slots__ = ("objects", "last_seen", "version", "since_keyframe", "source", "header", "keyframe_cache")
+
+    def __init__(self):
+        self.objects: Dict[str, dict] = {}
+        self.last_seen: Dict[str, float] = {}
+        self.version = 0
+        self.since_keyframe = 0
+        self.source = None
+        self.header: dict = {}
+        # (version, message, {(encoding, min_confidence): payload})
+        self.keyframe_cache: Optional[Tuple[int, dict, dict]] = None
+
+
+class DetectionDeltaEncoder:
+    """Per-scan published state; keyframes are serialized once per version and client view."""
+
+    def __init__(
+        self,
+        epsilon: float = DELTA_EPSILON,
+        conf_epsilon: float = DELTA_CONF_EPSILON,
+        keyframe_interval: int = DELTA_KEYFRAME_INTERVAL,
+        linger_sec: float = DELTA_LINGER_SEC,
+    ):
+        self.epsilon = epsilon
+        self.conf_epsilon = conf_epsilon
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.linger_sec = linger_sec
+        self._scans: Dict[str, _ScanState] = {}
+        self._lock = threading.Lock()
+        self.deltas = 0
+        self.keyframes = 0
+        self.upserts = 0
+        self.removals = 0
+
+    def update(self, message: dict, now: Optional[float] = None) -> Tuple[str, dict]:
+        """
+        Fold one full `detection` message into the scan state.
+        Returns ("delta" | "keyframe", message); keyframes are periodic.
+        """
+        now = time.monotonic() if now is None else now
+        scan_id = message.get("scan_id")
+        with self._lock:
+            state = self._scans.setdefault(scan_id, _ScanState())
+            upserts: Dict[str, dict] = {}
+            for key, vec in (message.get("state_vector") or {}).items():
+                old = state.objects.get(key)
+                if old is None or _changed(old, vec, self.epsilon, self.conf_epsilon):
+                    state.objects[key] = vec
+                    upserts[key] = vec
+                state.last_seen[key] = now
+
+            removed: List[str] = [k for k, seen in state.last_seen.items() if now - seen > self.linger_sec]
+            for key in removed:
+                state.objects.pop(key, None)
+                state.last_seen.pop(key, None)
+
+            state.version += 1
+            state.since_keyframe += 1
+            state.source = message.get("source")
+            state.header = {
+                "frame_number": message.get("frame_number"),
+                "pose": message.get("pose"),
+                "timestamp": message.get("timestamp"),
+            }
+            self.upserts += len(upserts)
+            self.removals += len(removed)
+
+            if state.since_keyframe >= self.keyframe_interval:
+                return "keyframe", self._keyframe(scan_id, state)[1]
+
+            self.deltas += 1
+            delta = {
+                "type": "detection_delta",
+                "source": state.source,
+                "scan_id": scan_id,
+                "version": state.version,
+                "base": state.version - 1,
+                **state.header,
+                "upserts": upserts,
+                "removed": removed,
+                "objects_found": len(message.get("objects") or ()),
+                "log": message.get("log"),
+            }
+            if message.get("gemini_objects"):
+                delta["gemini_objects"] = message["gemini_objects"]
+            return "delta", delta
+
+    def _keyframe(self, scan_id: str, state: _ScanState) -> Tuple[int, dict, dict]:
+        if state.keyframe_cache is None or state.keyframe_cache[0] != state.version:
+            state.since_keyframe = 0
+            self.keyframes += 1
+            state.keyframe_cache = (state.version, {
+                "type": "detection_keyframe",
+                "source": state.source,
+                "scan_id": scan_id,
+                "version": state.version,
+                **state.header,
+                "state_vector": dict(state.objects),
+            }, {})
+        return state.keyframe_cache
+
+    def keyframe(self, scan_id: str, encoding: str = "json", min_confidence: float = 0.0) -> Optional[Union[str, bytes]]:
+        """Encoded full state of a scan at its current version (cached); None if unknown."""
+        with self._lock:
+            state = self._scans.get(scan_id)
+            if state is None:
+                return None
+            _, message, payloads = self._keyframe(scan_id, state)
+            view = (encoding, min_confidence)
+            if view not in payloads:
+                payloads[view] = encode(filter_min_confidence(message, min_confidence), encoding)
+            return payloads[view]
+
+    def scan_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._scans)
+
+    def forget(self, scan_id: Optional[str] = None):
+        """Drop the published state of one scan (or all)."""
+        with self._lock:
+            if scan_id is None:
+                self._scans.clear()
+            else:
+                self._scans.pop(scan_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "scans": len(self._scans),
+                "deltas": self.deltas,
+                "keyframes": self.keyframes,
+                "upserts": self.upserts,
+                "removals": self.removals,
+            }
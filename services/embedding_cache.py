@@ -0,0 +1,160 @@
+"""
+Content-addressed cache of sentence embeddings.
+
+Observation texts repeat constantly (the same object every Gemini stride) and
+so do queries. Texts are keyed by a BLAKE2 hash of (model, text) and their
+vectors live in a fixed (capacity x dim) float32 matrix with LRU slot reuse.
+
+  SPATIAL_EMBED_CACHE_SIZE  number of cached vectors (default 8192, 0 disables)
+  SPATIAL_EMBED_CACHE_PATH  optional .npy path; the matrix and its keys are then
+                            memory-mapped files that survive restarts
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def _int_env(name: str, default: int, minimum: int = 0) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        return default
+
+
+class EmbeddingCache:
+    def __init__(self, capacity: int, namespace: str = "", path: Optional[str] = None):
+        self.capacity = capacity
+        self.namespace = namespace.encode("utf-8") + b"\0"
+        self.path = path or None
+        self._slots: "OrderedDict[bytes, int]" = OrderedDict()  # key -> row, least recently used first
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.path and capacity > 0:
+            self._load()
+
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(self.namespace + text.encode("utf-8"), digest_size=16).digest()
+
+    def _keys_path(self) -> str:
+        return (self.path[:-4] if self.path.endswith(".npy") else self.path) + ".keys.npy"
+
+    def _load(self):
+        """Reopen a persisted cache of the same capacity; anything else starts empty."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            vectors = np.lib.format.open_memmap(self.path, mode="r+")
+            keys = np.lib.format.open_memmap(self._keys_path(), mode="r+")
+            if vectors.dtype != np.float32 or vectors.shape[0] != self.capacity or keys.shape != (self.capacity,):
+                raise ValueError(f"shape {vectors.shape} does not match capacity {self.capacity}")
+        except Exception as e:
+            print(f"⚠️ Embedding cache at {self.path} unusable ({e}); starting empty.")
+            return
+        for row, key in enumerate(keys.tolist()):
+            if key:  # numpy strips trailing NULs from "S16" values
+                self._slots[key.ljust(16, b"\0")] = row
+        self._vectors, self._keys = vectors, keys
+        print(f"✅ Embedding cache loaded {len(self._slots)} vectors from {self.path}")
+
+    def _allocate(self, dim: int):
+        """Create the vector matrix once the embedding size is known."""
+        shape = (self.capacity, dim)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._vectors = np.lib.format.open_memmap(self.path, mode="w+", dtype=np.float32, shape=shape)
+            self._keys = np.lib.format.open_memmap(self._keys_path(), mode="w+", dtype="S16", shape=(self.capacity,))
+        else:
+            self._vectors = np.zeros(shape, dtype=np.float32)
+
+    def _put(self, key: bytes, vector: np.ndarray):
+        if self._vectors is None or self._vectors.shape[1] != vector.shape[-1]:
+            self._slots.clear()
+            self._allocate(vector.shape[-1])
+        row = self._slots.pop(key, None)
+        if row is None:
+            if len(self._slots) < self.capacity:
+                row = len(self._slots)
+            else:
+                _, row = self._slots.popitem(last=False)
+                self.evictions += 1
+        self._slots[key] = row
+        self._vectors[row] = vector
+        if self._keys is not None:
+            self._keys[row] = key
+
+    def encode(self, encoder, texts: List[str]) -> np.ndarray:
+        """Embeddings for `texts` (n x dim float32); only cache misses reach the encoder, in one batch."""
+        if self.capacity <= 0:
+            self.misses += len(texts)
+            return np.asarray(encoder.encode(texts, batch_size=max(len(texts), 1)), dtype=np.float32)
+
+        keys = [self.key(text) for text in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                row = self._slots.get(key)
+                if row is not None and key not in found:
+                    self._slots.move_to_end(key)
+                    found[key] = self._vectors[row].copy()
+
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            encoded = np.asarray(
+                encoder.encode(list(missing.values()), batch_size=max(len(missing), 1)), dtype=np.float32
+            )
+            with self._lock:
+                for key, vector in zip(missing, encoded):
+                    self._put(key, vector)
+                    found[key] = vector
+        return np.stack([found[key] for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+
+    def flush(self):
+        with self._lock:
+            for array in (self._vectors, self._keys):
+                if isinstance(array, np.memmap):
+                    array.flush()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._slots),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "persisted": self.path,
+        }
+
+
+_embedding_cache = None
+
+
+def get_embedding_cache(namespace: str = "") -> EmbeddingCache:
+    """Process-wide embedding cache (lazily created so env config is read at first use)."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            _int_env("SPATIAL_EMBED_CACHE_SIZE", 8192),
+            namespace=namespace,
+            path=os.getenv("SPATIAL_EMBED_CACHE_PATH") or None,
+        )
+    return _embedding_cache
@@ -0,0 +1,202 @@
+"""
+Publish/subscribe between the worker processes serving probes and dashboards.
+
+A probe is served by whichever worker accepted its socket, but its broadcasts
+must reach dashboards connected to every worker. ConnectionManager publishes
+on the bus and each worker delivers what it receives to its own dashboards.
+
+  inprocess  (default) loopback only; a single worker, as before
+  sqlite     a shared WAL-mode SQLite table polled by every worker; works
+             across processes on one host (or hosts sharing the file)
+
+Selected with SPATIAL_EVENT_BUS; SPATIAL_EVENT_BUS_PATH sets the SQLite file.
+"""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class EventBus:
+    """Handlers run on the subscribing worker's event loop, for its own and other workers' messages."""
+
+    name = "base"
+
+    def __init__(self):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._handlers: Dict[str, List[Handler]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.errors = 0
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def publish(self, channel: str, message: dict):
+        raise NotImplementedError
+
+    async def _dispatch(self, channel: str, message: dict):
+        for handler in self._handlers.get(channel, ()):
+            try:
+                await handler(message)
+                self.delivered += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Event bus handler failed on '{channel}': {e}")
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "origin": self.origin,
+            "published": self.published,
+            "delivered": self.delivered,
+            "errors": self.errors,
+        }
+
+
+class InProcessBus(EventBus):
+    name = "inprocess"
+
+    async def publish(self, channel: str, message: dict):
+        self.published += 1
+        await self._dispatch(channel, message)
+
+
+class SqliteBus(EventBus):
+    """
+    Messages are appended to an `events` table; every worker polls for rows
+    newer than the last one it saw. Local subscribers get their own messages
+    immediately, without the round trip. Rows older than `retention_sec` are
+    pruned. SQLite calls run on one dedicated thread, never on the loop.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = "data/bus.sqlite3", poll_interval: float = 0.02, retention_sec: float = 60.0):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_sec = retention_sec
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="event-bus")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_id = 0
+        self._last_prune = 0.0
+        self._poller: Optional[asyncio.Task] = None
+        self.received = 0
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, origin TEXT NOT NULL, "
+            "payload TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.commit()
+        self._conn = conn
+        # Start from the current tail: history is not replayed to a new worker.
+        self._last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def _insert(self, channel: str, payload: str):
+        self._conn.execute(
+            "INSERT INTO events (channel, origin, payload, created_at) VALUES (?, ?, ?, ?)",
+            (channel, self.origin, payload, time.time()),
+        )
+        self._conn.commit()
+
+    def _fetch(self) -> list:
+        rows = self._conn.execute(
+            "SELECT id, channel, origin, payload FROM events WHERE id > ? ORDER BY id LIMIT 500",
+            (self._last_id,),
+        ).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        now = time.time()
+        if now - self._last_prune > self.retention_sec:
+            self._last_prune = now
+            self._conn.execute("DELETE FROM events WHERE created_at < ?", (now - self.retention_sec,))
+            self._conn.commit()
+        return rows
+
+    async def start(self):
+        if self._poller is not None:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._connect)
+        self._poller = asyncio.create_task(self._poll())
+        print(f"✅ SQLite event bus at {self.path} ({self.origin})")
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                rows = await loop.run_in_executor(self._executor, self._fetch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Event bus poll failed: {e}")
+                rows = []
+            for _, channel, origin, payload in rows:
+                if origin == self.origin:
+                    continue
+                self.received += 1
+                await self._dispatch(channel, json.loads(payload))
+            if len(rows) < 500:
+                await asyncio.sleep(self.poll_interval)
+
+    async def publish(self, channel: str, message: dict):
+        if self._poller is None:
+            await self.start()
+        self.published += 1
+        payload = json.dumps(message)
+        loop = asyncio.get_running_loop()
+        await self._dispatch(channel, message)
+        try:
+            await loop.run_in_executor(self._executor, self._insert, channel, payload)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Event bus publish failed: {e}")
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await asyncio.get_running_loop().run_in_executor(self._executor, conn.close)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update({"path": self.path, "received": self.received, "last_id": self._last_id})
+        return stats
+
+
+EVENT_BUS_BACKENDS = ("inprocess", "sqlite")
+
+
+def create_event_bus(backend: Optional[str] = None) -> EventBus:
+    backend = (backend or os.getenv("SPATIAL_EVENT_BUS", "inprocess")).lower()
+    if backend == "sqlite":
+        return SqliteBus(
+            os.getenv("SPATIAL_EVENT_BUS_PATH", "data/bus.sqlite3"),
+            poll_interval=float(os.getenv("SPATIAL_EVENT_BUS_POLL_MS", "20")) / 1000.0,
+        )
+    if backend != "inprocess":
+        print(f"⚠️ Unknown event bus '{backend}', using inprocess. Options: {', '.join(EVENT_BUS_BACKENDS)}")
+    return InProcessBus()
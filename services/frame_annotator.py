@@ -2,17 +2,22 @@ import cv2
 import numpy as np
 import os
 
-def annotate_frame(frame_path: str, bbox: list, label: str, distance: float = None):
+def annotate_frame(frame_path: str, bbox: list, label: str, distance: float = None, image: np.ndarray = None):
     """
     Draw a red bounding box and label on a frame.
+    Pass `image` (e.g. `Frame.array`) to reuse an already decoded frame instead
+    of reading it back from disk; it is copied, not modified.
     Returns the path to the NEW annotated image.
     """
-    if not os.path.exists(frame_path):
-        return None
-        
-    img = cv2.imread(frame_path)
-    if img is None:
-        return None
+    if image is not None:
+        img = image.copy()
+    else:
+        if not os.path.exists(frame_path):
+            return None
+
+        img = cv2.imread(frame_path)
+        if img is None:
+            return None
         
     x1, y1, x2, y2 = map(int, bbox)
     
@@ -0,0 +1,412 @@
+import asyncio
+import os
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+def _int_env(name: str, default: int, minimum: int = 1) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        return default
+
+
+class StageStats:
+    """Rolling counters for a single pipeline stage."""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.processed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.in_flight = 0
+        self.avg_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.avg_wait_ms = 0.0
+
+    def record(self, wait_ms: float, latency_ms: float):
+        self.processed += 1
+        if self.processed == 1:
+            self.avg_latency_ms = latency_ms
+            self.avg_wait_ms = wait_ms
+        else:
+            self.avg_latency_ms += self.alpha * (latency_ms - self.avg_latency_ms)
+            self.avg_wait_ms += self.alpha * (wait_ms - self.avg_wait_ms)
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+
+class _Reorder:
+    """
+    Per-stream reorder buffer in front of an ordered stage.
+
+    Jobs of a stream are numbered 1, 2, 3, ... and are released strictly in that
+    order; a number whose job left the pipeline early is skipped. Streams are
+    held weakly, so a stream's state goes away with its last job.
+    """
+
+    def __init__(self):
+        self._streams: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()  # stream -> [next seq, {seq: item}]
+        self.held = 0
+
+    def _state(self, stream) -> list:
+        state = self._streams.get(stream)
+        if state is None:
+            state = self._streams[stream] = [1, {}]
+        return state
+
+    def _release(self, state: list) -> list:
+        ready = []
+        waiting = state[1]
+        while state[0] in waiting:
+            item = waiting.pop(state[0])
+            state[0] += 1
+            if item is not None:
+                self.held -= 1
+                ready.append(item)
+        return ready
+
+    def arrive(self, stream, seq: int, item) -> list:
+        """Items (this one and any it unblocks) that may enter the stage now, in order."""
+        state = self._state(stream)
+        if seq < state[0]:
+            return [item]  # numbered before the stream was first seen; nothing to order against
+        state[1][seq] = item
+        self.held += 1
+        return self._release(state)
+
+    def skip(self, stream, seq: int) -> list:
+        state = self._state(stream)
+        if seq < state[0] or seq in state[1]:
+            return []
+        state[1][seq] = None
+        return self._release(state)
+
+
+class PipelineStage:
+    """
+    One step of the frame pipeline.
+    `handler(job)` may be a coroutine function (awaited on the event loop) or a
+    plain function (run on `executor`). Returning None drops the job.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable,
+        executor: Optional[ThreadPoolExecutor] = None,
+        maxsize: int = 8,
+        workers: int = 1,
+        ordered: bool = False,
+    ):
+        self.name = name
+        self.handler = handler
+        self.executor = executor
+        self.maxsize = maxsize
+        # An ordered stage runs one job at a time, in per-stream sequence order.
+        self.workers = 1 if ordered else workers
+        self.reorder = _Reorder() if ordered else None
+        self.queue: Optional[asyncio.Queue] = None
+        self.stats = StageStats()
+
+    async def run(self, job):
+        if asyncio.iscoroutinefunction(self.handler):
+            return await self.handler(job)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.handler, job)
+
+
+class FramePipeline:
+    """
+    Staged probe frame pipeline: bounded asyncio queues between stages and
+    stage-specific executors, so the WebSocket receive loop only enqueues.
+
+    Default layout (see main.py): decode → detect → enrich → index → broadcast.
+    Blocking I/O stages share the `io_executor` thread pool; detection runs on
+    the `inference_executor` threads, which only wait on the shared
+    InferenceScheduler, so frames from several probes can be batched together
+    while the YOLO model itself is entered from one thread.
+
+    Stages with several workers can finish a stream's jobs out of order. An
+    `ordered` stage puts them back in order using `sequence_of(job)`, which
+    returns (stream, seq) with seq counting 1, 2, 3, ... per stream (or None
+    for jobs that need no ordering).
+    """
+
+    def __init__(self, io_workers: Optional[int] = None, inference_workers: Optional[int] = None):
+        self.io_executor = ThreadPoolExecutor(
+            max_workers=io_workers or _int_env("SPATIAL_PIPELINE_IO_WORKERS", 4),
+            thread_name_prefix="spatial-io",
+        )
+        self.inference_workers = inference_workers or _int_env("SPATIAL_PIPELINE_DETECT_WORKERS", 4)
+        self.inference_executor = ThreadPoolExecutor(
+            max_workers=self.inference_workers, thread_name_prefix="spatial-infer"
+        )
+        self.stages: List[PipelineStage] = []
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.on_error: Optional[Callable[[str, object, Exception], Awaitable[None]]] = None
+        # Called once per job when it leaves the pipeline (finished, dropped or failed).
+        self.on_done: Optional[Callable[[object], None]] = None
+        self.sequence_of: Optional[Callable[[object], Optional[Tuple[Hashable, int]]]] = None
+
+    def add_stage(
+        self,
+        name: str,
+        handler: Callable,
+        executor: Optional[ThreadPoolExecutor] = None,
+        maxsize: Optional[int] = None,
+        workers: int = 1,
+        ordered: bool = False,
+    ) -> PipelineStage:
+        default_size = _int_env("SPATIAL_PIPELINE_QUEUE_SIZE", 8)
+        stage = PipelineStage(name, handler, executor, maxsize or default_size, workers, ordered)
+        self.stages.append(stage)
+        return stage
+
+    def ensure_started(self):
+        """Start stage workers on the running loop (restarts if the loop changed)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._cancel_tasks()
+        self._loop = loop
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=stage.maxsize)
+            if stage.reorder is not None:
+                stage.reorder = _Reorder()
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                self._tasks.append(loop.create_task(self._worker(index), name=f"pipeline-{stage.name}-{n}"))
+
+    def _cancel_tasks(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def submit(self, job):
+        """Enqueue a job at the first stage; awaits while that queue is full (backpressure)."""
+        self.ensure_started()
+        await self._forward(0, time.perf_counter(), job)
+
+    async def _forward(self, index: int, enqueued_at: float, job):
+        stage = self.stages[index]
+        sequence = self.sequence_of(job) if stage.reorder is not None and self.sequence_of else None
+        if sequence is None:
+            await stage.queue.put((enqueued_at, job))
+            return
+        for item in stage.reorder.arrive(sequence[0], sequence[1], (enqueued_at, job)):
+            await stage.queue.put(item)
+
+    async def _skip_downstream(self, index: int, job):
+        """A job left the pipeline at stage `index`: later ordered stages stop waiting for it."""
+        if self.sequence_of is None:
+            return
+        for stage in self.stages[index + 1:]:
+            if stage.reorder is None:
+                continue
+            sequence = self.sequence_of(job)
+            if sequence is None:
+                return
+            for item in stage.reorder.skip(*sequence):
+                await stage.queue.put(item)
+
+    def _job_done(self, job):
+        if self.on_done is None:
+            return
+        try:
+            self.on_done(job)
+        except Exception as e:
+            print(f"Pipeline on_done hook failed: {e}")
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            enqueued_at, job = await stage.queue.get()
+            started = time.perf_counter()
+            stage.stats.in_flight += 1
+            try:
+                result = await stage.run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stage.stats.errors += 1
+                print(f"Pipeline stage '{stage.name}' failed: {e}")
+                if self.on_error is not None:
+                    try:
+                        await self.on_error(stage.name, job, e)
+                    except Exception:
+                        pass
+                await self._skip_downstream(index, job)
+                self._job_done(job)
+                continue
+            finally:
+                stage.stats.in_flight -= 1
+                stage.queue.task_done()
+
+            finished = time.perf_counter()
+            stage.stats.record((started - enqueued_at) * 1000.0, (finished - started) * 1000.0)
+            if next_stage is None:
+                self._job_done(job)
+                continue
+            if result is None:
+                stage.stats.dropped += 1
+                await self._skip_downstream(index, job)
+                self._job_done(job)
+                continue
+            await self._forward(index + 1, finished, result)
+
+    def stats(self) -> Dict[str, dict]:
+        out = {}
+        for stage in self.stages:
+            s = stage.stats
+            out[stage.name] = {
+                "queue_depth": stage.queue.qsize() if stage.queue is not None else 0,
+                "queue_max": stage.maxsize,
+                "workers": stage.workers,
+                "reorder_held": stage.reorder.held if stage.reorder is not None else 0,
+                "in_flight": s.in_flight,
+                "processed": s.processed,
+                "dropped": s.dropped,
+                "errors": s.errors,
+                "avg_wait_ms": round(s.avg_wait_ms, 2),
+                "avg_latency_ms": round(s.avg_latency_ms, 2),
+                "max_latency_ms": round(s.max_latency_ms, 2),
+            }
+        return out
+
+    def shutdown(self):
+        self._cancel_tasks()
+        self._loop = None
+        self.io_executor.shutdown(wait=False)
+        self.inference_executor.shutdown(wait=False)
+
+
+class ProbeMailbox:
+    """
+    Latest-frame-wins hand-off between one probe socket and the pipeline.
+
+    The socket `put()`s every frame it receives; only the newest pending frame
+    is kept, older ones are coalesced away. `get()` waits for a free in-flight
+    slot first and only then takes whatever is newest, so a probe never has
+    more than `max_in_flight` frames inside the pipeline.
+    """
+
+    def __init__(self, max_in_flight: int = 2):
+        self._pending = None
+        self._has_pending = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.received = 0
+        self.coalesced = 0
+
+    def put(self, job):
+        self.received += 1
+        if self._pending is not None:
+            self.coalesced += 1
+        self._pending = job
+        self._has_pending.set()
+
+    async def get(self):
+        await self._slots.acquire()
+        try:
+            await self._has_pending.wait()
+        except BaseException:
+            self._slots.release()
+            raise
+        job = self._pending
+        self._pending = None
+        self._has_pending.clear()
+        return job
+
+    def release(self):
+        """Free an in-flight slot once a job has left the pipeline."""
+        self._slots.release()
+
+
+class AdaptiveStride:
+    """
+    Per-probe YOLO/Gemini frame strides driven by measured latency.
+
+    Each finished frame reports its end-to-end latency plus detect/enrich stage
+    time. When the smoothed end-to-end latency exceeds `target_ms`, the stride of
+    the more expensive stage is raised; once it falls well below the budget the
+    strides step back down towards their configured base values.
+    """
+
+    def __init__(
+        self,
+        yolo_base: int,
+        gemini_base: int,
+        target_ms: float,
+        max_stride: int = 8,
+        cooldown: int = 5,
+        alpha: float = 0.3,
+    ):
+        self.yolo_base = max(1, yolo_base)
+        self.gemini_base = max(1, gemini_base)
+        self.yolo = self.yolo_base
+        self.gemini = self.gemini_base
+        self.target_ms = target_ms
+        self.max_stride = max(max_stride, self.yolo_base, self.gemini_base)
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.e2e_ms = None
+        self.detect_ms = 0.0
+        self.enrich_ms = 0.0
+        self._since_change = 0
+
+    def should_run_yolo(self, frame_number: int) -> bool:
+        return (frame_number - 1) % self.yolo == 0
+
+    def should_run_gemini(self, frame_number: int) -> bool:
+        return (frame_number - 1) % self.gemini == 0
+
+    def _ema(self, prev: float, value: float) -> float:
+        return value if prev is None else prev + self.alpha * (value - prev)
+
+    def observe(self, e2e_ms: float, detect_ms: Optional[float] = None, enrich_ms: Optional[float] = None):
+        self.e2e_ms = self._ema(self.e2e_ms, e2e_ms)
+        if detect_ms is not None:
+            self.detect_ms = self._ema(self.detect_ms, detect_ms)
+        if enrich_ms is not None:
+            self.enrich_ms = self._ema(self.enrich_ms, enrich_ms)
+
+        self._since_change += 1
+        if self.target_ms <= 0 or self._since_change < self.cooldown:
+            return
+
+        changed = False
+        if self.e2e_ms > self.target_ms:
+            # Shed the stage that costs more per frame first.
+            if self.enrich_ms >= self.detect_ms and self.gemini < self.max_stride:
+                self.gemini += 1
+                changed = True
+            elif self.yolo < self.max_stride:
+                self.yolo += 1
+                changed = True
+            elif self.gemini < self.max_stride:
+                self.gemini += 1
+                changed = True
+        elif self.e2e_ms < self.target_ms * 0.6:
+            # Restore detection freshness before Gemini coverage.
+            if self.yolo > self.yolo_base:
+                self.yolo -= 1
+                changed = True
+            elif self.gemini > self.gemini_base:
+                self.gemini -= 1
+                changed = True
+
+        if changed:
+            self._since_change = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "yolo_stride": self.yolo,
+            "gemini_stride": self.gemini,
+            "latency_ms": round(self.e2e_ms or 0.0, 1),
+        }
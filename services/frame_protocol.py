@@ -0,0 +1,82 @@
+"""
+Binary probe frame protocol.
+
+A binary WebSocket message carries one camera frame without base64/JSON overhead:
+
+    offset  size  field
+    0       4     magic  b"SVF1"
+    4       1     version (1)
+    5       1     flags (reserved, 0)
+    6       2     scan_id length in bytes (N)
+    8       4     sequence number (uint32)
+    12      8     timestamp, seconds since epoch (float64)
+    20      4     pose alpha (float32, degrees)
+    24      4     pose beta  (float32, degrees)
+    28      4     pose gamma (float32, degrees)
+    32      N     scan_id (UTF-8, may be empty)
+    32+N    ...   raw JPEG bytes
+
+All integers/floats are little-endian. The JPEG payload is returned as a
+memoryview over the received message, so it is handed to the pipeline without
+another copy.
+"""
+import struct
+from typing import Tuple
+
+FRAME_MAGIC = b"SVF1"
+FRAME_VERSION = 1
+_HEADER = struct.Struct("<4sBBHIdfff")
+HEADER_SIZE = _HEADER.size
+
+
+class FrameProtocolError(ValueError):
+    pass
+
+
+def encode_frame_message(
+    jpeg_bytes: bytes,
+    scan_id: str = "",
+    seq: int = 0,
+    timestamp: float = 0.0,
+    alpha: float = 0.0,
+    beta: float = 0.0,
+    gamma: float = 0.0,
+) -> bytes:
+    """Build a binary frame message (used by probes and benchmarks)."""
+    scan = scan_id.encode("utf-8")
+    header = _HEADER.pack(
+        FRAME_MAGIC, FRAME_VERSION, 0, len(scan), seq & 0xFFFFFFFF,
+        float(timestamp), float(alpha), float(beta), float(gamma),
+    )
+    return b"".join((header, scan, jpeg_bytes))
+
+
+def decode_frame_message(data) -> Tuple[dict, memoryview]:
+    """
+    Parse a binary frame message.
+    Returns (header, payload) where payload is a zero-copy memoryview of the JPEG.
+    """
+    view = memoryview(data)
+    if len(view) < HEADER_SIZE:
+        raise FrameProtocolError("Binary frame too short")
+
+    magic, version, flags, scan_len, seq, timestamp, alpha, beta, gamma = _HEADER.unpack_from(view)
+    if magic != FRAME_MAGIC:
+        raise FrameProtocolError("Bad binary frame magic")
+    if version != FRAME_VERSION:
+        raise FrameProtocolError(f"Unsupported binary frame version {version}")
+
+    payload_start = HEADER_SIZE + scan_len
+    if len(view) <= payload_start:
+        raise FrameProtocolError("Binary frame has no image payload")
+
+    header = {
+        "flags": flags,
+        "seq": seq,
+        "timestamp": timestamp,
+        "scan_id": bytes(view[HEADER_SIZE:payload_start]).decode("utf-8", errors="replace"),
+        "alpha": alpha,
+        "beta": beta,
+        "gamma": gamma,
+    }
+    return header, view[payload_start:]
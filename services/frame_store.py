@@ -0,0 +1,231 @@
+"""
+Write-behind store for probe frames.
+
+Frame paths are assigned up front (no I/O) and the JPEG bytes are handed to a
+background writer that batches writes per scan directory, so the frame pipeline
+never waits on disk. Until a frame is flushed, `read()` serves it from memory.
+
+Retention is configured with SPATIAL_FRAME_RETENTION:
+  all        keep every frame (default, previous behaviour)
+  every_n    keep every SPATIAL_FRAME_KEEP_EVERY-th frame per scan
+  detections keep only frames that produced detections
+  keyframes  keep frames whose detected label set changed, or at least one
+             every SPATIAL_FRAME_KEYFRAME_SEC seconds per scan
+Frames that feed spatial-memory observations are always kept (`force=True`).
+"""
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional
+
+RETENTION_POLICIES = {"all", "every_n", "detections", "keyframes"}
+
+
+def _int_env(name: str, default: int, minimum: int = 1) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        return default
+
+
+class FrameStore:
+    def __init__(
+        self,
+        root: str = "data/frames",
+        retention: Optional[str] = None,
+        keep_every: Optional[int] = None,
+        keyframe_sec: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: float = 0.05,
+        max_pending: Optional[int] = None,
+    ):
+        self.root = root
+        retention = (retention or os.getenv("SPATIAL_FRAME_RETENTION", "all")).strip().lower()
+        if retention not in RETENTION_POLICIES:
+            print(f"⚠️ Unknown SPATIAL_FRAME_RETENTION '{retention}', keeping all frames.")
+            retention = "all"
+        self.retention = retention
+        self.keep_every = keep_every or _int_env("SPATIAL_FRAME_KEEP_EVERY", 5)
+        self.keyframe_sec = keyframe_sec if keyframe_sec is not None else float(
+            os.getenv("SPATIAL_FRAME_KEYFRAME_SEC", "5")
+        )
+        self.batch_size = batch_size or _int_env("SPATIAL_FRAME_WRITE_BATCH", 16)
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending or _int_env("SPATIAL_FRAME_MAX_PENDING", 256))
+        self._pending: Dict[str, object] = {}
+        self._pending_lock = threading.Lock()
+        self._known_dirs = set()
+        self._frame_counts: Dict[str, int] = defaultdict(int)
+        self._last_keyframe: Dict[str, tuple] = {}
+        self._policy_lock = threading.Lock()  # detect workers call should_keep concurrently
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+        self.written = 0
+        self.bytes_written = 0
+        self.batches = 0
+        self.skipped_by_policy = 0
+        self.dropped_backlog = 0
+        self.write_errors = 0
+
+    def reserve_path(self, scan_id: str) -> str:
+        """Allocate a frame path without touching the filesystem."""
+        return os.path.join(self.root, scan_id, f"frame_{uuid.uuid4().hex[:8]}.jpg")
+
+    def should_keep(self, scan_id: str, labels=None, force: bool = False) -> bool:
+        """Apply the retention policy. `labels` is None when detection did not run."""
+        with self._policy_lock:
+            self._frame_counts[scan_id] += 1
+            if force or self.retention == "all":
+                return True
+            if self.retention == "every_n":
+                return (self._frame_counts[scan_id] - 1) % self.keep_every == 0
+            if self.retention == "detections":
+                return bool(labels)
+            # keyframes
+            now = time.monotonic()
+            label_set = frozenset(labels) if labels is not None else None
+            last = self._last_keyframe.get(scan_id)
+            changed = label_set is not None and (last is None or label_set != last[1])
+            expired = last is None or (now - last[0]) >= self.keyframe_sec
+            if changed or expired:
+                prev_labels = last[1] if last is not None else frozenset()
+                self._last_keyframe[scan_id] = (now, label_set if label_set is not None else prev_labels)
+                return True
+            return False
+
+    def forget(self, scan_id: str):
+        """Drop a finished scan's retention state."""
+        with self._policy_lock:
+            self._frame_counts.pop(scan_id, None)
+            self._last_keyframe.pop(scan_id, None)
+
+    def reset(self):
+        """Drop retention state for every scan."""
+        with self._policy_lock:
+            self._frame_counts.clear()
+            self._last_keyframe.clear()
+
+    def submit(self, frame_path: str, data) -> bool:
+        """Queue JPEG bytes for writing. Returns False if the writer backlog is full."""
+        self._ensure_writer()
+        with self._pending_lock:
+            self._pending[frame_path] = data
+        try:
+            self._queue.put_nowait((frame_path, data))
+        except queue.Full:
+            with self._pending_lock:
+                self._pending.pop(frame_path, None)
+            self.dropped_backlog += 1
+            return False
+        return True
+
+    def save(self, scan_id: str, data, labels=None, force: bool = False) -> str:
+        """Retention check + reserve + submit. Returns the frame path, or "" if not kept."""
+        if not self.should_keep(scan_id, labels, force):
+            self.skipped_by_policy += 1
+            return ""
+        frame_path = self.reserve_path(scan_id)
+        return frame_path if self.submit(frame_path, data) else ""
+
+    def read(self, frame_path: str) -> Optional[bytes]:
+        """Return bytes for a frame that is still waiting to be written, else None."""
+        with self._pending_lock:
+            data = self._pending.get(frame_path)
+        return bytes(data) if data is not None else None
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every queued frame has been written."""
+        if self._writer is None:
+            return
+        if timeout is None:
+            self._queue.join()
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run_writer, name="spatial-frame-writer", daemon=True)
+                self._writer.start()
+
+    def _run_writer(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        by_dir = defaultdict(list)
+        for frame_path, data in batch:
+            by_dir[os.path.dirname(frame_path)].append((frame_path, data))
+
+        try:
+            for directory, items in by_dir.items():
+                for frame_path, data in items:
+                    try:
+                        if directory not in self._known_dirs:
+                            os.makedirs(directory, exist_ok=True)
+                            self._known_dirs.add(directory)
+                        with open(frame_path, "wb") as f:
+                            f.write(data)
+                        self.written += 1
+                        self.bytes_written += len(data)
+                    except Exception as e:
+                        self.write_errors += 1
+                        print(f"Frame write failed ({frame_path}): {e}")
+                        # The scan directory may have been removed underneath us.
+                        self._known_dirs.discard(directory)
+        finally:
+            # Written or not, nothing in this batch is pending any more.
+            with self._pending_lock:
+                for frame_path, _ in batch:
+                    self._pending.pop(frame_path, None)
+        self.batches += 1
+
+    def stats(self) -> dict:
+        return {
+            "retention": self.retention,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "bytes_written": self.bytes_written,
+            "batches": self.batches,
+            "avg_batch": round(self.written / self.batches, 2) if self.batches else 0.0,
+            "skipped_by_policy": self.skipped_by_policy,
+            "dropped_backlog": self.dropped_backlog,
+            "write_errors": self.write_errors,
+        }
+
+
+_frame_store = None
+
+
+def get_frame_store() -> FrameStore:
+    """Process-wide frame store (lazily created so env config is read at first use)."""
+    global _frame_store
+    if _frame_store is None:
+        _frame_store = FrameStore()
+    return _frame_store
@@ -0,0 +1,160 @@
+"""
+In-memory BM25 inverted index over observation text and YOLO labels.
+
+Kept next to the vector store so exact tokens (brands, colours, labels) match
+exactly, and so /spatial/query can answer before the SentenceTransformer has
+loaded. Documents are replaced on upsert; each keeps only the fields that
+search filters use (scan_id, timestamp, yolo_label, confidence, source).
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+FILTER_FIELDS = ("scan_id", "timestamp", "yolo_label", "confidence", "source")
+_NUMERIC_FIELDS = ("timestamp", "confidence")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def _filter_fields(meta: dict) -> dict:
+    fields = {}
+    for field in FILTER_FIELDS:
+        value = meta.get(field)
+        if value is None or value == "":
+            continue
+        if field in _NUMERIC_FIELDS:
+            try:
+                fields[field] = float(value)
+            except (TypeError, ValueError):
+                continue
+        else:
+            fields[field] = str(value)
+    return fields
+
+
+def match_where(fields: dict, where: Optional[dict]) -> bool:
+    """Evaluate a Chroma-style `where` clause against a document's filter fields."""
+    if not where:
+        return True
+    if "$and" in where:
+        return all(match_where(fields, clause) for clause in where["$and"])
+    if "$or" in where:
+        return any(match_where(fields, clause) for clause in where["$or"])
+    for field, condition in where.items():
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        value = fields.get(field)
+        for op, expected in condition.items():
+            if op in ("$in", "$nin"):
+                hit = value is not None and str(value) in {str(v) for v in expected}
+                if hit != (op == "$in"):
+                    return False
+                continue
+            if value is None:
+                if op == "$ne":
+                    continue
+                return False
+            if field in _NUMERIC_FIELDS:
+                expected = float(expected)
+            else:
+                value, expected = str(value), str(expected)
+            if op == "$eq":
+                ok = value == expected
+            elif op == "$ne":
+                ok = value != expected
+            elif op == "$gt":
+                ok = value > expected
+            elif op == "$gte":
+                ok = value >= expected
+            elif op == "$lt":
+                ok = value < expected
+            elif op == "$lte":
+                ok = value <= expected
+            else:
+                raise ValueError(f"Unsupported filter {field} {op}")
+            if not ok:
+                return False
+    return True
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}  # token -> doc id -> term frequency
+        self._docs: Dict[str, Tuple[Counter, int, dict]] = {}  # doc id -> (terms, length, filter fields)
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _remove(self, doc_id: str):
+        old = self._docs.pop(doc_id, None)
+        if old is None:
+            return
+        terms, length, _ = old
+        self._total_length -= length
+        for token in terms:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[token]
+
+    def upsert(self, doc_id: str, text: str, meta: dict):
+        """Index (or re-index) one document; `yolo_label` is indexed as text too."""
+        terms = Counter(tokenize(f"{text} {meta.get('yolo_label') or ''}"))
+        length = sum(terms.values())
+        with self._lock:
+            self._remove(doc_id)
+            self._docs[doc_id] = (terms, length, _filter_fields(meta))
+            self._total_length += length
+            for token, tf in terms.items():
+                self._postings.setdefault(token, {})[doc_id] = tf
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            self._total_length = 0
+
+    def search(self, query: str, k: int, where: Optional[dict] = None) -> List[Tuple[str, float]]:
+        """Top-k (doc id, BM25 score) among documents matching `where`."""
+        tokens = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            if not n or not tokens:
+                return []
+            avg_length = self._total_length / n
+            scores: Dict[str, float] = {}
+            for token in tokens:
+                posting = self._postings.get(token)
+                if not posting:
+                    continue
+                idf = math.log(1.0 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    length = self._docs[doc_id][1]
+                    norm = tf + self.k1 * (1.0 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / norm
+            if where:
+                scores = {doc_id: s for doc_id, s in scores.items() if match_where(self._docs[doc_id][2], where)}
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def stats(self) -> dict:
+        return {"documents": len(self._docs), "terms": len(self._postings)}
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int, c: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(id) = sum over lists of 1 / (c + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (c + rank)
+    return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
@@ -9,6 +9,39 @@ import os
 import json
 import datetime
 
+
+def _format_time(timestamp) -> str:
+    try:
+        return datetime.datetime.fromtimestamp(float(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError, OverflowError, OSError):
+        return "unknown time"
+
+
+def _spatial_context(search_results: list) -> str:
+    """One line per search result with only what the answer needs (no bboxes, paths or raw detections)."""
+    lines = []
+    for rank, result in enumerate(search_results, start=1):
+        meta = result.get("metadata") or {}
+        parts = [str(result.get("description") or meta.get("text") or "").strip()]
+        if meta.get("yolo_label"):
+            parts.append(str(meta["yolo_label"]))
+        position = meta.get("position_3d")
+        if isinstance(position, dict):
+            try:
+                parts.append("at ({:.2f}, {:.2f}, {:.2f}) m".format(*(float(position.get(a, 0.0)) for a in ("x", "y", "z"))))
+            except (TypeError, ValueError):
+                pass
+        seen = f"seen {_format_time(meta.get('timestamp'))}"
+        sightings = int(meta.get("sighting_count") or 1)
+        if sightings > 1:
+            seen += f" ({sightings} sightings since {_format_time(meta.get('first_seen'))})"
+        parts.append(seen)
+        if meta.get("scan_id"):
+            parts.append(f"scan {meta['scan_id']}")
+        lines.append(f"{rank}. " + " | ".join(parts))
+    return "\n".join(lines) or "(no matching observations)"
+
+
 class GeminiClient:
     def __init__(self, api_key: str):
         self.client = genai.Client(api_key=api_key)
@@ -128,15 +161,16 @@ class GeminiClient:
         Takes the user's question and the top matching records, returns a human-friendly response.
         """
         try:
-            context = json.dumps(search_results, ensure_ascii=False, indent=2)
+            context = _spatial_context(search_results)
             prompt = (
                 f"You are a helpful spatial memory assistant. The user scanned their space earlier "
                 f"and now asks a question. Based on the search results from the spatial memory database, "
                 f"give a clear, concise, and helpful answer.\n\n"
-                f"Current Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
                 f"User question: {query}\n\n"
                 f"Search results (ranked by relevance):\n{context}\n\n"
-                f"Answer naturally. Include the timestamp and position. "
+                # No wall-clock time here: answers are cached (services/answer_cache.py),
+                # so they must not say "2 minutes ago" and the prompt must only depend on the key.
+                f"Answer naturally. Include the timestamp exactly as given (not relative to now) and the position. "
                 f"If not confident, say so. Keep it under 3 sentences."
             )
             response = self.client.models.generate_content(
@@ -0,0 +1,68 @@
+"""
+Camera pose helpers. Poses are 4x4 NumPy matrices (camera → world) everywhere
+after the API edge; strings are only parsed once, where they arrive.
+"""
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# Orientation angles are snapped to this step (degrees) before the cached
+# matrix lookup; sensor jitter below it does not change the pose. 0 disables.
+POSE_ANGLE_STEP = float(os.getenv("SPATIAL_POSE_ANGLE_STEP", "0.25"))
+
+_IDENTITY = np.eye(4)
+_IDENTITY.flags.writeable = False
+
+
+def rotation_matrix_from_orientation(alpha: float, beta: float, gamma: float) -> np.ndarray:
+    """
+    Convert device orientation angles (degrees) to a 3x3 rotation matrix.
+    Approximation: R = Rz(alpha) * Rx(beta) * Ry(gamma).
+    """
+    a, b, g = math.radians(alpha), math.radians(beta), math.radians(gamma)
+    ca, sa = math.cos(a), math.sin(a)
+    cb, sb = math.cos(b), math.sin(b)
+    cg, sg = math.cos(g), math.sin(g)
+
+    rz = np.array([[ca, -sa, 0.0], [sa, ca, 0.0], [0.0, 0.0, 1.0]])
+    rx = np.array([[1.0, 0.0, 0.0], [0.0, cb, -sb], [0.0, sb, cb]])
+    ry = np.array([[cg, 0.0, sg], [0.0, 1.0, 0.0], [-sg, 0.0, cg]])
+    return rz @ rx @ ry
+
+
+@lru_cache(maxsize=4096)
+def _cached_pose(alpha: float, beta: float, gamma: float) -> np.ndarray:
+    pose = np.eye(4)
+    # Transposed on purpose: this is the matrix process_frame always applied to
+    # probe frames (the old row-major CSV was read back column-major).
+    pose[:3, :3] = rotation_matrix_from_orientation(alpha, beta, gamma).T
+    pose.flags.writeable = False
+    return pose
+
+
+def _quantize(angle: float) -> float:
+    angle = float(angle)
+    if not math.isfinite(angle):
+        return 0.0  # sensors do report NaN/inf for an axis they can't read
+    if POSE_ANGLE_STEP <= 0:
+        return angle
+    return round(angle / POSE_ANGLE_STEP) * POSE_ANGLE_STEP
+
+
+def pose_from_orientation(alpha: float, beta: float, gamma: float) -> np.ndarray:
+    """Read-only 4x4 pose for device orientation angles (LRU-cached on quantized angles)."""
+    return _cached_pose(_quantize(alpha), _quantize(beta), _quantize(gamma))
+
+
+def parse_pose_matrix(pose_str: str) -> np.ndarray:
+    """Parse a 16-float, column-major flattened 4x4 pose string; identity if malformed."""
+    try:
+        values = np.array([float(x) for x in pose_str.split(",")])
+        if len(values) == 16:
+            return values.reshape(4, 4).T
+    except Exception:
+        pass
+    print("Warning: Failed to parse pose matrix, using identity.")
+    return _IDENTITY
@@ -0,0 +1,227 @@
+"""
+Per-scan voxel hash over object positions for radius and k-nearest queries.
+
+Each scan maps voxel coordinates (floor(position / cell)) to the objects in
+that voxel, so an upsert only moves one object between two voxels and
+queries only visit the voxels around the query point. When a query would
+visit more voxels than the scan occupies (a huge radius, or a sparse scan far
+from the query point), it scans the occupied voxels instead. Queries
+restricted to a small set of ids (e.g. text matches) measure those directly.
+"""
+import heapq
+import math
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+Point = Tuple[float, float, float]
+_DIRECT_MAX = 2048  # restricted queries with at most this many ids skip the voxel walk
+
+
+def position_xyz(position) -> Optional[Point]:
+    """(x, y, z) from a `position_3d` dict, or None if it has no usable coordinates."""
+    if not isinstance(position, dict):
+        return None
+    try:
+        point = (float(position["x"]), float(position["y"]), float(position["z"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+    return point if all(math.isfinite(v) for v in point) else None
+
+
+class _ScanGrid:
+    __slots__ = ("voxels", "count")
+
+    def __init__(self):
+        self.voxels: Dict[Tuple[int, int, int], Dict[str, Point]] = {}
+        self.count = 0
+
+
+class PositionIndex:
+    def __init__(self, cell: float = 0.5):
+        self.cell = cell
+        self._scans: Dict[str, _ScanGrid] = {}
+        self._objects: Dict[str, Tuple[str, Tuple[int, int, int]]] = {}  # id -> (scan_id, voxel)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def _voxel(self, point: Point) -> Tuple[int, int, int]:
+        return (math.floor(point[0] / self.cell), math.floor(point[1] / self.cell), math.floor(point[2] / self.cell))
+
+    def _remove(self, object_id: str):
+        placed = self._objects.pop(object_id, None)
+        if placed is None:
+            return
+        scan_id, voxel = placed
+        grid = self._scans[scan_id]
+        members = grid.voxels[voxel]
+        del members[object_id]
+        grid.count -= 1
+        if not members:
+            del grid.voxels[voxel]
+        if not grid.count:
+            del self._scans[scan_id]
+
+    def upsert(self, object_id: str, scan_id, position):
+        """Place (or move) an object; a missing position removes it."""
+        point = position_xyz(position)
+        with self._lock:
+            self._remove(object_id)
+            if point is None or scan_id is None or scan_id == "":
+                return
+            scan_id = str(scan_id)
+            voxel = self._voxel(point)
+            grid = self._scans.get(scan_id)
+            if grid is None:
+                grid = self._scans[scan_id] = _ScanGrid()
+            grid.voxels.setdefault(voxel, {})[object_id] = point
+            grid.count += 1
+            self._objects[object_id] = (scan_id, voxel)
+
+    def remove(self, object_id: str):
+        with self._lock:
+            self._remove(object_id)
+
+    def clear(self):
+        with self._lock:
+            self._scans.clear()
+            self._objects.clear()
+
+    def _direct(self, scan_id: str, grid: _ScanGrid, point: Point, allowed: Set[str]) -> List[Tuple[float, str]]:
+        """(squared distance, id) for the allowed ids placed in this scan."""
+        px, py, pz = point
+        found = []
+        for object_id in allowed:
+            placed = self._objects.get(object_id)
+            if placed is None or placed[0] != scan_id:
+                continue
+            x, y, z = grid.voxels[placed[1]][object_id]
+            found.append(((x - px) ** 2 + (y - py) ** 2 + (z - pz) ** 2, object_id))
+        return found
+
+    def _walk(self, grid: _ScanGrid, point: Point, radius: float, allowed: Optional[Set[str]]) -> List[Tuple[float, str]]:
+        """(squared distance, id) for objects in the voxels overlapping the cube around `point`."""
+        px, py, pz = point
+        lo = self._voxel((px - radius, py - radius, pz - radius))
+        hi = self._voxel((px + radius, py + radius, pz + radius))
+        span = (hi[0] - lo[0] + 1) * (hi[1] - lo[1] + 1) * (hi[2] - lo[2] + 1)
+        if span <= len(grid.voxels):
+            voxels = (
+                grid.voxels.get((x, y, z))
+                for x in range(lo[0], hi[0] + 1)
+                for y in range(lo[1], hi[1] + 1)
+                for z in range(lo[2], hi[2] + 1)
+            )
+        else:
+            voxels = (
+                members
+                for key, members in grid.voxels.items()
+                if lo[0] <= key[0] <= hi[0] and lo[1] <= key[1] <= hi[1] and lo[2] <= key[2] <= hi[2]
+            )
+        found = []
+        for members in voxels:
+            if not members:
+                continue
+            for object_id, (x, y, z) in members.items():
+                if allowed is None or object_id in allowed:
+                    found.append(((x - px) ** 2 + (y - py) ** 2 + (z - pz) ** 2, object_id))
+        return found
+
+    @staticmethod
+    def _shell(center: Tuple[int, int, int], ring: int):
+        """Voxel coordinates at Chebyshev distance `ring` from `center`."""
+        cx, cy, cz = center
+        if ring == 0:
+            yield center
+            return
+        for dx in range(-ring, ring + 1):
+            for dy in range(-ring, ring + 1):
+                if abs(dx) == ring or abs(dy) == ring:
+                    for dz in range(-ring, ring + 1):
+                        yield (cx + dx, cy + dy, cz + dz)
+                else:
+                    yield (cx + dx, cy + dy, cz - ring)
+                    yield (cx + dx, cy + dy, cz + ring)
+
+    def within(
+        self, scan_id, center, radius: float, limit: Optional[int] = None, allowed: Optional[Set[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """(id, distance) of the scan's objects within `radius` of `center`, nearest first (only `allowed` ids if given)."""
+        point = position_xyz(center)
+        if point is None or radius < 0:
+            return []
+        with self._lock:
+            grid = self._scans.get(str(scan_id))
+            if grid is None:
+                return []
+            if allowed is not None and len(allowed) <= _DIRECT_MAX:
+                found = self._direct(str(scan_id), grid, point, allowed)
+            else:
+                found = self._walk(grid, point, radius, allowed)
+        r2 = radius * radius
+        found = [hit for hit in found if hit[0] <= r2]
+        ranked = heapq.nsmallest(limit, found) if limit else sorted(found)
+        return [(object_id, math.sqrt(d2)) for d2, object_id in ranked]
+
+    def nearest(
+        self, scan_id, center, k: int, max_radius: Optional[float] = None, allowed: Optional[Set[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """The k objects of the scan nearest to `center` (optionally within `max_radius`), nearest first."""
+        point = position_xyz(center)
+        if point is None or k <= 0:
+            return []
+        if max_radius is not None:
+            return self.within(scan_id, center, max_radius, limit=k, allowed=allowed)
+        px, py, pz = point
+        best: List[Tuple[float, str]] = []  # max-heap of the k nearest as (-d2, id)
+        with self._lock:
+            grid = self._scans.get(str(scan_id))
+            if grid is None:
+                return []
+            if allowed is not None and len(allowed) <= _DIRECT_MAX:
+                ranked = heapq.nsmallest(k, self._direct(str(scan_id), grid, point, allowed))
+                return [(object_id, math.sqrt(d2)) for d2, object_id in ranked]
+            center_voxel = self._voxel(point)
+            ring = 0
+            visited = 0
+            while visited < grid.count:
+                shell_size = 1 if ring == 0 else (2 * ring + 1) ** 3 - (2 * ring - 1) ** 3
+                exhaustive = shell_size > len(grid.voxels)
+                if exhaustive:
+                    # Cheaper to check every remaining occupied voxel than to walk empty shells.
+                    cx, cy, cz = center_voxel
+                    shells = [
+                        members
+                        for (x, y, z), members in grid.voxels.items()
+                        if max(abs(x - cx), abs(y - cy), abs(z - cz)) >= ring
+                    ]
+                else:
+                    shells = (grid.voxels.get(key) for key in self._shell(center_voxel, ring))
+                for members in shells:
+                    if not members:
+                        continue
+                    visited += len(members)
+                    for object_id, (x, y, z) in members.items():
+                        if allowed is not None and object_id not in allowed:
+                            continue
+                        d2 = (x - px) ** 2 + (y - py) ** 2 + (z - pz) ** 2
+                        if len(best) < k:
+                            heapq.heappush(best, (-d2, object_id))
+                        elif d2 < -best[0][0]:
+                            heapq.heapreplace(best, (-d2, object_id))
+                if exhaustive:
+                    break
+                # Anything beyond this shell is at least `ring * cell` away.
+                if len(best) == k and -best[0][0] <= (ring * self.cell) ** 2:
+                    break
+                ring += 1
+        return [(object_id, math.sqrt(-neg_d2)) for neg_d2, object_id in sorted(best, reverse=True)]
+
+    def stats(self) -> dict:
+        return {
+            "objects": len(self._objects),
+            "scans": len(self._scans),
+            "voxels": sum(len(grid.voxels) for grid in self._scans.values()),
+            "cell_m": self.cell,
+        }
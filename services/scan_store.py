@@ -0,0 +1,258 @@
+"""
+Scan bookkeeping (status, frame/object counts, YOLO detections and Gemini
+objects per scan), shared by every worker process.
+
+  memory  (default) a dict in this process, as before
+  sqlite  a WAL-mode SQLite file all workers on the host read and write
+
+Selected with SPATIAL_SCAN_STORE; SPATIAL_SCAN_STORE_PATH sets the SQLite file.
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+
+def _new_record(scan_id: str, source: Optional[str]) -> dict:
+    return {
+        "scan_id": scan_id,
+        "status": "scanning",
+        "source": source,
+        "frames": 0,
+        "object_count": 0,
+        "objects": [],
+        "detections": [],
+        "last_frame_path": None,
+        "updated_at": None,
+    }
+
+
+def _summary(record: dict, detection_count: int) -> dict:
+    return {
+        "scan_id": record["scan_id"],
+        "status": record.get("status", "unknown"),
+        "source": record.get("source"),
+        "frames": record.get("frames", 0),
+        "object_count": record.get("object_count", 0),
+        "detection_count": detection_count,
+        "updated_at": record.get("updated_at"),
+        "last_frame": os.path.basename(record.get("last_frame_path") or ""),
+    }
+
+
+class ScanStore:
+    """
+    `record_frame` is the only per-frame write: one call per processed frame
+    with its detections and Gemini objects (already in record format).
+    """
+
+    name = "base"
+
+    def record_frame(
+        self,
+        scan_id: str,
+        source: Optional[str],
+        timestamp: float,
+        frame_path: Optional[str] = None,
+        detections: Optional[List[dict]] = None,
+        objects: Optional[List[dict]] = None,
+    ):
+        raise NotImplementedError
+
+    def ensure(self, scan_id: str, source: Optional[str] = None):
+        raise NotImplementedError
+
+    def set_status(self, scan_id: str, status: str):
+        raise NotImplementedError
+
+    def exists(self, scan_id: str) -> bool:
+        raise NotImplementedError
+
+    def get(self, scan_id: str) -> Optional[dict]:
+        """Full record with all detections and objects, or None."""
+        raise NotImplementedError
+
+    def summaries(self) -> List[dict]:
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryScanStore(ScanStore):
+    name = "memory"
+
+    def __init__(self):
+        self._scans: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _ensure(self, scan_id: str, source: Optional[str]) -> dict:
+        record = self._scans.get(scan_id)
+        if record is None:
+            record = self._scans[scan_id] = _new_record(scan_id, source)
+        return record
+
+    def ensure(self, scan_id: str, source: Optional[str] = None):
+        with self._lock:
+            self._ensure(scan_id, source)
+
+    def record_frame(self, scan_id, source, timestamp, frame_path=None, detections=None, objects=None):
+        with self._lock:
+            record = self._ensure(scan_id, source)
+            record["frames"] += 1
+            record["updated_at"] = timestamp
+            if frame_path:
+                record["last_frame_path"] = frame_path
+            record["detections"].extend(detections or ())
+            record["objects"].extend(objects or ())
+            record["object_count"] += len(objects or ())
+
+    def set_status(self, scan_id: str, status: str):
+        with self._lock:
+            if scan_id in self._scans:
+                self._scans[scan_id]["status"] = status
+
+    def exists(self, scan_id: str) -> bool:
+        return scan_id in self._scans
+
+    def get(self, scan_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._scans.get(scan_id)
+            if record is None:
+                return None
+            return {**record, "detections": list(record["detections"]), "objects": list(record["objects"])}
+
+    def summaries(self) -> List[dict]:
+        with self._lock:
+            return [_summary(r, len(r["detections"])) for r in self._scans.values()]
+
+    def clear(self):
+        with self._lock:
+            self._scans.clear()
+
+
+class SqliteScanStore(ScanStore):
+    """Detections and objects are rows keyed by scan; one transaction per frame."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = "data/scans.sqlite3"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS scans (
+                scan_id TEXT PRIMARY KEY, status TEXT, source TEXT, frames INTEGER DEFAULT 0,
+                object_count INTEGER DEFAULT 0, last_frame_path TEXT, updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS scan_detections (
+                scan_id TEXT NOT NULL, timestamp REAL, record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scan_detections_scan ON scan_detections (scan_id);
+            CREATE TABLE IF NOT EXISTS scan_objects (
+                scan_id TEXT NOT NULL, timestamp REAL, record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scan_objects_scan ON scan_objects (scan_id);
+            """
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread (sqlite3 connections are not shared across threads).
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _ensure(conn: sqlite3.Connection, scan_id: str, source: Optional[str]):
+        conn.execute(
+            "INSERT OR IGNORE INTO scans (scan_id, status, source) VALUES (?, 'scanning', ?)",
+            (scan_id, source),
+        )
+
+    def ensure(self, scan_id: str, source: Optional[str] = None):
+        conn = self._conn()
+        with conn:
+            self._ensure(conn, scan_id, source)
+
+    def record_frame(self, scan_id, source, timestamp, frame_path=None, detections=None, objects=None):
+        conn = self._conn()
+        with conn:
+            self._ensure(conn, scan_id, source)
+            conn.execute(
+                "UPDATE scans SET frames = frames + 1, object_count = object_count + ?, updated_at = ?, "
+                "last_frame_path = COALESCE(?, last_frame_path) WHERE scan_id = ?",
+                (len(objects or ()), timestamp, frame_path or None, scan_id),
+            )
+            if detections:
+                conn.executemany(
+                    "INSERT INTO scan_detections (scan_id, timestamp, record) VALUES (?, ?, ?)",
+                    [(scan_id, d.get("timestamp"), json.dumps(d)) for d in detections],
+                )
+            if objects:
+                conn.executemany(
+                    "INSERT INTO scan_objects (scan_id, timestamp, record) VALUES (?, ?, ?)",
+                    [(scan_id, o.get("timestamp"), json.dumps(o)) for o in objects],
+                )
+
+    def set_status(self, scan_id: str, status: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE scans SET status = ? WHERE scan_id = ?", (status, scan_id))
+
+    def exists(self, scan_id: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM scans WHERE scan_id = ?", (scan_id,)).fetchone() is not None
+
+    _COLUMNS = ("scan_id", "status", "source", "frames", "object_count", "last_frame_path", "updated_at")
+
+    def get(self, scan_id: str) -> Optional[dict]:
+        conn = self._conn()
+        row = conn.execute(f"SELECT {', '.join(self._COLUMNS)} FROM scans WHERE scan_id = ?", (scan_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(zip(self._COLUMNS, row))
+        record["detections"] = [
+            json.loads(r) for (r,) in conn.execute(
+                "SELECT record FROM scan_detections WHERE scan_id = ? ORDER BY rowid", (scan_id,)
+            )
+        ]
+        record["objects"] = [
+            json.loads(r) for (r,) in conn.execute(
+                "SELECT record FROM scan_objects WHERE scan_id = ? ORDER BY rowid", (scan_id,)
+            )
+        ]
+        return record
+
+    def summaries(self) -> List[dict]:
+        conn = self._conn()
+        counts = dict(conn.execute("SELECT scan_id, COUNT(*) FROM scan_detections GROUP BY scan_id").fetchall())
+        rows = conn.execute(f"SELECT {', '.join(self._COLUMNS)} FROM scans ORDER BY rowid").fetchall()
+        return [_summary(dict(zip(self._COLUMNS, row)), counts.get(row[0], 0)) for row in rows]
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM scans")
+            conn.execute("DELETE FROM scan_detections")
+            conn.execute("DELETE FROM scan_objects")
+
+
+SCAN_STORE_BACKENDS = ("memory", "sqlite")
+
+
+def create_scan_store(backend: Optional[str] = None) -> ScanStore:
+    backend = (backend or os.getenv("SPATIAL_SCAN_STORE", "memory")).lower()
+    if backend == "sqlite":
+        store = SqliteScanStore(os.getenv("SPATIAL_SCAN_STORE_PATH", "data/scans.sqlite3"))
+        print(f"✅ SQLite scan store at {store.path}")
+        return store
+    if backend != "memory":
+        print(f"⚠️ Unknown scan store '{backend}', using memory. Options: {', '.join(SCAN_STORE_BACKENDS)}")
+    return MemoryScanStore()
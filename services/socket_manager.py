@@ -1,60 +1,642 @@
 from fastapi import WebSocket
-from typing import List, Dict
+from typing import Callable, Iterable, List, Dict, Optional, Set, Union
+import asyncio
 import json
+import os
+import time
+
+from services.dashboard_codec import encode, resolve_encoding
+from services.dashboard_delta import DetectionDeltaEncoder, filter_min_confidence, merge_detections
+from services.event_bus import EventBus
+
+# Outbound messages buffered per dashboard before the lag policy kicks in.
+DASHBOARD_QUEUE_SIZE = int(os.getenv("SPATIAL_DASHBOARD_QUEUE", "16"))
+# A single send that takes longer than this marks the dashboard as dead.
+DASHBOARD_SEND_TIMEOUT_SEC = float(os.getenv("SPATIAL_DASHBOARD_SEND_TIMEOUT_SEC", "5"))
+# A dashboard whose queue stays saturated this long is evicted.
+DASHBOARD_SLOW_EVICT_SEC = float(os.getenv("SPATIAL_DASHBOARD_SLOW_EVICT_SEC", "10"))
+# Outbound messages buffered per probe; the oldest ack is dropped when full.
+PROBE_QUEUE_SIZE = int(os.getenv("SPATIAL_PROBE_QUEUE", "8"))
+# A single send to a probe that takes longer than this drops the probe.
+PROBE_SEND_TIMEOUT_SEC = float(os.getenv("SPATIAL_PROBE_SEND_TIMEOUT_SEC", "5"))
+# Default max detection updates per second and scan for each dashboard (0 = every frame).
+DASHBOARD_MAX_HZ = float(os.getenv("SPATIAL_DASHBOARD_MAX_HZ", "0"))
+# Append every full `detection` broadcast to this JSONL file (for replay benchmarks).
+DASHBOARD_RECORD_PATH = os.getenv("SPATIAL_DASHBOARD_RECORD", "")
+
+# A queued payload (str → text frame, bytes → binary frame), or a callable
+# resolved by the writer right before sending.
+Payload = Union[str, bytes, Callable[[], Optional[Union[str, bytes]]]]
+
+
+def _coalesce_key(message: dict) -> Optional[tuple]:
+    """Messages with the same key supersede each other while queued; None = always deliver."""
+    if message.get("type") == "detection":
+        return ("detection", message.get("scan_id"))
+    return None
+
+
+def _as_set(values) -> Optional[Set[str]]:
+    if not values:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    return {str(v) for v in values}
+
+
+class DashboardConnection:
+    """
+    One dashboard socket with a bounded outbound queue drained by its own writer
+    task. Queued `detection` messages for the same scan are coalesced (newest
+    wins); when the queue is full the oldest detection is dropped. Other message
+    types are never dropped; a client that cannot keep up with them is evicted.
+
+    Delta clients instead get a fresh keyframe for a scan whose delta was
+    coalesced or dropped, since later deltas no longer apply.
+
+    The subscription (scan_ids / probes / types, None = all, and a minimum
+    object confidence) decides which broadcasts reach this client.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        maxsize: int = DASHBOARD_QUEUE_SIZE,
+        delta: bool = False,
+        encoding: str = "json",
+    ):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.encoding = encoding
+        self.maxsize = max(1, maxsize)
+        self.delta = delta
+        self.stream: Optional["DashboardStream"] = None
+        self.synced: set = set()  # scans whose deltas this client can apply
+        self.scan_ids: Optional[Set[str]] = None
+        self.probes: Optional[Set[str]] = None
+        self.types: Optional[Set[str]] = None
+        self.min_confidence = 0.0
+        self.queue: List[list] = []  # [coalesce_key, payload]
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.saturated_since: Optional[float] = None
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.send_ms = 0.0
+
+    @property
+    def view(self) -> tuple:
+        """Clients with the same view share one serialized payload per broadcast."""
+        return (self.encoding, self.min_confidence)
+
+    def wants(self, message: dict) -> bool:
+        if self.types is not None and message.get("type") not in self.types:
+            return False
+        scan_id = message.get("scan_id")
+        if self.scan_ids is not None and scan_id is not None and scan_id not in self.scan_ids:
+            return False
+        source = message.get("source")
+        return self.probes is None or source is None or source in self.probes
+
+    def subscription(self) -> dict:
+        return {
+            "scan_ids": sorted(self.scan_ids) if self.scan_ids is not None else None,
+            "probes": sorted(self.probes) if self.probes is not None else None,
+            "types": sorted(self.types) if self.types is not None else None,
+            "min_confidence": self.min_confidence,
+            "max_hz": self.stream.max_hz if self.stream is not None else 0.0,
+        }
+
+    def keyframe_payload(self, scan_id: str) -> Payload:
+        # Resolved at send time against whatever stream the client is in by then.
+        return lambda: self.stream.delta_encoder.keyframe(scan_id, self.encoding, self.min_confidence)
+
+    def enqueue(self, key: Optional[tuple], payload: Payload) -> bool:
+        """Queue a payload; returns False if the client is hopelessly behind."""
+        if key is not None:
+            for entry in self.queue:
+                if entry[0] == key:
+                    entry[1] = self.keyframe_payload(key[1]) if self.delta else payload
+                    self.coalesced += 1
+                    return True
+
+        if len(self.queue) >= self.maxsize:
+            now = time.monotonic()
+            if self.saturated_since is None:
+                self.saturated_since = now
+            elif now - self.saturated_since > DASHBOARD_SLOW_EVICT_SEC:
+                return False
+            victim = next((i for i, entry in enumerate(self.queue) if entry[0] is not None), None)
+            if victim is None:
+                return False
+            if self.delta:
+                self.synced.discard(self.queue[victim][0][1])
+            del self.queue[victim]
+            self.dropped += 1
+
+        self.queue.append([key, payload])
+        self.ready.set()
+        return True
+
+    async def next_payload(self) -> Payload:
+        while not self.queue:
+            self.ready.clear()
+            await self.ready.wait()
+        _, payload = self.queue.pop(0)
+        if not self.queue:
+            self.saturated_since = None
+        return payload
+
+    def stats(self) -> dict:
+        return {
+            "mode": "delta" if self.delta else "full",
+            "encoding": self.encoding,
+            "queue_depth": len(self.queue),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "bytes_sent": self.bytes_sent,
+            "avg_send_ms": round(self.send_ms, 2),
+            "lagging_sec": round(time.monotonic() - self.saturated_since, 1) if self.saturated_since else 0.0,
+            "subscription": self.subscription(),
+        }
+
+
+class ProbeConnection:
+    """
+    One probe socket with a bounded outbound queue drained by its own writer
+    task, so the frame pipeline never waits on a probe's network. Acks only
+    report progress, so when the queue is full the oldest ack is dropped;
+    other messages are kept, and a probe that can't take them is dropped.
+    """
+
+    def __init__(self, websocket: WebSocket, client_id: str, maxsize: int = PROBE_QUEUE_SIZE):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.maxsize = max(1, maxsize)
+        self.queue: List[dict] = []
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+
+    def enqueue(self, message: dict) -> bool:
+        """Queue a message; returns False if the probe is hopelessly behind."""
+        if len(self.queue) >= self.maxsize:
+            victim = next((i for i, queued in enumerate(self.queue) if queued.get("type") == "ack"), None)
+            if victim is None:
+                return False
+            del self.queue[victim]
+            self.dropped += 1
+        self.queue.append(message)
+        self.ready.set()
+        return True
+
+    async def next_message(self) -> dict:
+        while not self.queue:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.queue.pop(0)
+
+    def stats(self) -> dict:
+        return {"queue_depth": len(self.queue), "sent": self.sent, "dropped": self.dropped}
+
+
+class DashboardStream:
+    """
+    The dashboards sharing one max update rate. A scan's first detection after a
+    quiet interval goes out at once; the ones arriving within 1/max_hz of it are
+    merged (latest state per object key) and sent once when the interval ends.
+    max_hz <= 0 forwards every message. Each stream has its own delta encoder,
+    since its members see the merged sequence.
+    """
+
+    def __init__(self, max_hz: float, deliver: Callable[["DashboardStream", dict], None]):
+        self.max_hz = max(0.0, max_hz)
+        self.interval = 1.0 / self.max_hz if self.max_hz > 0 else 0.0
+        self.deliver = deliver
+        self.delta_encoder = DetectionDeltaEncoder()
+        self.members: Set[str] = set()
+        self.pending: Dict[str, dict] = {}
+        self.timers: Dict[str, asyncio.TimerHandle] = {}
+        self.last_sent: Dict[str, float] = {}
+        self.merged = 0
+        self.sent = 0
+
+    def offer(self, message: dict):
+        """Hand a detection message to the stream; it is sent now or merged for later."""
+        if self.interval <= 0:
+            self._send(message.get("scan_id"), message)
+            return
+        scan_id = message.get("scan_id")
+        pending = self.pending.get(scan_id)
+        if pending is not None:
+            self.pending[scan_id] = merge_detections(pending, message)
+            self.merged += 1
+            return
+        wait = self.last_sent.get(scan_id, float("-inf")) + self.interval - time.monotonic()
+        if wait <= 0:
+            self._send(scan_id, message)
+            return
+        self.pending[scan_id] = message
+        self.timers[scan_id] = asyncio.get_running_loop().call_later(wait, self.flush, scan_id)
+
+    def flush(self, scan_id: Optional[str] = None):
+        """Send pending merged detections now (one scan, or all)."""
+        for sid in [scan_id] if scan_id is not None else list(self.pending):
+            timer = self.timers.pop(sid, None)
+            if timer is not None:
+                timer.cancel()
+            message = self.pending.pop(sid, None)
+            if message is not None:
+                self._send(sid, message)
+
+    def _send(self, scan_id: Optional[str], message: dict):
+        if self.interval > 0:
+            self.last_sent[scan_id] = time.monotonic()
+        self.sent += 1
+        self.deliver(self, message)
+
+    def forget(self, scan_id: Optional[str] = None):
+        for sid in [scan_id] if scan_id is not None else list(self.timers):
+            timer = self.timers.pop(sid, None)
+            if timer is not None:
+                timer.cancel()
+        if scan_id is None:
+            self.pending.clear()
+            self.last_sent.clear()
+        else:
+            self.pending.pop(scan_id, None)
+            self.last_sent.pop(scan_id, None)
+        self.delta_encoder.forget(scan_id)
+
+    def stats(self) -> dict:
+        return {
+            "members": len(self.members),
+            "sent": self.sent,
+            "merged": self.merged,
+            "pending": len(self.pending),
+            "delta": self.delta_encoder.stats(),
+        }
+
 
 class ConnectionManager:
     """
     Manages WebSocket connections for SpatialVCS.
     Distinguishes between 'Probe' (Data Senders) and 'Dashboard' (Data Receivers).
+    Broadcasts never wait on dashboard sockets: each message is serialized once
+    and queued to every dashboard's writer task. Dashboards connected in delta
+    mode get `detection_delta`/`detection_keyframe` messages instead of full
+    `detection` messages (see services/dashboard_delta.py).
+
+    Dashboards may subscribe to a subset of scans; a subscription index keyed
+    by scan_id keeps per-broadcast work proportional to the subscribers.
+    Dashboards with a max update rate share a rate-limited DashboardStream.
+
+    Messages to probes are queued the same way (ProbeConnection), so one probe
+    on a stalled network can't hold up acks to the others.
+
+    With an event bus, broadcasts are published on its "dashboards" channel and
+    every worker process delivers them to the dashboards it holds.
     """
-    def __init__(self):
+    def __init__(self, bus: Optional[EventBus] = None):
         # Active connections: client_id -> WebSocket
-        self.probes: Dict[str, WebSocket] = {}
-        self.dashboards: Dict[str, WebSocket] = {}
+        self.probes: Dict[str, ProbeConnection] = {}
+        self.dashboards: Dict[str, DashboardConnection] = {}
+        self.broadcasts = 0
+        self.evicted: Dict[str, int] = {"backlog": 0, "send_timeout": 0, "send_error": 0}
+        self.probes_dropped: Dict[str, int] = {"backlog": 0, "send_timeout": 0, "send_error": 0}
+        self._record = None
+        # Subscription index: scan_id -> client_ids; unscoped clients get every scan.
+        self._scan_index: Dict[str, Set[str]] = {}
+        self._unscoped: Set[str] = set()
+        # max_hz -> stream; the unlimited stream always exists.
+        self._streams: Dict[float, DashboardStream] = {0.0: DashboardStream(0.0, self._deliver_stream)}
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe("dashboards", self._broadcast_local)
+
+    @property
+    def delta_encoder(self) -> DetectionDeltaEncoder:
+        """Delta state of the unlimited (every frame) stream."""
+        return self._streams[0.0].delta_encoder
 
     async def connect_probe(self, websocket: WebSocket, client_id: str):
         await websocket.accept()
-        self.probes[client_id] = websocket
+        # A reconnect under the same id replaces the stale connection.
+        self._stop_probe_writer(self.probes.get(client_id))
+        conn = ProbeConnection(websocket, client_id)
+        conn.task = asyncio.create_task(self._probe_writer(conn))
+        self.probes[client_id] = conn
         print(f"📱 Probe connected: {client_id}")
 
-    async def connect_dashboard(self, websocket: WebSocket, client_id: str):
+    async def connect_dashboard(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        delta: bool = False,
+        encoding: str = "json",
+        max_hz: Optional[float] = None,
+    ):
         await websocket.accept()
-        self.dashboards[client_id] = websocket
-        print(f"💻 Dashboard connected: {client_id}")
+        # A reconnect under the same id replaces the stale connection.
+        self.disconnect_dashboard(client_id, quiet=True)
+        conn = DashboardConnection(websocket, client_id, delta=delta, encoding=resolve_encoding(encoding))
+        conn.task = asyncio.create_task(self._dashboard_writer(conn))
+        self.dashboards[client_id] = conn
+        self._join_stream(conn, DASHBOARD_MAX_HZ if max_hz is None else max_hz)
+        self._index_add(conn)
+        rate = f", {conn.stream.max_hz:g} Hz" if conn.stream.max_hz else ""
+        print(f"💻 Dashboard connected: {client_id} ({conn.encoding}{', delta' if delta else ''}{rate})")
 
     def disconnect_probe(self, client_id: str):
         if client_id in self.probes:
-            del self.probes[client_id]
+            self._stop_probe_writer(self.probes.pop(client_id))
             print(f"📱 Probe disconnected: {client_id}")
 
-    def disconnect_dashboard(self, client_id: str):
-        if client_id in self.dashboards:
-            del self.dashboards[client_id]
+    @staticmethod
+    def _stop_probe_writer(conn: Optional[ProbeConnection]):
+        if conn is not None and conn.task is not None and conn.task is not asyncio.current_task():
+            conn.task.cancel()
+
+    def _drop_probe(self, conn: ProbeConnection, reason: str):
+        """Disconnect a probe that can't keep up; its receive loop then sees the close."""
+        if self.probes.get(conn.client_id) is not conn:
+            return
+        self.probes_dropped[reason] += 1
+        print(f"⚠️ Dropping slow probe {conn.client_id} ({reason})")
+        self.disconnect_probe(conn.client_id)
+        asyncio.create_task(self._close(conn.websocket))
+
+    async def _probe_writer(self, conn: ProbeConnection):
+        while True:
+            message = await conn.next_message()
+            try:
+                await asyncio.wait_for(conn.websocket.send_json(message), PROBE_SEND_TIMEOUT_SEC)
+            except asyncio.TimeoutError:
+                self._drop_probe(conn, "send_timeout")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._drop_probe(conn, "send_error")
+                return
+            conn.sent += 1
+
+    def disconnect_dashboard(self, client_id: str, websocket: Optional[WebSocket] = None, quiet: bool = False):
+        """Drop a dashboard; with `websocket`, only if it is still that socket's connection."""
+        conn = self.dashboards.get(client_id)
+        if conn is None or (websocket is not None and conn.websocket is not websocket):
+            return
+        del self.dashboards[client_id]
+        self._index_remove(conn)
+        self._leave_stream(conn)
+        if conn.task is not None and conn.task is not asyncio.current_task():
+            conn.task.cancel()
+        if not quiet:
             print(f"💻 Dashboard disconnected: {client_id}")
 
-    async def broadcast_to_dashboards(self, message: dict):
-        """Send a JSON message to ALL connected dashboards."""
-        if not self.dashboards:
+    def _join_stream(self, conn: DashboardConnection, max_hz: float):
+        max_hz = max(0.0, float(max_hz or 0.0))
+        stream = self._streams.get(max_hz)
+        if stream is None:
+            stream = self._streams[max_hz] = DashboardStream(max_hz, self._deliver_stream)
+        stream.members.add(conn.client_id)
+        conn.stream = stream
+
+    def _leave_stream(self, conn: DashboardConnection):
+        stream = conn.stream
+        if stream is None:
+            return
+        stream.members.discard(conn.client_id)
+        if not stream.members and stream.max_hz > 0:
+            stream.forget()
+            self._streams.pop(stream.max_hz, None)
+
+    def set_rate(self, client_id: str, max_hz: float):
+        """Move a dashboard to the stream for `max_hz` detection updates/sec per scan (0 = every frame)."""
+        conn = self.dashboards.get(client_id)
+        if conn is None:
             return
-            
-        json_str = json.dumps(message)
-        to_remove = []
-        
-        for client_id, ws in self.dashboards.items():
+        max_hz = max(0.0, float(max_hz or 0.0))
+        if conn.stream is None or conn.stream.max_hz != max_hz:
+            self._leave_stream(conn)
+            self._join_stream(conn, max_hz)
+            # The new stream has its own delta versions: start over with keyframes.
+            conn.synced.clear()
+        self.acknowledge(client_id)
+
+    def _index_add(self, conn: DashboardConnection):
+        if conn.scan_ids is None:
+            self._unscoped.add(conn.client_id)
+            return
+        for scan_id in conn.scan_ids:
+            self._scan_index.setdefault(scan_id, set()).add(conn.client_id)
+
+    def _index_remove(self, conn: DashboardConnection):
+        self._unscoped.discard(conn.client_id)
+        for scan_id in conn.scan_ids or ():
+            subscribers = self._scan_index.get(scan_id)
+            if subscribers is not None:
+                subscribers.discard(conn.client_id)
+                if not subscribers:
+                    del self._scan_index[scan_id]
+
+    def subscribe(
+        self,
+        client_id: str,
+        scan_ids: Optional[Iterable[str]] = None,
+        probes: Optional[Iterable[str]] = None,
+        types: Optional[Iterable[str]] = None,
+        min_confidence: float = 0.0,
+    ):
+        """Replace a dashboard's subscription; empty/None filters mean everything."""
+        conn = self.dashboards.get(client_id)
+        if conn is None:
+            return
+        min_confidence = max(0.0, float(min_confidence or 0.0))
+        self._index_remove(conn)
+        conn.scan_ids, conn.probes, conn.types = _as_set(scan_ids), _as_set(probes), _as_set(types)
+        conn.min_confidence = min_confidence
+        self._index_add(conn)
+        # Deltas missed while unsubscribed no longer apply: start over with keyframes.
+        conn.synced.clear()
+        self.acknowledge(client_id)
+
+    def acknowledge(self, client_id: str):
+        """Tell a dashboard its current subscription and rate."""
+        conn = self.dashboards.get(client_id)
+        if conn is None:
+            return
+        if not conn.enqueue(None, encode({"type": "subscribed", **conn.subscription()}, conn.encoding)):
+            self._evict_dashboard(conn, "backlog")
+
+    def _subscribers(self, message: dict) -> List[DashboardConnection]:
+        scan_id = message.get("scan_id")
+        if scan_id is None:
+            candidates = self.dashboards.values()
+        else:
+            ids = self._unscoped.union(self._scan_index.get(scan_id, ()))
+            candidates = [self.dashboards[cid] for cid in ids if cid in self.dashboards]
+        return [conn for conn in candidates if conn.wants(message)]
+
+    def _evict_dashboard(self, conn: DashboardConnection, reason: str):
+        if self.dashboards.get(conn.client_id) is not conn:
+            return
+        self.evicted[reason] += 1
+        print(f"⚠️ Evicting slow dashboard {conn.client_id} ({reason})")
+        self.disconnect_dashboard(conn.client_id, quiet=True)
+        asyncio.create_task(self._close(conn.websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), DASHBOARD_SEND_TIMEOUT_SEC)
+        except Exception:
+            pass
+
+    async def _dashboard_writer(self, conn: DashboardConnection):
+        while True:
+            payload = await conn.next_payload()
+            if callable(payload):
+                payload = payload()
+                if payload is None:
+                    continue
+            started = time.perf_counter()
             try:
-                await ws.send_text(json_str)
+                send = conn.websocket.send_bytes if isinstance(payload, bytes) else conn.websocket.send_text
+                await asyncio.wait_for(send(payload), DASHBOARD_SEND_TIMEOUT_SEC)
+            except asyncio.TimeoutError:
+                self._evict_dashboard(conn, "send_timeout")
+                return
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"Error broadcasting to {client_id}: {e}")
-                to_remove.append(client_id)
-        
-        # Cleanup dead connections
-        for client_id in to_remove:
-            self.disconnect_dashboard(client_id)
+                print(f"Error broadcasting to {conn.client_id}: {e}")
+                self._evict_dashboard(conn, "send_error")
+                return
+            elapsed = (time.perf_counter() - started) * 1000.0
+            conn.send_ms = elapsed if conn.sent == 0 else 0.9 * conn.send_ms + 0.1 * elapsed
+            conn.sent += 1
+            conn.bytes_sent += len(payload)
+
+    async def broadcast_to_dashboards(self, message: dict):
+        """Queue a message for every subscribed dashboard, on every worker (never waits on sockets)."""
+        if DASHBOARD_RECORD_PATH and _coalesce_key(message) is not None:
+            self._record_message(message)
+        if self.bus is not None:
+            await self.bus.publish("dashboards", message)
+        else:
+            await self._broadcast_local(message)
+
+    async def _broadcast_local(self, message: dict):
+        """Queue a message for this worker's subscribed dashboards (serialized once per view)."""
+        key = _coalesce_key(message)
+        if key is None:
+            # Keep order: merged detections still pending for this scan go out first.
+            for stream in list(self._streams.values()):
+                stream.flush(message.get("scan_id"))
+        if message.get("type") in ("scan_completed", "system_reset"):
+            # A reset carries no scan_id and forgets every scan.
+            self._forget_scan(message.get("scan_id"))
+        if not self.dashboards:
+            return
+
+        conns = self._subscribers(message)
+        if not conns:
+            return
+        self.broadcasts += 1
+        if key is None:
+            self._deliver(message, conns, None)
+            return
+        for stream in {conn.stream for conn in conns}:
+            if stream.interval > 0:
+                stream.offer(message)
+            else:
+                stream.sent += 1
+                self._deliver(message, [conn for conn in conns if conn.stream is stream], stream)
+
+    def _deliver_stream(self, stream: DashboardStream, message: dict):
+        conns = [conn for conn in self._subscribers(message) if conn.stream is stream]
+        if conns:
+            self._deliver(message, conns, stream)
+
+    def _deliver(self, message: dict, conns: List[DashboardConnection], stream: Optional[DashboardStream]):
+        key = _coalesce_key(message)
+        full: Dict[tuple, Union[str, bytes]] = {}
+        deltas: Dict[tuple, Union[str, bytes]] = {}
+        kind, delta = None, None
+        if stream is not None and any(conn.delta for conn in conns):
+            kind, delta = stream.delta_encoder.update(message)
+
+        for conn in conns:
+            if conn.delta and stream is not None:
+                scan_id = key[1]
+                if kind == "keyframe":
+                    payload = stream.delta_encoder.keyframe(scan_id, conn.encoding, conn.min_confidence)
+                elif scan_id in conn.synced:
+                    if conn.view not in deltas:
+                        deltas[conn.view] = encode(filter_min_confidence(delta, conn.min_confidence), conn.encoding)
+                    payload = deltas[conn.view]
+                else:
+                    payload = conn.keyframe_payload(scan_id)
+                conn.synced.add(scan_id)
+            else:
+                if conn.view not in full:
+                    full[conn.view] = encode(filter_min_confidence(message, conn.min_confidence), conn.encoding)
+                payload = full[conn.view]
+            if not conn.enqueue(key, payload):
+                self._evict_dashboard(conn, "backlog")
+
+    def resync(self, client_id: str, scan_id: Optional[str] = None):
+        """Queue fresh keyframes for a delta dashboard (one scan, or every known scan)."""
+        conn = self.dashboards.get(client_id)
+        if conn is None or not conn.delta:
+            return
+        scan_ids = [scan_id] if scan_id else conn.stream.delta_encoder.scan_ids()
+        for sid in scan_ids:
+            if conn.scan_ids is not None and sid not in conn.scan_ids:
+                continue
+            conn.synced.add(sid)
+            if not conn.enqueue(("detection", sid), conn.keyframe_payload(sid)):
+                self._evict_dashboard(conn, "backlog")
+                return
+
+    def _forget_scan(self, scan_id: Optional[str]):
+        for stream in self._streams.values():
+            stream.forget(scan_id)
+        for conn in self.dashboards.values():
+            if scan_id is None:
+                conn.synced.clear()
+            else:
+                conn.synced.discard(scan_id)
+
+    def _record_message(self, message: dict):
+        try:
+            if self._record is None:
+                self._record = open(DASHBOARD_RECORD_PATH, "a", encoding="utf-8", buffering=1)
+            self._record.write(json.dumps(message) + "\n")
+        except Exception as e:
+            print(f"⚠️ Dashboard recording failed: {e}")
 
     async def send_to_probe(self, client_id: str, message: dict):
-        """Send message back to a specific probe (e.g. 'Scan Started')."""
-        if client_id in self.probes:
-            try:
-                await self.probes[client_id].send_json(message)
-            except:
-                self.disconnect_probe(client_id)
+        """Queue a message for a specific probe (e.g. 'Scan Started'); never waits on its socket."""
+        conn = self.probes.get(client_id)
+        if conn is not None and not conn.enqueue(message):
+            self._drop_probe(conn, "backlog")
+
+    def stats(self) -> dict:
+        return {
+            "probes": len(self.probes),
+            "probes_dropped": dict(self.probes_dropped),
+            "probe_queues": {client_id: conn.stats() for client_id, conn in self.probes.items()},
+            "bus": self.bus.stats() if self.bus is not None else None,
+            "broadcasts": self.broadcasts,
+            "evicted": dict(self.evicted),
+            "subscribed_scans": {scan_id: len(ids) for scan_id, ids in self._scan_index.items()},
+            "streams": {f"{hz:g}hz": stream.stats() for hz, stream in self._streams.items()},
+            "dashboards": {client_id: conn.stats() for client_id, conn in self.dashboards.items()},
+        }
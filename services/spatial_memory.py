@@ -1,99 +1,227 @@
+"""
+Vector memory of Gemini observations: SentenceTransformer embeddings in a
+VectorStore (Chroma by default, or the in-process FAISS engine; see
+services/vector_store.py).
+
+Probe observations go through a background ingest buffer: `enqueue_observations`
+returns immediately and a writer thread flushes every SPATIAL_MEMORY_INGEST_BATCH
+observations or SPATIAL_MEMORY_INGEST_FLUSH_MS, whichever comes first, with one
+batched encode and one store `add` per flush.
+
+Observations that carry an `object_key` (probe objects) are merged into one
+entity per physical object instead of one vector per sighting: a sighting joins
+the entity with the same (scan, probe, object key) if it is within
+SPATIAL_MEMORY_MERGE_RADIUS_M of it, or else any same-label entity of the scan
+within that radius whose embedding has cosine similarity of at least
+SPATIAL_MEMORY_MERGE_SIMILARITY. The entity is upserted with the latest text,
+position and time, plus `first_seen` and `sighting_count`. Set
+SPATIAL_MEMORY_DEDUP=0 to store every sighting.
+
+Text is also indexed in a BM25 inverted index (services/lexical_index.py),
+rebuilt from the store in the background at startup and updated on every
+upsert. `search` ranks by `mode`: "vector", "lexical", or "hybrid" (default,
+SPATIAL_SEARCH_MODE) which fuses both rankings with reciprocal rank fusion.
+Until the encoder has loaded, hybrid searches are answered lexically.
+
+Object positions (`position_3d`) are kept in a per-scan voxel hash
+(services/position_index.py, SPATIAL_POSITION_CELL_M cells, default 0.5 m),
+maintained the same way, for `nearby` radius / k-nearest queries.
+
+Stored observations are never loaded wholesale: `get_observations` pages through
+the store, and only the last SPATIAL_MEMORY_RECENT observations added by this
+process are kept in memory (`recent`).
+"""
+import itertools
 import json
+import math
 import os
-import sys
-from typing import Optional
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Union
 
-# Python 3.14+ PEP 649 compat: pydantic v1 (used by chromadb) reads
-# namespace["__annotations__"] which is None under deferred evaluation.
-# Patch the metaclass once so that __annotate_func__ is evaluated eagerly.
-if sys.version_info >= (3, 14):
-    try:
-        import pydantic.v1.main as _pv1_main
-
-        _orig_mc_new = _pv1_main.ModelMetaclass.__new__
-
-        def _patched_mc_new(mcs, name, bases, namespace, **kwargs):
-            if namespace.get("__annotations__") is None:
-                _af = namespace.get("__annotate_func__")
-                if _af is not None:
-                    try:
-                        namespace["__annotations__"] = _af(1)
-                    except Exception:
-                        namespace["__annotations__"] = {}
-            return _orig_mc_new(mcs, name, bases, namespace, **kwargs)
+import numpy as np
 
-        _pv1_main.ModelMetaclass.__new__ = _patched_mc_new
-    except Exception:
-        pass
+from services.embedding_cache import get_embedding_cache
+from services.lexical_index import BM25Index, reciprocal_rank_fusion
+from services.position_index import PositionIndex, position_xyz
+from services.vector_store import VectorStore, create_vector_store
 
 # Lazy-load heavy dependencies
 _encoder = None
-_chroma = None
+_encoder_lock = threading.Lock()
+_encoder_warmer: Optional[threading.Thread] = None
 vector_dim = 384
+ENCODER_MODEL = "all-MiniLM-L6-v2"
+DEDUP_ENABLED = os.getenv("SPATIAL_MEMORY_DEDUP", "1").strip().lower() not in ("0", "false", "no", "off")
+MERGE_RADIUS_M = float(os.getenv("SPATIAL_MEMORY_MERGE_RADIUS_M", "0.75"))
+MERGE_SIMILARITY = float(os.getenv("SPATIAL_MEMORY_MERGE_SIMILARITY", "0.8"))
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+SEARCH_MODE = os.getenv("SPATIAL_SEARCH_MODE", "hybrid").strip().lower()
+POSITION_CELL_M = float(os.getenv("SPATIAL_POSITION_CELL_M", "0.5"))
+
+
+def _int_env(name: str, default: int, minimum: int = 1) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        return default
 
 
 def _get_encoder():
     global _encoder
     if _encoder is None:
-        try:
-            from sentence_transformers import SentenceTransformer
+        with _encoder_lock:
+            if _encoder is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
 
-            _encoder = SentenceTransformer("all-MiniLM-L6-v2")
-            print("✅ Sentence Transformer model loaded.")
-        except Exception as e:
-            print(f"⚠️ SentenceTransformer not available: {e}")
+                    _encoder = SentenceTransformer(ENCODER_MODEL)
+                    print("✅ Sentence Transformer model loaded.")
+                except Exception as e:
+                    print(f"⚠️ SentenceTransformer not available: {e}")
     return _encoder
 
 
-def _get_chroma():
-    global _chroma
-    if _chroma is None:
-        try:
-            import chromadb
+def encoder_loaded() -> bool:
+    return _encoder is not None
 
-            _chroma = chromadb
-        except Exception as e:
-            print(f"⚠️ ChromaDB not available: {e}")
-    return _chroma
+
+def warm_encoder():
+    """Load the encoder on a background thread (one attempt per process)."""
+    global _encoder_warmer
+    if _encoder is None and _encoder_warmer is None:
+        _encoder_warmer = threading.Thread(target=_get_encoder, name="encoder-warm-up", daemon=True)
+        _encoder_warmer.start()
+
+
+def _distance(a, b) -> Optional[float]:
+    if not isinstance(a, dict) or not isinstance(b, dict):
+        return None
+    try:
+        return math.sqrt(sum((float(a.get(axis, 0.0)) - float(b.get(axis, 0.0))) ** 2 for axis in ("x", "y", "z")))
+    except (TypeError, ValueError):
+        return None
+
+
+class _Entity:
+    """In-memory view of one stored object entity (embedding is unit-length, None if loaded from the store)."""
+
+    __slots__ = ("id", "label", "position", "embedding", "meta")
+
+    def __init__(self, entity_id: str, label: str, position, embedding: Optional[np.ndarray], meta: dict):
+        self.id = entity_id
+        self.label = label
+        self.position = position
+        self.embedding = embedding
+        self.meta = meta
 
 
 class SpatialMemory:
-    def __init__(self, index_path: str = "data/memory/spatial_index.json"):
-        # Keep old argument name compatibility, but use ChromaDB persist dir.
+    def __init__(
+        self,
+        index_path: str = "data/memory/spatial_index.json",
+        persist_dir: Optional[str] = None,
+        backend: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        dedup: Optional[bool] = None,
+    ):
+        # Keep old argument name compatibility; the vector store has its own directory.
         self.index_path = index_path
-        self.persist_dir = "data/chroma"
-        self.metadata = []
-        self.collection = None
+        self.persist_dir = persist_dir
+        self.backend = backend
+        self.recent: deque = deque(maxlen=_int_env("SPATIAL_MEMORY_RECENT", 256))
+        self.store: Optional[VectorStore] = None
         self._initialized = False
-        self._id_counter = 0
+        self._init_lock = threading.Lock()
+        # Ids are unique per process lifetime without counting the store:
+        # a random prefix per instance plus a local sequence.
+        self._id_prefix = f"obs_{uuid.uuid4().hex[:12]}_"
+        self._id_counter = itertools.count()
+        self._id_lock = threading.Lock()
         self._warned_not_ready = False
+        self.embedding_cache = get_embedding_cache(ENCODER_MODEL)
+
+        self.search_mode = SEARCH_MODE if SEARCH_MODE in SEARCH_MODES else "hybrid"
+        self.lexical = BM25Index()
+        self.positions = PositionIndex(POSITION_CELL_M)
+        self.indexes_ready = False
+        self._index_lock = threading.Lock()
+        self._index_touched: set = set()  # ids upserted while the indexes were being rebuilt
+
+        self.dedup = DEDUP_ENABLED if dedup is None else dedup
+        self.merge_radius = MERGE_RADIUS_M
+        self.merge_similarity = MERGE_SIMILARITY
+        self._entity_lock = threading.Lock()
+        self._entities: Dict[str, Dict[str, _Entity]] = {}  # scan_id -> entity id -> entity
+        self._entity_keys: Dict[tuple, str] = {}  # (scan_id, source, object_key) -> entity id
+        self.entities_created = 0
+        self.sightings_merged = 0
+        # Bumped whenever a scan's observations change (answer cache keys); never reused after a reset.
+        self._generation = 0
+        self._reset_generation = 0
+        self._scan_generations: Dict[str, int] = {}
+
+        self.batch_size = batch_size or _int_env("SPATIAL_MEMORY_INGEST_BATCH", 32)
+        self.flush_interval = flush_interval if flush_interval is not None else (
+            _int_env("SPATIAL_MEMORY_INGEST_FLUSH_MS", 250) / 1000.0
+        )
+        self._ingest_queue: "queue.Queue" = queue.Queue(
+            maxsize=max_pending or _int_env("SPATIAL_MEMORY_INGEST_MAX_PENDING", 4096)
+        )
+        self._ingester: Optional[threading.Thread] = None
+        self._ingester_lock = threading.Lock()
+        self.ingested = 0
+        self.flushes = 0
+        self.dropped_backlog = 0
+        self.ingest_errors = 0
 
     def _ensure_init(self):
-        """Lazy-init: only load Chroma collection when first needed."""
+        """Lazy-init: only open the vector store when first needed."""
         if self._initialized:
             return
-        self._initialized = True
-
-        chroma = _get_chroma()
-        if chroma is None:
-            return
-
-        os.makedirs(self.persist_dir, exist_ok=True)
-        client = chroma.PersistentClient(path=self.persist_dir)
-        self.collection = client.get_or_create_collection(name="spatial_memory")
-
-        # Backfill local cache for compatibility with existing consumers.
+        with self._init_lock:
+            if not self._initialized:
+                self.store = create_vector_store(self.backend, self.persist_dir)
+                self._initialized = True
+                if self.store is not None:
+                    threading.Thread(target=self._build_indexes, name="spatial-memory-indexes", daemon=True).start()
+
+    def _index_record(self, item_id: str, text: str, meta: dict):
+        self.lexical.upsert(item_id, text, meta)
+        self.positions.upsert(item_id, meta.get("scan_id"), meta.get("position_3d"))
+
+    def _build_indexes(self):
+        """Rebuild the lexical and position indexes from the store, one page at a time."""
+        started = time.perf_counter()
         try:
-            snapshot = self.collection.get(include=["metadatas", "documents"])
-            docs = snapshot.get("documents", []) or []
-            metas = snapshot.get("metadatas", []) or []
-            self.metadata = []
-            for i, doc in enumerate(docs):
-                meta = metas[i] if i < len(metas) and isinstance(metas[i], dict) else {}
-                self.metadata.append({"text": doc, **meta})
-            self._id_counter = len(self.metadata)
+            for record in self.iter_observations():
+                with self._index_lock:
+                    if record["id"] not in self._index_touched:
+                        self._index_record(record["id"], str(record.get("text", "")), record)
         except Exception as e:
-            print(f"⚠️ Failed to warm Chroma cache: {e}")
+            print(f"⚠️ Lexical/position index rebuild failed: {e}")
+        finally:
+            with self._index_lock:
+                self._index_touched.clear()
+                self.indexes_ready = True
+        if len(self.lexical):
+            print(
+                f"✅ Lexical/position indexes: {len(self.lexical)} observations, {len(self.positions)} positioned"
+                f" in {time.perf_counter() - started:.1f}s"
+            )
+
+    def warm_up(self):
+        """Open the store (starting the index rebuild) and load the encoder, off the caller's thread."""
+        warm_encoder()
+        threading.Thread(target=self._ensure_init, name="spatial-memory-warm-up", daemon=True).start()
 
     def _serialize_meta(self, meta: dict):
         """Chroma metadata values should be scalar; stash nested values as JSON."""
@@ -123,95 +251,399 @@ class SpatialMemory:
         return restored
 
     def add_observation(self, text: str, meta: dict):
+        self.add_observations([(text, meta)])
+
+    def add_observations(self, items: List[Tuple[str, dict]]) -> int:
+        """Index (text, meta) pairs with one batched encode and one store upsert. Returns the count indexed."""
+        if not items:
+            return 0
         self._ensure_init()
         encoder = _get_encoder()
 
-        if encoder is None or self.collection is None:
+        if encoder is None or self.store is None:
             if not self._warned_not_ready:
                 print("⚠️ Cannot add observation: ML models/storage not loaded. (further warnings suppressed)")
                 self._warned_not_ready = True
-            return
+            return 0
+
+        texts = [text for text, _ in items]
+        embeddings = self.embedding_cache.encode(encoder, texts)
+        with self._entity_lock:
+            records = self._fold_entities(items, embeddings)
+            self.store.upsert(
+                list(records),
+                np.stack([embedding for _, embedding, _ in records.values()]),
+                [text for text, _, _ in records.values()],
+                [self._serialize_meta(meta) for _, _, meta in records.values()],
+            )
+            with self._index_lock:
+                for entity_id, (text, _, meta) in records.items():
+                    self._index_record(entity_id, text, meta)
+                    if not self.indexes_ready:
+                        self._index_touched.add(entity_id)
+            self._generation += 1
+            for _, _, meta in records.values():
+                self._scan_generations[str(meta.get("scan_id"))] = self._generation
+        self.recent.extend({"text": text, **meta} for text, meta in items)
+        return len(items)
+
+    def generation(self, scan_id: Optional[str] = None) -> int:
+        """Changes whenever observations of `scan_id` (or of any scan, if None) are written or reset."""
+        if not scan_id:
+            return self._generation
+        return self._scan_generations.get(str(scan_id), self._reset_generation)
+
+    def _next_id(self) -> str:
+        with self._id_lock:
+            return f"{self._id_prefix}{next(self._id_counter)}"
+
+    def _scan_entities(self, scan_id: str) -> Dict[str, _Entity]:
+        """Entities of a scan, loaded from the store the first time the scan is seen."""
+        entities = self._entities.get(scan_id)
+        if entities is None:
+            entities = self._entities[scan_id] = {}
+            for record in self.iter_observations(scan_id=scan_id):
+                if not record.get("object_key"):
+                    continue
+                entity = _Entity(record["id"], record.get("yolo_label", ""), record.get("position_3d"), None, record)
+                entities[entity.id] = entity
+                self._entity_keys[(scan_id, str(record.get("source")), str(record["object_key"]))] = entity.id
+        return entities
+
+    def _match_entity(self, scan_id: str, meta: dict, unit: np.ndarray) -> Optional[_Entity]:
+        entities = self._scan_entities(scan_id)
+        position = meta.get("position_3d")
+        entity = entities.get(self._entity_keys.get((scan_id, str(meta.get("source")), str(meta["object_key"])), ""))
+        if entity is not None:
+            distance = _distance(entity.position, position)
+            if distance is None or distance <= self.merge_radius:
+                return entity
+        # Tracker ids change after occlusion: fall back to a nearby, similar object of the same label.
+        best, best_similarity = None, self.merge_similarity
+        label = meta.get("yolo_label", "")
+        for candidate in entities.values():
+            if candidate.embedding is None or candidate.label != label:
+                continue
+            distance = _distance(candidate.position, position)
+            if distance is None or distance > self.merge_radius:
+                continue
+            similarity = float(candidate.embedding @ unit)
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+
+    def _fold_entities(self, items: List[Tuple[str, dict]], embeddings: np.ndarray) -> Dict[str, tuple]:
+        """Assign each observation to a new or existing entity; returns id -> (text, embedding, meta) to upsert."""
+        records: Dict[str, tuple] = {}
+        for (text, meta), embedding in zip(items, embeddings):
+            scan_id = meta.get("scan_id")
+            if not (self.dedup and scan_id and meta.get("object_key")):
+                records[self._next_id()] = (text, embedding, meta)
+                continue
+            unit = embedding / (float(np.linalg.norm(embedding)) or 1.0)
+            entity = self._match_entity(scan_id, meta, unit)
+            if entity is None:
+                entity = _Entity(self._next_id(), meta.get("yolo_label", ""), None, None, {})
+                self._entities[scan_id][entity.id] = entity
+                self.entities_created += 1
+            else:
+                self.sightings_merged += 1
+            previous = entity.meta
+            entity.meta = {
+                **meta,
+                "first_seen": previous.get("first_seen", meta.get("timestamp")),
+                "sighting_count": int(previous.get("sighting_count") or 0) + 1,
+                "confidence": max(float(previous.get("confidence") or 0.0), float(meta.get("confidence") or 0.0)),
+            }
+            entity.label = meta.get("yolo_label", "")
+            entity.position = meta.get("position_3d") or entity.position
+            entity.embedding = unit
+            self._entity_keys[(scan_id, str(meta.get("source")), str(meta["object_key"]))] = entity.id
+            records[entity.id] = (text, embedding, entity.meta)
+        return records
+
+    def enqueue_observations(self, items: List[Tuple[str, dict]]) -> int:
+        """Hand observations to the background ingester (never blocks). Returns the count accepted."""
+        if not items:
+            return 0
+        self._ensure_ingester()
+        accepted = 0
+        for item in items:
+            try:
+                self._ingest_queue.put_nowait(item)
+                accepted += 1
+            except queue.Full:
+                self.dropped_backlog += len(items) - accepted
+                break
+        return accepted
 
-        embedding = encoder.encode([text])[0]
-        item_id = f"obs_{self._id_counter}"
-        self._id_counter += 1
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every queued observation has been indexed."""
+        if self._ingester is None:
+            return
+        if timeout is None:
+            self._ingest_queue.join()
+            return
+        deadline = time.monotonic() + timeout
+        while self._ingest_queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
 
-        serialized_meta = self._serialize_meta(meta)
-        self.collection.add(
-            ids=[item_id],
-            documents=[text],
-            embeddings=[embedding.tolist()],
-            metadatas=[serialized_meta],
-        )
-        self.metadata.append({"text": text, **meta})
+    def _discard_pending(self):
+        while True:
+            try:
+                self._ingest_queue.get_nowait()
+            except queue.Empty:
+                return
+            self._ingest_queue.task_done()
 
-    def search(self, query: str, k: int = 3, scan_id: str = None):
+    def _ensure_ingester(self):
+        if self._ingester is not None and self._ingester.is_alive():
+            return
+        with self._ingester_lock:
+            if self._ingester is None or not self._ingester.is_alive():
+                self._ingester = threading.Thread(target=self._run_ingester, name="spatial-memory-ingest", daemon=True)
+                self._ingester.start()
+
+    def _run_ingester(self):
+        while True:
+            batch = [self._ingest_queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._ingest_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.ingested += self.add_observations(batch)
+                self.flushes += 1
+            except Exception as e:
+                self.ingest_errors += 1
+                print(f"Spatial memory add failed ({len(batch)} observations): {e}")
+            finally:
+                for _ in batch:
+                    self._ingest_queue.task_done()
+
+    @staticmethod
+    def build_where(
+        scan_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        yolo_label: Optional[Union[str, List[str]]] = None,
+        min_confidence: Optional[float] = None,
+        source: Optional[str] = None,
+    ) -> Optional[dict]:
+        """Chroma `where` clause for the structured search filters (None when unfiltered)."""
+        clauses = []
+        if scan_id:
+            clauses.append({"scan_id": {"$eq": scan_id}})
+        if since is not None:
+            clauses.append({"timestamp": {"$gte": float(since)}})
+        if until is not None:
+            clauses.append({"timestamp": {"$lte": float(until)}})
+        if yolo_label:
+            if isinstance(yolo_label, str):
+                clauses.append({"yolo_label": {"$eq": yolo_label}})
+            else:
+                clauses.append({"yolo_label": {"$in": list(yolo_label)}})
+        if min_confidence is not None and min_confidence > 0:
+            clauses.append({"confidence": {"$gte": float(min_confidence)}})
+        if source:
+            clauses.append({"source": {"$eq": source}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def search(
+        self,
+        query: str,
+        k: int = 3,
+        scan_id: str = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        yolo_label: Optional[Union[str, List[str]]] = None,
+        min_confidence: Optional[float] = None,
+        source: Optional[str] = None,
+        mode: Optional[str] = None,
+    ):
+        """Top-k observations for `query`; filters are evaluated inside each index.
+
+        Each result's `match` is the ranking actually used: hybrid falls back to
+        lexical while the encoder is still loading (or unavailable).
+        """
+        mode = (mode or self.search_mode).lower()
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode!r} (expected one of {', '.join(SEARCH_MODES)})")
         self._ensure_init()
-        encoder = _get_encoder()
-
-        if encoder is None or self.collection is None:
+        if self.store is None:
             return []
+        where = self.build_where(scan_id, since, until, yolo_label, min_confidence, source)
 
-        query_embedding = encoder.encode([query])[0].tolist()
-        fetch_k = max(k * 10, k) if scan_id else k
-        response = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=fetch_k,
-            include=["documents", "metadatas", "distances"],
-        )
-
-        docs = (response.get("documents") or [[]])[0]
-        metas = (response.get("metadatas") or [[]])[0]
-        distances = (response.get("distances") or [[]])[0]
+        if mode == "hybrid" and not encoder_loaded():
+            warm_encoder()
+            mode = "lexical"
+        if mode == "lexical":
+            ranked = self.lexical.search(query, k, where)
+            return self._results(self.store.get_by_ids([doc_id for doc_id, _ in ranked]), dict(ranked), mode)
 
+        encoder = _get_encoder()
+        if encoder is None:
+            return []
+        query_embedding = self.embedding_cache.encode(encoder, [query])[0]
+        if mode == "vector":
+            hits = self.store.query(query_embedding, k, where)
+            scores = {item_id: 1.0 / (1.0 + max(distance, 0.0)) for item_id, _, _, distance in hits}
+            return self._results([hit[:3] for hit in hits], scores, mode)
+
+        # Hybrid: fuse a deeper candidate list from each ranking.
+        depth = max(4 * k, 20)
+        hits = self.store.query(query_embedding, depth, where)
+        lexical_ids = [doc_id for doc_id, _ in self.lexical.search(query, depth, where)]
+        fused = reciprocal_rank_fusion([[hit[0] for hit in hits], lexical_ids], k)
+        records = {hit[0]: hit[:3] for hit in hits}
+        missing = [doc_id for doc_id, _ in fused if doc_id not in records]
+        records.update((record[0], record) for record in self.store.get_by_ids(missing))
+        return self._results([records[doc_id] for doc_id, _ in fused if doc_id in records], dict(fused), mode)
+
+    def _results(self, records: List[Tuple[str, str, dict]], scores: Dict[str, float], mode: str) -> List[dict]:
         results = []
-        for i, doc in enumerate(docs):
-            raw_meta = metas[i] if i < len(metas) else {}
+        for item_id, doc, raw_meta in records:
             meta = self._deserialize_meta(raw_meta)
-
-            if scan_id and meta.get("scan_id") != scan_id:
-                continue
-
-            distance = float(distances[i]) if i < len(distances) else 1.0
-            score = 1.0 / (1.0 + max(distance, 0.0))
             results.append(
                 {
-                    "score": score,
+                    "id": item_id,
+                    "score": scores[item_id],
                     "description": doc,
+                    "match": mode,
                     "metadata": {"text": doc, **meta},
                 }
             )
-            if len(results) >= k:
-                break
+        return results
 
+    def locate(self, scan_id: str, text: str) -> Optional[dict]:
+        """Best `search` match in the scan that has a position, e.g. the couch in "near the couch"."""
+        for result in self.search(text, 5, scan_id=scan_id):
+            if position_xyz(result["metadata"].get("position_3d")) is not None:
+                return result
+        return None
+
+    def nearby(
+        self,
+        scan_id: str,
+        position: dict,
+        radius: Optional[float] = None,
+        k: Optional[int] = None,
+        query: Optional[str] = None,
+        exclude: Optional[str] = None,
+    ) -> List[dict]:
+        """Observations of a scan within `radius` metres of `position` and/or its `k` nearest, nearest first.
+
+        With `query`, only observations whose text or label matches it lexically are considered.
+        """
+        self._ensure_init()
+        if self.store is None:
+            return []
+        allowed = None
+        if query:
+            where = self.build_where(scan_id=scan_id)
+            allowed = {doc_id for doc_id, _ in self.lexical.search(query, len(self.lexical), where)}
+            if not allowed:
+                return []
+        if radius is None and not k:
+            k = 10
+        limit = k + 1 if k and exclude else k  # the excluded object is usually among the nearest
+        if radius is not None:
+            hits = self.positions.within(scan_id, position, radius, limit=limit, allowed=allowed)
+        else:
+            hits = self.positions.nearest(scan_id, position, limit, allowed=allowed)
+        hits = [hit for hit in hits if hit[0] != exclude][:k or None]
+        distances = dict(hits)
+        results = []
+        for item_id, doc, raw_meta in self.store.get_by_ids([item_id for item_id, _ in hits]):
+            results.append(
+                {
+                    "id": item_id,
+                    "distance": distances[item_id],
+                    "description": doc,
+                    "metadata": {"text": doc, **self._deserialize_meta(raw_meta)},
+                }
+            )
         return results
 
+    def count(self) -> int:
+        self._ensure_init()
+        return self.store.count() if self.store is not None else 0
+
+    def get_observations(self, offset: int = 0, limit: int = 100, scan_id: Optional[str] = None) -> List[dict]:
+        """One page of stored observations (storage order), optionally for one scan."""
+        self._ensure_init()
+        if self.store is None:
+            return []
+        page = self.store.get(offset, limit, self.build_where(scan_id=scan_id))
+        return [{"id": item_id, "text": doc, **self._deserialize_meta(meta)} for item_id, doc, meta in page]
+
+    def iter_observations(self, page_size: int = 500, scan_id: Optional[str] = None):
+        """Stream every stored observation, one page in memory at a time."""
+        offset = 0
+        while True:
+            page = self.get_observations(offset, page_size, scan_id=scan_id)
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += len(page)
+
     def save(self):
-        # Chroma PersistentClient commits to disk automatically.
+        """Snapshot the vector store (Chroma commits to disk on its own)."""
         self._ensure_init()
-        return
+        if self.store is not None:
+            self.store.snapshot()
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
 
     def is_ready(self) -> bool:
         self._ensure_init()
-        return (_get_encoder() is not None) and (self.collection is not None)
+        return (_get_encoder() is not None) and (self.store is not None)
+
+    def stats(self) -> dict:
+        return {
+            "recent": len(self.recent),
+            "queued": self._ingest_queue.qsize(),
+            "ingested": self.ingested,
+            "flushes": self.flushes,
+            "avg_batch": round(self.ingested / self.flushes, 2) if self.flushes else 0.0,
+            "dropped_backlog": self.dropped_backlog,
+            "ingest_errors": self.ingest_errors,
+            "entities": sum(len(e) for e in self._entities.values()),
+            "entities_created": self.entities_created,
+            "sightings_merged": self.sightings_merged,
+            "lexical": {**self.lexical.stats(), "ready": self.indexes_ready},
+            "positions": {**self.positions.stats(), "ready": self.indexes_ready},
+            "encoder_loaded": encoder_loaded(),
+            "store": self.store.stats() if self.store is not None else None,
+        }
 
     def reset_database(self):
-        """Dangerous: Wipes all data from ChromaDB."""
+        """Dangerous: Wipes all data from the vector store."""
         self._ensure_init()
-        chroma = _get_chroma()
-        if chroma is None:
+        if self.store is None:
             return
 
         try:
-            client = chroma.PersistentClient(path=self.persist_dir)
-            try:
-                client.delete_collection(name="spatial_memory")
-            except Exception:
-                pass # Maybe didn't exist
-            
-            self.collection = client.get_or_create_collection(name="spatial_memory")
-            self.metadata = []
-            self._id_counter = 0
+            self.store.reset()
+            self._discard_pending()
+            self.recent.clear()
+            with self._entity_lock:
+                self._entities.clear()
+                self._entity_keys.clear()
+                self.lexical.clear()
+                self.positions.clear()
+                self._generation += 1
+                self._reset_generation = self._generation
+                self._scan_generations.clear()
             print("✅ Database reset complete.")
         except Exception as e:
             print(f"❌ Database reset failed: {e}")
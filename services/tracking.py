@@ -0,0 +1,194 @@
+"""
+Per-stream object tracking.
+
+Detection runs once per frame (batched across probes by the InferenceScheduler);
+association to stable track IDs is done here, with one lightweight tracker per
+probe/scan stream, so concurrent probes never share or corrupt each other's
+track state. Track IDs come from one process-wide counter and are therefore
+unique across streams.
+"""
+import itertools
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+def _iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N,4) and (M,4) xyxy boxes."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0).astype(np.float32)
+
+
+class IoUTracker:
+    """
+    ByteTrack-style two-pass IoU association without a motion model.
+    High-confidence detections are matched first, then low-confidence ones
+    against the remaining tracks; only high-confidence detections start tracks.
+    Tracks unmatched for more than `max_lost` frames are dropped.
+    """
+
+    def __init__(
+        self,
+        id_source: Callable[[], int],
+        iou_threshold: float = 0.3,
+        high_thresh: float = 0.5,
+        max_lost: int = 30,
+    ):
+        self.id_source = id_source
+        self.iou_threshold = iou_threshold
+        self.high_thresh = high_thresh
+        self.max_lost = max_lost
+        self.track_ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.classes = np.zeros(0, dtype=np.int64)
+        self.lost = np.zeros(0, dtype=np.int64)
+        self.lock = threading.Lock()
+
+    def update(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, commit: bool = True) -> np.ndarray:
+        """
+        Associate one frame of detections; returns a track ID per detection (-1 if none).
+        With `commit=False` the frame is only matched against the current tracks
+        (no box updates, no aging, no new tracks), for frames that arrive late.
+        """
+        xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        cls = np.asarray(cls, dtype=np.int64).reshape(-1)
+        n = len(xyxy)
+        ids = np.full(n, -1, dtype=np.int64)
+        track_matched = np.zeros(len(self.track_ids), dtype=bool)
+
+        iou = _iou_matrix(xyxy, self.boxes)
+        if iou.size:
+            iou[cls[:, None] != self.classes[None, :]] = 0.0
+            high = conf >= self.high_thresh
+            for det_mask in (high, ~high):
+                cand_d, cand_t = np.nonzero((iou >= self.iou_threshold) & det_mask[:, None])
+                order = np.argsort(-iou[cand_d, cand_t], kind="stable")
+                for d, t in zip(cand_d[order], cand_t[order]):
+                    if ids[d] != -1 or track_matched[t]:
+                        continue
+                    ids[d] = self.track_ids[t]
+                    track_matched[t] = True
+                    if commit:
+                        self.boxes[t] = xyxy[d]
+
+        if not commit:
+            return ids
+        self.lost = np.where(track_matched, 0, self.lost + 1)
+        keep = self.lost <= self.max_lost
+        self.track_ids = self.track_ids[keep]
+        self.boxes = self.boxes[keep]
+        self.classes = self.classes[keep]
+        self.lost = self.lost[keep]
+
+        new = np.nonzero((ids == -1) & (conf >= self.high_thresh))[0]
+        if len(new):
+            new_ids = np.array([self.id_source() for _ in new], dtype=np.int64)
+            ids[new] = new_ids
+            self.track_ids = np.concatenate([self.track_ids, new_ids])
+            self.boxes = np.concatenate([self.boxes, xyxy[new]])
+            self.classes = np.concatenate([self.classes, cls[new]])
+            self.lost = np.concatenate([self.lost, np.zeros(len(new), dtype=np.int64)])
+        return ids
+
+
+class TrackerRegistry:
+    """Trackers keyed by stream (probe/scan), evicted after SPATIAL_TRACKER_TTL_SEC idle."""
+
+    def __init__(self, ttl_sec: Optional[float] = None):
+        self.ttl_sec = ttl_sec if ttl_sec is not None else float(os.getenv("SPATIAL_TRACKER_TTL_SEC", "60"))
+        self.high_thresh = float(os.getenv("SPATIAL_TRACK_HIGH_THRESH", "0.5"))
+        self.iou_threshold = float(os.getenv("SPATIAL_TRACK_IOU", "0.3"))
+        self.max_lost = int(os.getenv("SPATIAL_TRACK_MAX_LOST", "30"))
+        self._trackers: Dict[str, IoUTracker] = {}
+        self._last_used: Dict[str, float] = {}
+        self._last_order: Dict[str, float] = {}  # stream -> order key of the newest frame associated
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._last_sweep = 0.0
+        self.evicted = 0
+        self.late_frames = 0
+
+    def _next_id(self) -> int:
+        return next(self._ids)
+
+    def update(self, stream_id: str, xyxy, conf, cls, order: Optional[float] = None) -> np.ndarray:
+        """
+        Track IDs for one frame of `stream_id`. `order` is the frame's position in
+        the stream (e.g. its receive time); a frame older than one already
+        associated is matched read-only so it cannot age or fork tracks.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            tracker = self._trackers.get(stream_id)
+            if tracker is None:
+                tracker = IoUTracker(self._next_id, self.iou_threshold, self.high_thresh, self.max_lost)
+                self._trackers[stream_id] = tracker
+            self._last_used[stream_id] = now
+            commit = True
+            if order is not None:
+                last = self._last_order.get(stream_id)
+                if last is not None and order < last:
+                    commit = False
+                    self.late_frames += 1
+                else:
+                    self._last_order[stream_id] = order
+        with tracker.lock:
+            return tracker.update(xyxy, conf, cls, commit=commit)
+
+    def _sweep(self, now: float):
+        if self.ttl_sec <= 0 or now - self._last_sweep < 1.0:
+            return
+        self._last_sweep = now
+        expired = [sid for sid, used in self._last_used.items() if now - used > self.ttl_sec]
+        for sid in expired:
+            self._drop(sid)
+
+    def _drop(self, stream_id: str):
+        if self._trackers.pop(stream_id, None) is not None:
+            self.evicted += 1
+        self._last_used.pop(stream_id, None)
+        self._last_order.pop(stream_id, None)
+
+    def evict(self, stream_id: str):
+        with self._lock:
+            self._drop(stream_id)
+
+    def evict_prefix(self, prefix: str):
+        """Drop every stream whose id starts with `prefix` (e.g. all scans of one probe)."""
+        with self._lock:
+            for sid in [sid for sid in self._trackers if sid.startswith(prefix)]:
+                self._drop(sid)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active_streams": len(self._trackers),
+                "active_tracks": int(sum(len(t.track_ids) for t in self._trackers.values())),
+                "evicted": self.evicted,
+                "late_frames": self.late_frames,
+                "ttl_sec": self.ttl_sec,
+            }
+
+
+_registry = None
+
+
+def get_tracker_registry() -> TrackerRegistry:
+    global _registry
+    if _registry is None:
+        _registry = TrackerRegistry()
+    return _registry
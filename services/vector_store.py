@@ -0,0 +1,756 @@
+"""
+Storage backends for SpatialMemory: where observation vectors, documents and
+metadata live and how nearest neighbours are found.
+
+  chroma  (default) Chroma PersistentClient, as before
+  faiss   in-process engine: memory-mapped float32 vectors, an append-only
+          JSONL metadata log and periodic snapshots. Search is exact NumPy
+          brute force below SPATIAL_VECTOR_HNSW_MIN vectors, a FAISS HNSW
+          index above it and IVF above SPATIAL_VECTOR_IVF_MIN (brute force
+          throughout if faiss-cpu is not installed).
+
+Selected with SPATIAL_MEMORY_BACKEND. Metadata values are Chroma-style scalars
+and `where` clauses use Chroma's operators ($and, $or, $eq, $ne, $in, $gt,
+$gte, $lt, $lte). Distances are squared L2 in both backends.
+
+Both backends are single-process: one process owns a store directory (an
+exclusive lock file in it), and neither is opened when the server runs more
+than one worker (SPATIAL_WORKERS or WEB_CONCURRENCY > 1). Spatial memory
+search is then disabled; run memory on a single-worker instance instead.
+"""
+import json
+import math
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, the worker check still applies
+    fcntl = None
+
+# Python 3.14+ PEP 649 compat: pydantic v1 (used by chromadb) reads
+# namespace["__annotations__"] which is None under deferred evaluation.
+# Patch the metaclass once so that __annotate_func__ is evaluated eagerly.
+if sys.version_info >= (3, 14):
+    try:
+        import pydantic.v1.main as _pv1_main
+
+        _orig_mc_new = _pv1_main.ModelMetaclass.__new__
+
+        def _patched_mc_new(mcs, name, bases, namespace, **kwargs):
+            if namespace.get("__annotations__") is None:
+                _af = namespace.get("__annotate_func__")
+                if _af is not None:
+                    try:
+                        namespace["__annotations__"] = _af(1)
+                    except Exception:
+                        namespace["__annotations__"] = {}
+            return _orig_mc_new(mcs, name, bases, namespace, **kwargs)
+
+        _pv1_main.ModelMetaclass.__new__ = _patched_mc_new
+    except Exception:
+        pass
+
+# Lazy-load heavy dependencies
+_chroma = None
+_faiss = None
+
+# (id, document, serialized metadata, distance)
+QueryHit = Tuple[str, str, dict, float]
+
+
+def _int_env(name: str, default: int, minimum: int = 1) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        return default
+
+
+def _get_chroma():
+    global _chroma
+    if _chroma is None:
+        try:
+            import chromadb
+
+            _chroma = chromadb
+        except Exception as e:
+            print(f"⚠️ ChromaDB not available: {e}")
+    return _chroma
+
+
+def _get_faiss():
+    global _faiss
+    if _faiss is None:
+        try:
+            import faiss
+
+            _faiss = faiss
+        except Exception as e:
+            print(f"⚠️ faiss-cpu not available ({e}); using exact NumPy search.")
+            _faiss = False
+    return _faiss or None
+
+
+class VectorStore:
+    """Ids, documents and metadata are handled exactly like a Chroma collection's."""
+
+    name = "base"
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[dict]):
+        raise NotImplementedError
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[dict]):
+        """Insert new ids and replace the vector, document and metadata of existing ones."""
+        raise NotImplementedError
+
+    def query(self, embedding: np.ndarray, k: int, where: Optional[dict] = None) -> List[QueryHit]:
+        raise NotImplementedError
+
+    def get(self, offset: int = 0, limit: int = 100, where: Optional[dict] = None) -> List[Tuple[str, str, dict]]:
+        raise NotImplementedError
+
+    def get_by_ids(self, ids: List[str]) -> List[Tuple[str, str, dict]]:
+        """(id, document, metadata) for the ids that exist, in the order given."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+    def snapshot(self):
+        pass
+
+    def close(self):
+        self.snapshot()
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "count": self.count()}
+
+
+class ChromaStore(VectorStore):
+    name = "chroma"
+
+    def __init__(self, persist_dir: str = "data/chroma"):
+        chroma = _get_chroma()
+        if chroma is None:
+            raise RuntimeError("chromadb is not installed")
+        self.persist_dir = persist_dir
+        os.makedirs(persist_dir, exist_ok=True)
+        self._client = chroma.PersistentClient(path=persist_dir)
+        self.collection = self._client.get_or_create_collection(name="spatial_memory")
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.collection.add(
+            ids=list(ids),
+            documents=list(documents),
+            embeddings=[embedding.tolist() for embedding in embeddings],
+            metadatas=list(metadatas),
+        )
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(
+            ids=list(ids),
+            documents=list(documents),
+            embeddings=[embedding.tolist() for embedding in embeddings],
+            metadatas=list(metadatas),
+        )
+
+    def query(self, embedding, k, where=None):
+        query_kwargs = {"where": where} if where else {}
+        response = self.collection.query(
+            query_embeddings=[np.asarray(embedding).tolist()],
+            n_results=k,
+            include=["documents", "metadatas", "distances"],
+            **query_kwargs,
+        )
+        ids = (response.get("ids") or [[]])[0]
+        docs = (response.get("documents") or [[]])[0]
+        metas = (response.get("metadatas") or [[]])[0]
+        distances = (response.get("distances") or [[]])[0]
+        return [
+            (
+                item_id,
+                docs[i] if i < len(docs) else "",
+                metas[i] if i < len(metas) and isinstance(metas[i], dict) else {},
+                float(distances[i]) if i < len(distances) else 1.0,
+            )
+            for i, item_id in enumerate(ids)
+        ]
+
+    def get(self, offset=0, limit=100, where=None):
+        query_kwargs = {"where": where} if where else {}
+        page = self.collection.get(
+            limit=max(1, limit), offset=max(0, offset), include=["metadatas", "documents"], **query_kwargs
+        )
+        docs = page.get("documents") or []
+        metas = page.get("metadatas") or []
+        return [
+            (item_id, docs[i] if i < len(docs) else "", metas[i] if i < len(metas) and isinstance(metas[i], dict) else {})
+            for i, item_id in enumerate(page.get("ids") or [])
+        ]
+
+    def get_by_ids(self, ids):
+        if not ids:
+            return []
+        page = self.collection.get(ids=list(ids), include=["metadatas", "documents"])
+        docs = page.get("documents") or []
+        metas = page.get("metadatas") or []
+        found = {
+            item_id: (item_id, docs[i] if i < len(docs) else "", metas[i] if i < len(metas) and isinstance(metas[i], dict) else {})
+            for i, item_id in enumerate(page.get("ids") or [])
+        }
+        return [found[item_id] for item_id in ids if item_id in found]
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def reset(self):
+        try:
+            self._client.delete_collection(name="spatial_memory")
+        except Exception:
+            pass  # Maybe didn't exist
+        self.collection = self._client.get_or_create_collection(name="spatial_memory")
+
+
+class _Column:
+    """Growable 1-D NumPy column (capacity doubling)."""
+
+    def __init__(self, dtype, fill=0):
+        self.fill = fill
+        self.data = np.full(1024, fill, dtype=dtype)
+        self.n = 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        end = self.n + len(values)
+        if end > len(self.data):
+            grown = np.full(max(end, 2 * len(self.data)), self.fill, dtype=self.data.dtype)
+            grown[:self.n] = self.data[:self.n]
+            self.data = grown
+        self.data[self.n:end] = values
+        self.n = end
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.n]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Files under `root`:
+      vectors.f32     float32 rows, memory-mapped, grown by doubling
+      metadata.jsonl  one [id, document, metadata] line per write, append-only;
+                      the last line for an id is current
+      snapshot.npz    filter columns + log offsets up to a row count, and the
+                      rows overwritten since the index was built
+      index.faiss     the ANN index as of the snapshot
+    On open, the snapshot is loaded and only the log tail after it is replayed.
+    Filterable fields are kept as NumPy columns so `where` is a vectorized mask.
+    Upserts overwrite a row in place. The ANN index keeps the old vector until
+    it is rebuilt, so rows changed since the build are searched exactly next to
+    the index and every candidate is ranked by its current vector.
+    """
+
+    name = "faiss"
+    CATEGORICAL = ("scan_id", "yolo_label", "source")
+    NUMERIC = ("timestamp", "confidence")
+
+    def __init__(
+        self,
+        root: str = "data/vectors",
+        hnsw_min: Optional[int] = None,
+        ivf_min: Optional[int] = None,
+        snapshot_sec: Optional[float] = None,
+        snapshot_rows: Optional[int] = None,
+    ):
+        self.root = root
+        self.hnsw_min = hnsw_min or _int_env("SPATIAL_VECTOR_HNSW_MIN", 20000)
+        self.ivf_min = ivf_min or _int_env("SPATIAL_VECTOR_IVF_MIN", 2000000)
+        self.snapshot_sec = snapshot_sec if snapshot_sec is not None else float(
+            os.getenv("SPATIAL_VECTOR_SNAPSHOT_SEC", "60")
+        )
+        self.snapshot_rows = snapshot_rows or _int_env("SPATIAL_VECTOR_SNAPSHOT_ROWS", 10000)
+        self._faiss = _get_faiss()
+        self._lock = threading.RLock()
+        self.snapshots = 0
+        self._open()
+
+    # ---- files -------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _reset_state(self):
+        self.dim: Optional[int] = None
+        self._n = 0
+        self._vectors: Optional[np.memmap] = None
+        self._offsets = _Column(np.int64)
+        self._norms = _Column(np.float32)
+        self._codes = {field: _Column(np.int32, -1) for field in self.CATEGORICAL}
+        self._numeric = {field: _Column(np.float64, np.nan) for field in self.NUMERIC}
+        self._vocab: Dict[str, Dict[str, int]] = {field: {} for field in self.CATEGORICAL}
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._index = None
+        self._index_kind = "flat"
+        self._index_rows = 0
+        self._stale: set = set()  # indexed rows overwritten since the index was built
+        self._dirty = 0  # writes since the last snapshot
+        self._snapshot_at = time.monotonic()
+
+    def _open(self):
+        os.makedirs(self.root, exist_ok=True)
+        self._reset_state()
+        info_path = self._path("store.json")
+        if os.path.exists(info_path):
+            with open(info_path, "r", encoding="utf-8") as f:
+                self.dim = int(json.load(f)["dim"])
+        log_start = self._load_snapshot() if self.dim else 0
+        self._log = open(self._path("metadata.jsonl"), "ab")
+        self._reader = open(self._path("metadata.jsonl"), "rb")
+        if self.dim:
+            self._map_vectors(self._n)
+            self._replay_log(log_start)
+            self._sync_index()
+        if self._n:
+            print(f"✅ Vector store loaded {self._n} vectors from {self.root} ({self._index_kind})")
+
+    def _load_snapshot(self) -> int:
+        """Load filter columns from the last snapshot; returns the log offset to replay from."""
+        path = self._path("snapshot.npz")
+        if not os.path.exists(path):
+            return 0
+        try:
+            with np.load(path) as snap:
+                rows = int(snap["rows"])
+                self._offsets.extend(snap["offsets"][:rows])
+                self._norms.extend(snap["norms"][:rows])
+                for field in self.CATEGORICAL:
+                    self._codes[field].extend(snap[f"code_{field}"][:rows])
+                for field in self.NUMERIC:
+                    self._numeric[field].extend(snap[f"num_{field}"][:rows])
+                self._vocab = json.loads(str(snap["vocab"]))
+                self._ids = snap["ids"][:rows].tolist()
+                log_size = int(snap["log_size"])
+                index_rows = int(snap["index_rows"])
+                # Older snapshots did not record stale rows; their index is rebuilt instead.
+                stale = snap["stale"].tolist() if "stale" in snap.files else None
+            self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+            self._n = rows
+            if index_rows and stale is not None and self._faiss is not None and os.path.exists(self._path("index.faiss")):
+                self._index = self._faiss.read_index(self._path("index.faiss"))
+                self._index_rows = index_rows
+                self._index_kind = "ivf" if "IVF" in type(self._index).__name__ else "hnsw"
+                self._stale = set(stale)
+            return log_size
+        except Exception as e:
+            print(f"⚠️ Vector store snapshot unusable ({e}); replaying the full log.")
+            self._reset_state()
+            with open(self._path("store.json"), "r", encoding="utf-8") as f:
+                self.dim = int(json.load(f)["dim"])
+            return 0
+
+    def _replay_log(self, start: int):
+        self._reader.seek(start)
+        offset = start
+        ids, offsets, metadatas = [], [], []
+        while True:
+            line = self._reader.readline()
+            if not line:
+                break
+            if not line.endswith(b"\n"):
+                # Torn final write: drop it so the next append starts on a clean line.
+                self._log.truncate(offset)
+                break
+            try:
+                item_id, _, meta = json.loads(line)
+            except ValueError:
+                self._log.truncate(offset)
+                break
+            ids.append(item_id)
+            offsets.append(offset)
+            metadatas.append(meta)
+            offset += len(line)
+        self._log.seek(0, os.SEEK_END)
+        if ids and self._vectors is not None:
+            self._apply(ids, self._plan_rows(ids), offsets, metadatas)
+            self._dirty = len(ids)
+
+    def _map_vectors(self, rows: int):
+        """Ensure the vector file holds at least `rows` rows (capacity doubling)."""
+        if self._vectors is not None and rows <= self._vectors.shape[0]:
+            return
+        path = self._path("vectors.f32")
+        row_bytes = self.dim * 4
+        capacity = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+        if rows > capacity:
+            capacity = max(rows, 2 * capacity, 4096)
+            with open(path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        if capacity == 0:
+            return
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _plan_rows(self, ids: List[str]) -> List[int]:
+        """Row of each id: existing ids keep theirs, new ids take the next rows in order."""
+        rows, fresh = [], {}
+        for item_id in ids:
+            row = self._rows.get(item_id)
+            if row is None:
+                row = fresh.setdefault(item_id, self._n + len(fresh))
+            rows.append(row)
+        return rows
+
+    def _code(self, field: str, value) -> int:
+        if value is None or value == "":
+            return -1
+        vocab = self._vocab[field]
+        return vocab.setdefault(str(value), len(vocab))
+
+    def _apply(self, ids, rows, offsets, metadatas):
+        """Point rows at their latest log lines and refresh their filter columns and norms."""
+        grow = max(rows) + 1 - self._n
+        if grow > 0:
+            self._offsets.extend(np.zeros(grow, dtype=np.int64))
+            self._norms.extend(np.zeros(grow, dtype=np.float32))
+            for column in self._codes.values():
+                column.extend(np.full(grow, -1, dtype=np.int32))
+            for column in self._numeric.values():
+                column.extend(np.full(grow, np.nan))
+            self._ids.extend([None] * grow)
+            self._n += grow
+        for item_id, row, offset, meta in zip(ids, rows, offsets, metadatas):
+            self._ids[row] = item_id
+            self._rows[item_id] = row
+            self._offsets.data[row] = offset
+            for field, column in self._codes.items():
+                column.data[row] = self._code(field, meta.get(field))
+            for field, column in self._numeric.items():
+                value = meta.get(field)
+                column.data[row] = float(value) if isinstance(value, (int, float)) else np.nan
+            if row < self._index_rows:
+                self._stale.add(row)
+        touched = np.unique(rows)
+        vectors = self._vectors[touched]
+        self._norms.data[touched] = np.einsum("ij,ij->i", vectors, vectors)
+
+    # ---- index -------------------------------------------------------
+
+    def _sync_index(self):
+        """Pick the index for the current size and add rows it has not seen yet."""
+        if self._faiss is None or self._n < self.hnsw_min:
+            return
+        wanted = "ivf" if self._n >= self.ivf_min else "hnsw"
+        if self._index is None or self._index_kind != wanted or len(self._stale) > max(1000, self._index_rows // 5):
+            self._build_index(wanted)
+            return
+        if self._index_rows < self._n:
+            self._index.add(np.ascontiguousarray(self._vectors[self._index_rows:self._n]))
+            self._index_rows = self._n
+
+    def _build_index(self, kind: str):
+        faiss = self._faiss
+        started = time.perf_counter()
+        vectors = self._vectors[:self._n]
+        if kind == "ivf":
+            nlist = int(4 * math.sqrt(self._n))
+            index = faiss.IndexIVFFlat(faiss.IndexFlatL2(self.dim), self.dim, nlist)
+            sample = np.random.default_rng(0).choice(self._n, size=min(self._n, nlist * 64), replace=False)
+            index.train(np.ascontiguousarray(vectors[np.sort(sample)]))
+            index.nprobe = _int_env("SPATIAL_VECTOR_IVF_NPROBE", 16)
+        else:
+            index = faiss.IndexHNSWFlat(self.dim, 32)
+            index.hnsw.efConstruction = 40
+            index.hnsw.efSearch = _int_env("SPATIAL_VECTOR_HNSW_EF", 64)
+        for start in range(0, self._n, 65536):
+            index.add(np.ascontiguousarray(vectors[start:start + 65536]))
+        self._index, self._index_kind, self._index_rows = index, kind, self._n
+        self._stale = set()
+        print(f"✅ Built {kind} index over {self._n} vectors in {time.perf_counter() - started:.1f}s")
+
+    # ---- filters -----------------------------------------------------
+
+    def _mask(self, where: dict) -> np.ndarray:
+        n = self._n
+        if "$and" in where:
+            mask = np.ones(n, dtype=bool)
+            for clause in where["$and"]:
+                mask &= self._mask(clause)
+            return mask
+        if "$or" in where:
+            mask = np.zeros(n, dtype=bool)
+            for clause in where["$or"]:
+                mask |= self._mask(clause)
+            return mask
+        mask = np.ones(n, dtype=bool)
+        for field, condition in where.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                mask &= self._compare(field, op, value)
+        return mask
+
+    def _compare(self, field: str, op: str, value) -> np.ndarray:
+        if field in self._codes:
+            column = self._codes[field].view()
+            vocab = self._vocab[field]
+            if op in ("$eq", "$ne"):
+                code = vocab.get(str(value), -2)
+                return column == code if op == "$eq" else column != code
+            if op in ("$in", "$nin"):
+                codes = [vocab[str(v)] for v in value if str(v) in vocab]
+                hit = np.isin(column, codes)
+                return hit if op == "$in" else ~hit
+        elif field in self._numeric:
+            column = self._numeric[field].view()
+            value = float(value)
+            ops = {
+                "$eq": np.equal, "$ne": np.not_equal,
+                "$gt": np.greater, "$gte": np.greater_equal,
+                "$lt": np.less, "$lte": np.less_equal,
+            }
+            if op in ops:
+                return ops[op](column, value)
+        raise ValueError(f"Unsupported filter {field} {op}")
+
+    # ---- VectorStore -------------------------------------------------
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.upsert(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if not len(embeddings):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(embeddings.shape[1])
+                with open(self._path("store.json"), "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim}, f)
+            rows = self._plan_rows(ids)
+            # Vectors first, then the log lines that make them current.
+            self._map_vectors(max(rows) + 1)
+            self._vectors[rows] = embeddings
+            offsets = []
+            lines = []
+            position = self._log.tell()
+            for item_id, document, meta in zip(ids, documents, metadatas):
+                line = (json.dumps([item_id, document, meta], ensure_ascii=False) + "\n").encode("utf-8")
+                offsets.append(position)
+                position += len(line)
+                lines.append(line)
+            self._log.write(b"".join(lines))
+            self._log.flush()
+            self._apply(ids, rows, offsets, metadatas)
+            self._dirty += len(ids)
+            self._sync_index()
+            if self._dirty >= self.snapshot_rows or (
+                self._dirty and time.monotonic() - self._snapshot_at >= self.snapshot_sec
+            ):
+                self.snapshot()
+
+    def _read(self, row: int) -> Tuple[str, str, dict]:
+        self._reader.seek(int(self._offsets.data[row]))
+        item_id, document, meta = json.loads(self._reader.readline())
+        return item_id, document, meta
+
+    def _brute_force(self, query: np.ndarray, k: int, rows: Optional[np.ndarray]):
+        n = self._n
+        vectors = self._vectors[:n] if rows is None else self._vectors[rows]
+        norms = self._norms.view() if rows is None else self._norms.view()[rows]
+        distances = norms - 2.0 * (vectors @ query) + float(query @ query)
+        k = min(k, len(distances))
+        top = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+        top = top[np.argsort(distances[top])]
+        found = top if rows is None else rows[top]
+        return found, distances[top]
+
+    def _index_search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray]):
+        faiss = self._faiss
+        params = None
+        bitmap = None
+        if mask is not None:
+            bitmap = np.packbits(mask, bitorder="little")
+            selector = faiss.IDSelectorBitmap(mask.size, faiss.swig_ptr(bitmap))
+            if self._index_kind == "ivf":
+                params = faiss.SearchParametersIVF(sel=selector, nprobe=self._index.nprobe)
+            else:
+                params = faiss.SearchParametersHNSW(sel=selector, efSearch=max(self._index.hnsw.efSearch, k))
+        _, labels = self._index.search(query[None, :], k, params=params)
+        del bitmap
+        found = labels[0][labels[0] >= 0]
+        if self._stale:
+            # The index may hold an old vector for these rows; check them exactly.
+            stale = np.fromiter(self._stale, dtype=np.int64, count=len(self._stale))
+            if mask is not None:
+                stale = stale[mask[stale]]
+            found = np.union1d(found, stale)
+        vectors = self._vectors[found]
+        distances = self._norms.data[found] - 2.0 * (vectors @ query) + float(query @ query)
+        order = np.argsort(distances)[:k]
+        return found[order], distances[order]
+
+    def query(self, embedding, k, where=None):
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        with self._lock:
+            if self._n == 0 or k <= 0:
+                return []
+            mask = self._mask(where) if where else None
+            rows = np.flatnonzero(mask) if mask is not None else None
+            if rows is not None and not len(rows):
+                return []
+            if self._index is None or (rows is not None and len(rows) <= self.hnsw_min):
+                found, distances = self._brute_force(query, k, rows)
+            else:
+                found, distances = self._index_search(query, k, mask)
+            return [(*self._read(row), float(distance)) for row, distance in zip(found.tolist(), distances.tolist())]
+
+    def get(self, offset=0, limit=100, where=None):
+        with self._lock:
+            if where:
+                rows = np.flatnonzero(self._mask(where))[max(0, offset):max(0, offset) + max(1, limit)].tolist()
+            else:
+                rows = range(max(0, offset), min(self._n, max(0, offset) + max(1, limit)))
+            return [self._read(row) for row in rows]
+
+    def get_by_ids(self, ids):
+        with self._lock:
+            return [self._read(self._rows[item_id]) for item_id in ids if item_id in self._rows]
+
+    def count(self) -> int:
+        return self._n
+
+    def snapshot(self):
+        """Persist filter columns and the ANN index so a restart only replays the log tail."""
+        with self._lock:
+            if not self.dim:
+                return
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            index_rows = 0
+            stale = np.zeros(0, dtype=np.int64)
+            if self._index is not None:
+                self._faiss.write_index(self._index, self._path("index.faiss.tmp"))
+                os.replace(self._path("index.faiss.tmp"), self._path("index.faiss"))
+                index_rows = self._index_rows
+                stale = np.fromiter(self._stale, dtype=np.int64, count=len(self._stale))
+            with open(self._path("snapshot.npz.tmp"), "wb") as f:
+                np.savez(
+                    f,
+                    rows=self._n,
+                    log_size=self._log.tell(),
+                    index_rows=index_rows,
+                    stale=stale,
+                    offsets=self._offsets.view(),
+                    norms=self._norms.view(),
+                    vocab=json.dumps(self._vocab),
+                    ids=np.array(self._ids, dtype=str),
+                    **{f"code_{field}": column.view() for field, column in self._codes.items()},
+                    **{f"num_{field}": column.view() for field, column in self._numeric.items()},
+                )
+            os.replace(self._path("snapshot.npz.tmp"), self._path("snapshot.npz"))
+            self._dirty = 0
+            self._snapshot_at = time.monotonic()
+            self.snapshots += 1
+
+    def reset(self):
+        with self._lock:
+            self._log.close()
+            self._reader.close()
+            self._vectors = None
+            for name in ("vectors.f32", "metadata.jsonl", "snapshot.npz", "index.faiss", "store.json"):
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+            self._open()
+
+    def close(self):
+        self.snapshot()
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "count": self._n,
+            "dim": self.dim,
+            "index": self._index_kind,
+            "indexed_rows": self._index_rows,
+            "snapshots": self.snapshots,
+            "stale_index_rows": len(self._stale),
+            "unsnapshotted_writes": self._dirty,
+        }
+
+
+VECTOR_STORE_BACKENDS = ("chroma", "faiss")
+
+
+def _worker_count() -> int:
+    """Worker processes the server runs (uvicorn and gunicorn default --workers to WEB_CONCURRENCY)."""
+    for name in ("SPATIAL_WORKERS", "WEB_CONCURRENCY"):
+        try:
+            return max(1, int(os.getenv(name, "")))
+        except ValueError:
+            continue
+    return 1
+
+
+def _claim_directory(path: str):
+    """Take the store directory's owner lock; held until this process exits."""
+    os.makedirs(path, exist_ok=True)
+    handle = open(os.path.join(path, ".owner.lock"), "a+")
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        raise RuntimeError(f"{path} is already open in another process (stores are single-process)")
+    return handle
+
+
+def create_vector_store(backend: Optional[str] = None, persist_dir: Optional[str] = None) -> Optional[VectorStore]:
+    """Build the configured backend; None when it cannot be created (search is then disabled)."""
+    backend = (backend or os.getenv("SPATIAL_MEMORY_BACKEND", "chroma")).lower()
+    if backend not in VECTOR_STORE_BACKENDS:
+        print(f"⚠️ Unknown memory backend '{backend}', using chroma. Options: {', '.join(VECTOR_STORE_BACKENDS)}")
+        backend = "chroma"
+    workers = _worker_count()
+    if workers > 1:
+        print(
+            f"⚠️ Vector store '{backend}' is single-process; not opening it with {workers} workers. "
+            "Spatial memory search is disabled on this instance."
+        )
+        return None
+    owner = None
+    try:
+        if backend == "faiss":
+            root = persist_dir or os.getenv("SPATIAL_VECTOR_DIR", "data/vectors")
+            owner = _claim_directory(root)
+            store = LocalVectorStore(root)
+        else:
+            root = persist_dir or "data/chroma"
+            owner = _claim_directory(root)
+            store = ChromaStore(root)
+        store._owner_lock = owner
+        return store
+    except Exception as e:
+        if owner is not None:
+            owner.close()
+        print(f"⚠️ Vector store '{backend}' not available: {e}")
+        return None
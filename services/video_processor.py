@@ -1,24 +1,242 @@
 import cv2
 import numpy as np
-import uuid
 import os
 import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Optional
+from services.frame_store import get_frame_store
+from services.tracking import get_tracker_registry
 
-# Lazy-load YOLO model to avoid crash if ultralytics/network unavailable
-_yolo_model = None
+# ============================================================
+# Detector backends
+# ============================================================
+# SPATIAL_DETECTOR_BACKEND selects the engine:
+#   ultralytics  PyTorch YOLOv8 via ultralytics (default)
+#   onnx         exported ONNX model on onnxruntime (CPU)
+#   openvino     exported ONNX model on onnxruntime's OpenVINO execution provider
+# SPATIAL_DETECTOR_MODEL overrides the model file; INT8-quantized ONNX models
+# (see scripts/export_detector.py) load through the onnx/openvino backends.
 
-def _get_yolo():
-    global _yolo_model
-    if _yolo_model is None:
+_EMPTY_BOXES = np.zeros((0, 4), dtype=np.float32)
+
+
+def _empty_detections():
+    return _EMPTY_BOXES, np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+
+class Detector:
+    """
+    Detector backend interface.
+    `detect_batch` takes decoded BGR frames and returns, per frame, a tuple of
+    (xyxy float32 (N,4) in pixel coordinates, confidence float32 (N,), class int64 (N,)).
+    """
+
+    backend = "base"
+    names: dict = {}
+
+    def detect_batch(self, images: list, classes=None, conf: float = 0.25, max_det: int = 300, imgsz: int = 640):
+        raise NotImplementedError
+
+
+class UltralyticsDetector(Detector):
+    backend = "ultralytics"
+
+    def __init__(self, model_path: str):
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.model_path = model_path
+
+    def detect_batch(self, images: list, classes=None, conf: float = 0.25, max_det: int = 300, imgsz: int = 640):
+        results = self.model.predict(
+            images, verbose=False, classes=classes, conf=conf, max_det=max_det, imgsz=imgsz
+        )
+        out = []
+        for r in results:
+            boxes = r.boxes
+            if boxes is None or len(boxes) == 0:
+                out.append(_empty_detections())
+                continue
+            out.append((
+                boxes.xyxy.cpu().numpy().astype(np.float32),
+                boxes.conf.cpu().numpy().astype(np.float32),
+                boxes.cls.cpu().numpy().astype(np.int64),
+            ))
+        return out
+
+
+def _letterbox(img: np.ndarray, size: int):
+    """Resize keeping aspect ratio and pad to size x size (ultralytics convention)."""
+    h, w = img.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR) if (new_w, new_h) != (w, h) else img
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    bottom, right = size - new_h - top, size - new_w - left
+    padded = cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return padded, ratio, left, top
+
+
+def _nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy NMS over xyxy boxes; returns kept indices in descending score order."""
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class OnnxDetector(Detector):
+    """YOLOv8 ONNX export (fp32 or INT8-quantized) on onnxruntime."""
+
+    backend = "onnx"
+
+    def __init__(self, model_path: str, providers=None, intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 iou_threshold: float = 0.45):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads > 0:
+            options.inter_op_num_threads = inter_op_threads
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        available = set(ort.get_available_providers())
+        providers = [p for p in (providers or ["CPUExecutionProvider"]) if p in available] or ["CPUExecutionProvider"]
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+        self.providers = self.session.get_providers()
+        self.model_path = model_path
+        self.iou_threshold = iou_threshold
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim = model_input.shape[0]
+        # Static exports only take batch 1; dynamic ones take the whole batch.
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+        size_dim = model_input.shape[2]
+        self.input_size = size_dim if isinstance(size_dim, int) else None
+
+        meta = self.session.get_modelmeta().custom_metadata_map or {}
         try:
-            from ultralytics import YOLO
-            # Prefer higher-accuracy medium model; fallback to nano for reliability.
-            model_path = "yolov8m.pt" if os.path.exists("yolov8m.pt") else "yolov8n.pt"
-            _yolo_model = YOLO(model_path)
-            print(f"✅ YOLO model loaded ({model_path}).")
+            import ast
+            self.names = {int(k): v for k, v in ast.literal_eval(meta.get("names", "{}")).items()}
+        except Exception:
+            self.names = {}
+
+    def _postprocess(self, pred: np.ndarray, ratio: float, pad_x: int, pad_y: int, shape,
+                     classes, conf: float, max_det: int):
+        # YOLOv8 head: (4 + num_classes, anchors) → (anchors, 4 + num_classes)
+        pred = pred.T
+        scores = pred[:, 4:]
+        cls = scores.argmax(axis=1)
+        confs = scores[np.arange(len(scores)), cls]
+        mask = confs >= conf
+        if classes:
+            mask &= np.isin(cls, classes)
+        if not mask.any():
+            return _empty_detections()
+        xywh, confs, cls = pred[mask, :4], confs[mask], cls[mask]
+
+        xyxy = np.empty_like(xywh)
+        xyxy[:, 0] = xywh[:, 0] - xywh[:, 2] / 2
+        xyxy[:, 1] = xywh[:, 1] - xywh[:, 3] / 2
+        xyxy[:, 2] = xywh[:, 0] + xywh[:, 2] / 2
+        xyxy[:, 3] = xywh[:, 1] + xywh[:, 3] / 2
+
+        # Class-aware NMS by offsetting boxes per class.
+        offsets = cls[:, None].astype(np.float32) * 4096.0
+        keep = _nms(xyxy + offsets, confs, self.iou_threshold)[:max_det]
+        xyxy, confs, cls = xyxy[keep], confs[keep], cls[keep]
+
+        xyxy -= np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)
+        xyxy /= ratio
+        h, w = shape[:2]
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h)
+        return xyxy.astype(np.float32), confs.astype(np.float32), cls.astype(np.int64)
+
+    def detect_batch(self, images: list, classes=None, conf: float = 0.25, max_det: int = 300, imgsz: int = 640):
+        size = self.input_size or imgsz
+        prepared = [_letterbox(img, size) for img in images]
+        blob = np.stack([p[0] for p in prepared])[..., ::-1].transpose(0, 3, 1, 2)
+        blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+
+        chunk = self.fixed_batch or len(images)
+        preds = []
+        for start in range(0, len(images), chunk):
+            preds.extend(self.session.run(None, {self.input_name: blob[start:start + chunk]})[0])
+
+        return [
+            self._postprocess(pred, ratio, pad_x, pad_y, img.shape, classes, conf, max_det)
+            for pred, img, (_, ratio, pad_x, pad_y) in zip(preds, images, prepared)
+        ]
+
+
+class OpenVinoDetector(OnnxDetector):
+    """ONNX model on onnxruntime's OpenVINO execution provider (falls back to CPU EP)."""
+
+    backend = "openvino"
+
+    def __init__(self, model_path: str, **kwargs):
+        super().__init__(model_path, providers=["OpenVINOExecutionProvider", "CPUExecutionProvider"], **kwargs)
+
+
+DETECTOR_BACKENDS = {
+    "ultralytics": UltralyticsDetector,
+    "onnx": OnnxDetector,
+    "openvino": OpenVinoDetector,
+}
+
+
+def create_detector(backend: str = None, model_path: str = None) -> Detector:
+    """Build a detector backend from arguments or SPATIAL_DETECTOR_* env vars."""
+    backend = (backend or os.getenv("SPATIAL_DETECTOR_BACKEND", "ultralytics")).strip().lower()
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}' (expected one of {sorted(DETECTOR_BACKENDS)})")
+    model_path = model_path or os.getenv("SPATIAL_DETECTOR_MODEL")
+
+    if backend == "ultralytics":
+        # Prefer higher-accuracy medium model; fallback to nano for reliability.
+        model_path = model_path or ("yolov8m.pt" if os.path.exists("yolov8m.pt") else "yolov8n.pt")
+        return UltralyticsDetector(model_path)
+
+    return DETECTOR_BACKENDS[backend](
+        model_path or "yolov8n.onnx",
+        intra_op_threads=int(os.getenv("SPATIAL_ORT_INTRA_OP_THREADS", "0")),
+        inter_op_threads=int(os.getenv("SPATIAL_ORT_INTER_OP_THREADS", "0")),
+    )
+
+
+# Lazy-load the detector to avoid crash if ultralytics/onnxruntime/network unavailable
+_detector = None
+
+def _get_detector():
+    global _detector
+    if _detector is None:
+        try:
+            _detector = create_detector()
+            print(f"✅ Detector loaded ({_detector.backend}: {_detector.model_path}).")
         except Exception as e:
-            print(f"⚠️ YOLO not available: {e}. Detection will return empty results.")
-    return _yolo_model
+            print(f"⚠️ Detector not available: {e}. Detection will return empty results.")
+    return _detector
 
 
 def _get_target_classes():
@@ -42,162 +260,384 @@ def _get_target_classes():
             continue
     return ids or [0, 24, 26, 28, 39, 41, 56, 57, 58, 59, 60, 62, 63, 64, 65, 66, 67, 73, 74]
 
+class Frame:
+    """
+    A camera frame shared across pipeline stages.
+    Holds the original JPEG bytes and decodes them at most once, on first access
+    to `array`, so detection, cropping and annotation reuse the same ndarray.
+    """
+
+    __slots__ = ("data", "_array", "_decoded")
+
+    def __init__(self, data, array: np.ndarray = None):
+        self.data = data
+        self._array = array
+        self._decoded = array is not None
+
+    @property
+    def array(self):
+        if not self._decoded:
+            self._decoded = True
+            nparr = np.frombuffer(self.data, np.uint8)
+            self._array = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        return self._array
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._decoded
+
+    def looks_like_jpeg(self) -> bool:
+        return bytes(self.data[:2]) == b"\xff\xd8"
+
+
+def as_frame(image) -> Frame:
+    """Wrap raw JPEG bytes (or a memoryview) in a Frame; pass Frames through."""
+    return image if isinstance(image, Frame) else Frame(image)
+
+
+def _detect_kwargs():
+    # Stable demo default: constrained but configurable class whitelist.
+    return {
+        "classes": _get_target_classes(),
+        "conf": float(os.getenv("SPATIAL_DETECT_CONF", "0.35")),
+        "max_det": int(os.getenv("SPATIAL_MAX_DETECTIONS", "30")),
+        "imgsz": int(os.getenv("SPATIAL_MODEL_IMGSZ", "640")),
+    }
+
+
+class InferenceScheduler:
+    """
+    Central detection scheduler shared by all probes.
+
+    Callers block in `detect()` while a single scheduler thread collects frames
+    for up to SPATIAL_INFER_MAX_WAIT_MS (or until SPATIAL_INFER_MAX_BATCH frames
+    are waiting) and runs them through one batched `Detector.detect_batch` call.
+    The detector is only ever entered from this thread. Every future in a batch
+    is resolved even if the batch fails, and callers give up after
+    SPATIAL_INFER_TIMEOUT_SEC, so a broken batch can't hang the probes.
+
+    Track IDs come from the per-stream trackers in services/tracking.py.
+    Frames submitted with `detect_and_track` are associated on this thread
+    right after their batch, in frame order, so two frames of one stream can
+    never reach their tracker in the wrong order because of which caller
+    thread happened to wake first.
+    """
+
+    def __init__(self, max_batch: int = None, max_wait_ms: float = None):
+        self.max_batch = max(1, max_batch or int(os.getenv("SPATIAL_INFER_MAX_BATCH", "8")))
+        self.max_wait = float(
+            max_wait_ms if max_wait_ms is not None else os.getenv("SPATIAL_INFER_MAX_WAIT_MS", "10")
+        ) / 1000.0
+        # Generous: the first batch may include loading the model.
+        self.timeout = float(os.getenv("SPATIAL_INFER_TIMEOUT_SEC", "60"))
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.frames = 0
+        self.batch_sizes = defaultdict(int)
+        self.avg_latency_ms = 0.0
+        self.avg_inference_ms = 0.0
+        self.failed_batches = 0
+
+    def detect(self, img: np.ndarray):
+        """Run detection for one decoded frame; returns its (xyxy, conf, cls) arrays."""
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((time.perf_counter(), img, future, None, None))
+        return future.result(timeout=self.timeout)
+
+    def detect_and_track(self, img: np.ndarray, stream_id: str, order: Optional[float] = None):
+        """Detection plus track association for `stream_id`; returns (xyxy, conf, cls, track_ids).
+
+        `order` (e.g. the frame's receive time) orders frames of the stream.
+        """
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((time.perf_counter(), img, future, stream_id, order))
+        return future.result(timeout=self.timeout)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="spatial-infer-scheduler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._execute(batch)
+            except Exception as e:
+                print(f"⚠️ Inference batch bookkeeping failed: {e}")
+
+    def _execute(self, batch):
+        started = time.perf_counter()
+        try:
+            self._run_batch(batch)
+        except Exception as e:
+            self.failed_batches += 1
+            print(f"⚠️ Inference batch of {len(batch)} failed: {e}")
+            for req in batch:
+                if not req[2].done():
+                    req[2].set_exception(e)
+        finished = time.perf_counter()
+        self._record(batch, started, finished)
+
+    def _run_batch(self, batch):
+        detector = _get_detector()
+        results = detector.detect_batch([req[1] for req in batch], **_detect_kwargs())
+        if len(results) != len(batch):
+            raise RuntimeError(f"detector returned {len(results)} results for {len(batch)} frames")
+
+        # Associate tracked frames oldest first; the others resolve as detected.
+        tracked = sorted(
+            (i for i, req in enumerate(batch) if req[3] is not None),
+            key=lambda i: (batch[i][4] is None, batch[i][4] or 0.0, i),
+        )
+        for i in tracked:
+            req = batch[i]
+            try:
+                xyxy, confs, classes = results[i]
+                track_ids = get_tracker_registry().update(req[3], xyxy, confs, classes, order=req[4])
+            except Exception as e:
+                req[2].set_exception(e)
+                continue
+            req[2].set_result((xyxy, confs, classes, track_ids))
+        for req, result in zip(batch, results):
+            if req[3] is None:
+                req[2].set_result(result)
+
+    def _record(self, batch, started: float, finished: float, alpha: float = 0.2):
+        self.batches += 1
+        self.frames += len(batch)
+        self.batch_sizes[len(batch)] += 1
+        inference_ms = (finished - started) * 1000.0 / len(batch)
+        for req in batch:
+            latency_ms = (finished - req[0]) * 1000.0
+            if self.frames == len(batch):
+                self.avg_latency_ms = latency_ms
+            else:
+                self.avg_latency_ms += alpha * (latency_ms - self.avg_latency_ms)
+        if self.batches == 1:
+            self.avg_inference_ms = inference_ms
+        else:
+            self.avg_inference_ms += alpha * (inference_ms - self.avg_inference_ms)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": round(self.max_wait * 1000.0, 2),
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "frames": self.frames,
+            "failed_batches": self.failed_batches,
+            "avg_batch": round(self.frames / self.batches, 2) if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "avg_frame_latency_ms": round(self.avg_latency_ms, 2),
+            "avg_inference_ms_per_frame": round(self.avg_inference_ms, 2),
+        }
+
+
+_scheduler = None
+
+
+def get_inference_scheduler() -> InferenceScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = InferenceScheduler()
+    return _scheduler
+
+
+class Detections:
+    """
+    Columnar detections for one frame.
+    Boxes, scores, track IDs and 3D positions stay as arrays through the
+    pipeline; `to_dicts()` produces the per-object dicts used by scan records,
+    dashboard messages and the REST API.
+    """
+
+    __slots__ = ("xyxy", "confidence", "track_id", "position", "labels", "frame_path",
+                 "gemini_name", "gemini_details")
+
+    def __init__(self, xyxy, confidence, track_id, position, labels, frame_path: str = ""):
+        self.xyxy = xyxy
+        self.confidence = confidence
+        self.track_id = track_id
+        self.position = position
+        self.labels = labels
+        self.frame_path = frame_path
+        self.gemini_name = [None] * len(labels)
+        self.gemini_details = [None] * len(labels)
+
+    @classmethod
+    def empty(cls, frame_path: str = ""):
+        return cls(
+            np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32),
+            np.zeros(0, dtype=np.int64), np.zeros((0, 3), dtype=np.float64), [], frame_path,
+        )
+
+    def __len__(self):
+        return len(self.labels)
+
+    def bboxes(self) -> list:
+        """Integer [x1, y1, x2, y2] per detection."""
+        return self.xyxy.astype(np.int64).tolist()
+
+    def to_dicts(self) -> list:
+        boxes = self.bboxes()
+        confs = self.confidence.tolist()
+        tids = self.track_id.tolist()
+        positions = self.position.tolist()
+        out = []
+        for i, label in enumerate(self.labels):
+            x, y, z = positions[i]
+            det = {
+                "label": label,
+                "confidence": confs[i],
+                "track_id": tids[i],
+                "bbox": boxes[i],
+                "position_3d": {"x": x, "y": y, "z": z},
+                "frame_path": self.frame_path,
+            }
+            if self.gemini_name[i] is not None:
+                det["gemini_name"] = self.gemini_name[i]
+                det["gemini_details"] = self.gemini_details[i]
+            out.append(det)
+        return out
+
+
+def back_project(xyxy: np.ndarray, img_w: int, img_h: int, center_depth: float, pose: np.ndarray) -> np.ndarray:
+    """
+    Box centers → world XYZ for all boxes at once, assuming every object sits at
+    `center_depth` in front of a pinhole camera (fx = fy = 1.5 * width).
+    Returns an (N, 3) array.
+    """
+    n = len(xyxy)
+    xyxy = np.asarray(xyxy, dtype=np.float64)
+    fx = img_w * 1.5
+    fy = fx
+    cx = img_w / 2
+    cy = img_h / 2
+
+    p_cam = np.empty((n, 4), dtype=np.float64)
+    p_cam[:, 0] = ((xyxy[:, 0] + xyxy[:, 2]) / 2 - cx) * center_depth / fx
+    p_cam[:, 1] = -((xyxy[:, 1] + xyxy[:, 3]) / 2 - cy) * center_depth / fy
+    p_cam[:, 2] = -center_depth
+    p_cam[:, 3] = 1.0
+    return (p_cam @ pose.T)[:, :3]
+
+
 def process_frame(
-    image_bytes: bytes, 
+    image, 
     center_depth: float, 
-    pose_str: str,
+    pose: np.ndarray,
     scan_id: str,
     run_detection: bool = True,
-    return_frame_path: bool = False
+    return_frame_path: bool = False,
+    keep_frame: bool = False,
+    stream_id: str = None,
+    columnar: bool = False,
+    frame_order: Optional[float] = None,
 ):
     """
-    Process a single frame:
-    1. Save raw image
-    2. Detect objects (YOLO)
-    3. Calculate 3D coordinates for each object
-    4. Return list of detected objects
+    Process a single frame (a Frame or raw JPEG bytes):
+    1. Detect objects (YOLO)
+    2. Calculate 3D coordinates for each object
+    3. Hand the raw image to the write-behind frame store
+    4. Return detected objects: a list of dicts, or a `Detections` if `columnar`
+    The frame store's retention policy decides whether the frame is kept;
+    `keep_frame=True` overrides it. Dropped frames get an empty frame_path.
+    `pose` is the 4x4 camera-to-world matrix (see services.pose).
+    Track IDs come from the tracker of `stream_id` (defaults to the scan_id);
+    use one stream per probe/scan so concurrent probes do not share track state.
+    `frame_order` (e.g. receive time) keeps association in frame order when
+    several threads process frames of the same stream.
     """
-    
-    # 1. Decode & Save Image
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    
-    if frame is None:
-        return []
-    
-    frame_filename = f"frame_{uuid.uuid4().hex[:8]}.jpg"
-    save_dir = f"data/frames/{scan_id}"
-    os.makedirs(save_dir, exist_ok=True)
-    frame_path = os.path.join(save_dir, frame_filename)
-    cv2.imwrite(frame_path, frame)
-    
-    img_h, img_w, _ = frame.shape
-    
-    # 2. Parse Pose Matrix (4x4 flattened -> 4x4 numpy)
-    pose = np.eye(4)
-    try:
-        values = [float(x) for x in pose_str.split(",")]
-        if len(values) == 16:
-            pose = np.array(values).reshape(4, 4).T
-    except:
-        print("Warning: Failed to parse pose matrix, using identity.")
+    frame = as_frame(image)
+    store = get_frame_store()
 
-    # 3. Detect Objects
+    def _result(detections: Detections):
+        out = detections if columnar else detections.to_dicts()
+        return (out, detections.frame_path) if return_frame_path else out
+
+    # Stride-skipped frames are only persisted, so they are never decoded.
     if not run_detection:
-        return ([], frame_path) if return_frame_path else []
-
-    model = _get_yolo()
-    if model is None:
-        # No YOLO: return a dummy detection with the saved frame path
-        detections = [{
-            "label": "unprocessed_frame",
-            "confidence": 0.0,
-            "bbox": [0, 0, img_w, img_h],
-            "position_3d": {"x": 0.0, "y": 0.0, "z": float(center_depth)},
-            "frame_path": frame_path
-        }]
-        return (detections, frame_path) if return_frame_path else detections
+        if not frame.looks_like_jpeg():
+            return _result(Detections.empty())
+        return _result(Detections.empty(store.save(scan_id, frame.data, labels=None, force=keep_frame)))
+
+    # Decode (no-op if the pipeline already decoded this Frame)
+    img = frame.array
+    if img is None:
+        return _result(Detections.empty())
+
+    img_h, img_w, _ = img.shape
+    
+    # 3. Detect Objects
+    detector = _get_detector()
+    if detector is None:
+        # No detector: return a dummy detection with the saved frame path
+        frame_path = store.save(scan_id, frame.data, labels=["unprocessed_frame"], force=keep_frame)
+        return _result(Detections(
+            np.array([[0, 0, img_w, img_h]], dtype=np.float32),
+            np.zeros(1, dtype=np.float32),
+            np.full(1, -1, dtype=np.int64),
+            np.array([[0.0, 0.0, float(center_depth)]]),
+            ["unprocessed_frame"],
+            frame_path,
+        ))
     
-    # Stable demo default: constrained but configurable class whitelist.
-    target_classes = _get_target_classes()
-    detect_conf = float(os.getenv("SPATIAL_DETECT_CONF", "0.35"))
-    max_det = int(os.getenv("SPATIAL_MAX_DETECTIONS", "30"))
-    imgsz = int(os.getenv("SPATIAL_MODEL_IMGSZ", "640"))
     use_tracking = os.getenv("SPATIAL_USE_TRACKING", "1").strip().lower() not in {"0", "false", "no"}
-
-    # Use TRACKING to get stable IDs (persist=True)
-    # This aligns with the "Persistence Buffer" architecture.
-    try:
-        if use_tracking:
-            results = model.track(
-                frame,
-                persist=True,
-                verbose=False,
-                classes=target_classes,
-                tracker="bytetrack.yaml",
-                conf=detect_conf,
-                max_det=max_det,
-                imgsz=imgsz
-            )
-        else:
-            results = model(
-                frame,
-                verbose=False,
-                classes=target_classes,
-                conf=detect_conf,
-                max_det=max_det,
-                imgsz=imgsz
-            )
-    except Exception as e:
-        # Fallback if tracking fails (e.g. tracker config missing)
-        print(f"Tracking failed, falling back to predict: {e}")
-        results = model(
-            frame,
-            verbose=False,
-            classes=target_classes,
-            conf=detect_conf,
-            max_det=max_det,
-            imgsz=imgsz
+    # Stable IDs from this stream's own tracker ("Persistence Buffer" architecture),
+    # associated on the scheduler thread in frame order.
+    # Track ID is -1 for low-confidence detections without a track.
+    if use_tracking:
+        xyxy, confs, classes, track_ids = get_inference_scheduler().detect_and_track(
+            img, stream_id or scan_id, frame_order
         )
+    else:
+        xyxy, confs, classes = get_inference_scheduler().detect(img)
+        track_ids = np.full(len(xyxy), -1, dtype=np.int64)
 
-    detections = []
-    
-    for r in results:
-        boxes = r.boxes
-        if boxes is None:
-            continue
-            
-        for box in boxes:
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            confidence = float(box.conf[0])
-            cls = int(box.cls[0])
-            label = model.names[cls]
-            
-            # Get Track ID (might be None if tracking unsure)
-            track_id = int(box.id[0]) if (box.id is not None) else -1
-            
-            u = (x1 + x2) / 2
-            v = (y1 + y2) / 2
-            
-            fx = img_w * 1.5 
-            fy = fx
-            cx = img_w / 2
-            cy = img_h / 2
-            
-            Zc = -center_depth
-            Xc = (u - cx) * center_depth / fx
-            Yc = -(v - cy) * center_depth / fy
-            
-            P_cam = np.array([Xc, Yc, Zc, 1.0])
-            P_world = pose @ P_cam
-            
-            detections.append({
-                "label": label,
-                "confidence": confidence,
-                "track_id": track_id,  # NEW
-                "bbox": [int(x1), int(y1), int(x2), int(y2)],
-                "position_3d": {
-                    "x": float(P_world[0]),
-                    "y": float(P_world[1]),
-                    "z": float(P_world[2])
-                },
-                "frame_path": frame_path
-            })
-            
-    return (detections, frame_path) if return_frame_path else detections
-
-
-def crop_detections(image_bytes: bytes, detections: list, min_size: int = 32):
-    """Crop each detected object from the frame. Returns list of JPEG bytes per detection."""
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    names = detector.names
+    labels = [names.get(c, str(c)) for c in classes.tolist()]
+    positions = back_project(xyxy, img_w, img_h, center_depth, pose)
+
+    # Original JPEG bytes are written verbatim, off this thread.
+    frame_path = store.save(scan_id, frame.data, labels=labels, force=keep_frame)
+    return _result(Detections(xyxy, confs, track_ids, positions, labels, frame_path))
+
+
+def crop_detections(image, detections, min_size: int = 32):
+    """
+    Crop each detected object from the frame (detections as a `Detections` or a
+    list of dicts). Returns list of JPEG bytes per detection.
+    """
+    frame = as_frame(image).array
     if frame is None:
         return [None] * len(detections)
 
+    if isinstance(detections, Detections):
+        bboxes = detections.bboxes()
+    else:
+        bboxes = [d.get("bbox", [0, 0, 0, 0]) for d in detections]
+
     img_h, img_w = frame.shape[:2]
     crops = []
-    for d in detections:
-        bbox = d.get("bbox", [0, 0, 0, 0])
+    for bbox in bboxes:
         x1, y1, x2, y2 = bbox
         # Pad 10% for context
         pad_x = int((x2 - x1) * 0.1)
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.answer_cache import AnswerCache  # noqa: E402
+from services.llm import GeminiClient  # noqa: E402
+
+
+class _Models:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, model, contents):
+        self.prompts.append(contents)
+        return type("Response", (), {"text": "On the desk."})()
+
+
+def _client():
+    client = GeminiClient.__new__(GeminiClient)
+    client.flash_model = "test"
+    client.client = type("Client", (), {"models": _Models()})()
+    return client
+
+
+def test_answer_prompt_depends_only_on_query_and_results():
+    client = _client()
+    results = [{"description": "white mug", "metadata": {"scan_id": "a", "timestamp": 1700000000.0}}]
+    client.answer_spatial_query("where is the mug?", results)
+    time.sleep(1.1)
+    client.answer_spatial_query("where is the mug?", results)
+    first, second = client.client.models.prompts
+    assert first == second
+    assert "Current Time" not in first
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_hits_need_the_same_question_results_and_generation():
+    cache = AnswerCache(capacity=8, ttl=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"answer": f"answer {len(calls)}"}
+
+    async def main():
+        key = AnswerCache.key("Where is the mug?", ["e1", "e2"], "a", 3)
+        first = await cache.get_or_compute(key, compute)
+        # Case, spacing and trailing punctuation don't change the question.
+        again = await cache.get_or_compute(AnswerCache.key("  where is the MUG ", ["e1", "e2"], "a", 3), compute)
+        # New observations for the scan (next generation) or other results miss.
+        newer = await cache.get_or_compute(AnswerCache.key("where is the mug", ["e1", "e2"], "a", 4), compute)
+        other = await cache.get_or_compute(AnswerCache.key("where is the mug", ["e2"], "a", 4), compute)
+        return first, again, newer, other
+
+    first, again, newer, other = _run(main())
+    assert first == ({"answer": "answer 1"}, "miss")
+    assert again == ({"answer": "answer 1"}, "hit")
+    assert newer[1] == other[1] == "miss" and len(calls) == 3
+
+
+def test_concurrent_identical_queries_share_one_call():
+    cache = AnswerCache(capacity=8, ttl=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": "on the desk"}
+
+    async def main():
+        key = AnswerCache.key("where is the mug", ["e1"], None, 1)
+        return await asyncio.gather(*(cache.get_or_compute(key, compute) for _ in range(5)))
+
+    results = _run(main())
+    assert len(calls) == 1
+    assert sorted(status for _, status in results) == ["coalesced"] * 4 + ["miss"]
+    assert cache.stats()["inflight"] == 0
+
+
+def test_errors_are_shared_but_not_cached_and_entries_expire():
+    cache = AnswerCache(capacity=8, ttl=0.05)
+    key = AnswerCache.key("q", ["e1"], None, 1)
+
+    async def failing():
+        return {"error": "quota exceeded"}
+
+    async def ok():
+        return {"answer": "a"}
+
+    async def main():
+        assert (await cache.get_or_compute(key, failing))[1] == "miss"
+        assert (await cache.get_or_compute(key, ok))[1] == "miss"  # the error was not stored
+        assert (await cache.get_or_compute(key, ok))[1] == "hit"
+        await asyncio.sleep(0.06)
+        assert (await cache.get_or_compute(key, ok))[1] == "miss"
+
+    _run(main())
+
+
+def test_waiters_recompute_when_the_leader_is_cancelled():
+    cache = AnswerCache(capacity=8, ttl=60)
+    key = AnswerCache.key("q", ["e1"], None, 1)
+
+    async def slow():
+        await asyncio.sleep(10)
+        return {"answer": "never"}
+
+    async def fast():
+        return {"answer": "fresh"}
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_compute(key, slow))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_compute(key, fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter
+
+    assert _run(main()) == ({"answer": "fresh"}, "miss")
@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+msgpack = pytest.importorskip("msgpack")
+orjson = pytest.importorskip("orjson")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.dashboard_codec import encode, resolve_encoding  # noqa: E402
+
+MESSAGE = {
+    "type": "detection",
+    "scan_id": "a",
+    "frame_number": 7,
+    "objects": [
+        {"label": "cup", "yolo_label": "cup", "details": "white", "confidence": 0.9, "track_id": 3,
+         "bbox": [1, 2, 30, 40], "position": {"x": 0.5, "y": -0.25, "z": 1.5}},
+        {"label": "book", "yolo_label": "book", "details": "", "confidence": 0.6, "track_id": -1,
+         "bbox": [5, 6, 70, 80], "position": {"x": 1.0, "y": 0.0, "z": 2.0}},
+    ],
+    "state_vector": {
+        "cup:3": {"x": 0.5, "y": -0.25, "z": 1.5, "confidence": 0.9, "track_id": 3, "label": "cup", "yolo_label": "cup"},
+    },
+}
+
+
+def test_json_encodings_round_trip_the_same_document():
+    assert json.loads(encode(MESSAGE, "json")) == MESSAGE
+    payload = encode(MESSAGE, "orjson")
+    assert isinstance(payload, str)
+    assert orjson.loads(payload) == MESSAGE
+
+
+def test_msgpack_round_trips_through_the_columnar_layout():
+    payload = encode(MESSAGE, "msgpack")
+    assert isinstance(payload, bytes)
+    decoded = msgpack.unpackb(payload, raw=False)
+    assert decoded["layout"] == "columnar" and decoded["frame_number"] == 7
+
+    objects = decoded["objects"]
+    assert objects["label"] == ["cup", "book"]
+    assert np.frombuffer(objects["track_id"], "<i4").tolist() == [3, -1]
+    assert np.frombuffer(objects["bbox"], "<i4").reshape(-1, 4).tolist() == [[1, 2, 30, 40], [5, 6, 70, 80]]
+    assert np.allclose(np.frombuffer(objects["xyz"], "<f4").reshape(-1, 3), [[0.5, -0.25, 1.5], [1.0, 0.0, 2.0]])
+    assert np.allclose(np.frombuffer(objects["confidence"], "<f4"), [0.9, 0.6])
+
+    vectors = decoded["state_vector"]
+    assert vectors["keys"] == ["cup:3"]
+    assert np.allclose(np.frombuffer(vectors["xyz"], "<f4"), [0.5, -0.25, 1.5])
+
+
+def test_non_detection_messages_are_not_columnar_and_unknown_encodings_fall_back():
+    decoded = msgpack.unpackb(encode({"type": "system_reset", "log": "x"}, "msgpack"), raw=False)
+    assert decoded == {"type": "system_reset", "log": "x"}
+    assert resolve_encoding("msgpack") == "msgpack"
+    assert resolve_encoding("protobuf") == "json"
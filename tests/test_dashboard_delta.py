@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.dashboard_delta import DetectionDeltaEncoder, filter_min_confidence  # noqa: E402
+
+
+def _detection(vectors: dict, frame: int = 1) -> dict:
+    return {"type": "detection", "scan_id": "a", "source": "p", "frame_number": frame, "state_vector": vectors}
+
+
+def _vec(x: float, confidence: float = 0.9, label: str = "cup") -> dict:
+    return {"x": x, "y": 0.0, "z": 1.0, "confidence": confidence, "track_id": 1, "label": label, "yolo_label": label}
+
+
+def test_deltas_carry_only_changed_keys_and_chain_versions():
+    encoder = DetectionDeltaEncoder(epsilon=0.02, keyframe_interval=100, linger_sec=10.0)
+    kind, first = encoder.update(_detection({"cup": _vec(0.0), "mug": _vec(1.0)}), now=0.0)
+    assert kind == "delta" and (first["base"], first["version"]) == (0, 1)
+    assert set(first["upserts"]) == {"cup", "mug"}
+
+    # Jitter below epsilon is not resent; a real move is.
+    _, second = encoder.update(_detection({"cup": _vec(0.01), "mug": _vec(1.5)}, frame=2), now=0.1)
+    assert second["base"] == first["version"]
+    assert list(second["upserts"]) == ["mug"] and second["removed"] == []
+
+
+def test_objects_are_removed_after_linger_and_keyframes_are_periodic():
+    encoder = DetectionDeltaEncoder(keyframe_interval=3, linger_sec=1.0)
+    encoder.update(_detection({"cup": _vec(0.0), "mug": _vec(1.0)}), now=0.0)
+    _, delta = encoder.update(_detection({"cup": _vec(0.0)}), now=0.5)
+    assert delta["removed"] == []  # mug still lingers
+    kind, keyframe = encoder.update(_detection({"cup": _vec(0.0)}), now=2.0)
+    assert kind == "keyframe" and keyframe["type"] == "detection_keyframe"
+    assert set(keyframe["state_vector"]) == {"cup"} and keyframe["version"] == 3
+
+
+def test_keyframe_reflects_current_state_and_forget_resets_versions():
+    encoder = DetectionDeltaEncoder(keyframe_interval=100)
+    encoder.update(_detection({"cup": _vec(0.0)}), now=0.0)
+    encoder.update(_detection({"cup": _vec(2.0)}), now=0.1)
+    keyframe = json.loads(encoder.keyframe("a"))
+    assert keyframe["version"] == 2 and keyframe["state_vector"]["cup"]["x"] == 2.0
+    assert encoder.keyframe("a") is encoder.keyframe("a")  # serialized once per version and view
+
+    encoder.forget("a")
+    assert encoder.keyframe("a") is None
+    _, delta = encoder.update(_detection({"cup": _vec(2.0)}), now=0.2)
+    assert delta["base"] == 0 and "cup" in delta["upserts"]
+
+
+def test_min_confidence_filter_turns_weak_upserts_into_removals():
+    delta = {"type": "detection_delta", "upserts": {"cup": _vec(0.0, 0.9), "ghost": _vec(1.0, 0.2)}, "removed": []}
+    filtered = filter_min_confidence(delta, 0.5)
+    assert list(filtered["upserts"]) == ["cup"] and filtered["removed"] == ["ghost"]
+    assert "ghost" in delta["upserts"]  # the shared message is not modified
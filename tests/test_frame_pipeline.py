@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.frame_pipeline import FramePipeline  # noqa: E402
+
+
+class _Stream:
+    """Stands in for a probe's mailbox: the per-stream ordering key."""
+
+
+def _run_pipeline(jobs, slow_seqs=(), drop_seqs=(), fail_seqs=()):
+    """Push jobs through decode → enrich (2 workers, some slow) → ordered index; returns index order."""
+    indexed = []
+    finished = []
+
+    async def main():
+        pipeline = FramePipeline(io_workers=1, inference_workers=1)
+
+        async def decode(job):
+            if job["seq"] in drop_seqs:
+                return None
+            return job
+
+        async def enrich(job):
+            if job["seq"] in fail_seqs:
+                raise RuntimeError("enrich failed")
+            # A Gemini frame waits much longer than the frames behind it.
+            await asyncio.sleep(0.05 if job["seq"] in slow_seqs else 0.001)
+            return job
+
+        async def index(job):
+            indexed.append((job["stream_name"], job["seq"]))
+            return job
+
+        async def on_error(stage, job, error):
+            pass
+
+        pipeline.add_stage("decode", decode)
+        pipeline.add_stage("enrich", enrich, workers=2)
+        pipeline.add_stage("index", index, ordered=True)
+        pipeline.on_error = on_error
+        pipeline.on_done = lambda job: finished.append(job["seq"])
+        pipeline.sequence_of = lambda job: (job["stream"], job["seq"])
+        for job in jobs:
+            await pipeline.submit(job)
+        for _ in range(200):
+            if len(finished) == len(jobs):
+                break
+            await asyncio.sleep(0.01)
+        pipeline.shutdown()
+
+    asyncio.run(main())
+    return indexed
+
+
+def _jobs(stream, name, count):
+    return [{"stream": stream, "stream_name": name, "seq": seq} for seq in range(1, count + 1)]
+
+
+def test_ordered_stage_keeps_stream_order_when_enrich_finishes_out_of_order():
+    stream = _Stream()
+    indexed = _run_pipeline(_jobs(stream, "a", 6), slow_seqs={1, 4})
+    assert [seq for _, seq in indexed] == [1, 2, 3, 4, 5, 6]
+
+
+def test_dropped_and_failed_jobs_do_not_stall_later_frames():
+    stream = _Stream()
+    indexed = _run_pipeline(_jobs(stream, "a", 6), slow_seqs={1}, drop_seqs={2}, fail_seqs={4})
+    assert [seq for _, seq in indexed] == [1, 3, 5, 6]
+
+
+def test_streams_are_ordered_independently():
+    a, b = _Stream(), _Stream()
+    jobs = [job for pair in zip(_jobs(a, "a", 4), _jobs(b, "b", 4)) for job in pair]
+    indexed = _run_pipeline(jobs, slow_seqs={1})
+    for name in ("a", "b"):
+        assert [seq for stream_name, seq in indexed if stream_name == name] == [1, 2, 3, 4]
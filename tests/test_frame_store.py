@@ -0,0 +1,47 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.frame_store import FrameStore  # noqa: E402
+
+
+def test_unwritable_scan_directory_does_not_stop_the_writer(tmp_path):
+    blocker = tmp_path / "blocked"
+    blocker.write_text("not a directory")
+    store = FrameStore(root=str(tmp_path), retention="all", flush_interval=0.01)
+
+    bad = os.path.join(str(blocker), "frame_bad.jpg")  # makedirs fails: parent is a file
+    assert store.submit(bad, b"bad")
+    store.flush(timeout=5.0)
+    assert store.write_errors == 1
+    assert store.read(bad) is None  # released even though it was never written
+
+    good = store.save("scan", b"good")
+    store.flush(timeout=5.0)
+    assert store._writer.is_alive()
+    with open(good, "rb") as f:
+        assert f.read() == b"good"
+    assert store.read(good) is None
+
+
+def test_every_n_counts_concurrent_frames_exactly_and_forgets_finished_scans(tmp_path):
+    store = FrameStore(root=str(tmp_path), retention="every_n", keep_every=5)
+    kept = []
+
+    def worker():
+        for _ in range(500):
+            kept.append(store.should_keep("scan"))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(kept) == 2000 // 5
+
+    store.should_keep("other", labels=["cup"])
+    store.forget("scan")
+    assert "scan" not in store._frame_counts
+    store.reset()
+    assert not store._frame_counts and not store._last_keyframe
@@ -0,0 +1,45 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.lexical_index import BM25Index, match_where, reciprocal_rank_fusion  # noqa: E402
+
+
+def _index() -> BM25Index:
+    index = BM25Index()
+    index.upsert("mug", "white ceramic mug on the desk", {"scan_id": "a", "yolo_label": "cup", "confidence": 0.9})
+    index.upsert("bottle", "blue water bottle on the desk", {"scan_id": "a", "yolo_label": "bottle", "confidence": 0.4})
+    index.upsert("book", "red book on the shelf", {"scan_id": "b", "yolo_label": "book", "confidence": 0.8})
+    return index
+
+
+def test_rare_terms_outrank_common_ones():
+    ranked = _index().search("blue desk", 3)
+    assert [doc_id for doc_id, _ in ranked] == ["bottle", "mug"]
+    assert ranked[0][1] > ranked[1][1] > 0
+
+
+def test_yolo_label_is_searchable_and_filters_apply():
+    index = _index()
+    assert [doc_id for doc_id, _ in index.search("cup", 3)] == ["mug"]
+    assert [doc_id for doc_id, _ in index.search("on the", 3, {"scan_id": {"$eq": "b"}})] == ["book"]
+    where = {"$and": [{"scan_id": {"$eq": "a"}}, {"confidence": {"$gte": 0.5}}]}
+    assert [doc_id for doc_id, _ in index.search("desk", 3, where)] == ["mug"]
+    assert match_where({"yolo_label": "cup"}, {"yolo_label": {"$in": ["cup", "mug"]}})
+    assert not match_where({}, {"source": {"$eq": "rest"}})
+
+
+def test_upsert_replaces_a_document():
+    index = _index()
+    index.upsert("mug", "black mug in the kitchen", {"scan_id": "a", "yolo_label": "cup"})
+    assert index.search("white", 3) == []
+    assert [doc_id for doc_id, _ in index.search("kitchen", 3)] == ["mug"]
+    assert len(index) == 3
+
+
+def test_rrf_rewards_documents_ranked_well_by_both_lists():
+    vector = ["a", "b", "c", "d"]
+    lexical = ["c", "e", "a"]
+    fused = reciprocal_rank_fusion([vector, lexical], 3)
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b"]
+    assert abs(fused[0][1] - (1 / 61 + 1 / 63)) < 1e-12
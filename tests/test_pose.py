@@ -0,0 +1,23 @@
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.pose import _cached_pose, pose_from_orientation  # noqa: E402
+
+
+def test_non_finite_orientation_is_read_as_zero():
+    expected = pose_from_orientation(0.0, 10.0, 0.0)
+    for bad in (math.nan, math.inf, -math.inf):
+        pose = pose_from_orientation(bad, 10.0, 0.0)
+        assert np.isfinite(pose).all()
+        assert np.array_equal(pose, expected)
+
+
+def test_nearby_angles_share_one_cached_pose():
+    _cached_pose.cache_clear()
+    first = pose_from_orientation(10.01, 20.0, 30.0)
+    assert pose_from_orientation(10.02, 20.0, 30.0) is first
+    assert _cached_pose.cache_info().currsize == 1
@@ -0,0 +1,68 @@
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.position_index import PositionIndex  # noqa: E402
+
+
+def _pos(point) -> dict:
+    return {"x": float(point[0]), "y": float(point[1]), "z": float(point[2])}
+
+
+def _populated(count: int = 400, seed: int = 0):
+    points = np.random.default_rng(seed).uniform(-5.0, 5.0, size=(count, 3))
+    index = PositionIndex(cell=0.5)
+    for i, point in enumerate(points):
+        index.upsert(f"o{i}", "a", _pos(point))
+    index.upsert("elsewhere", "b", _pos((0.0, 0.0, 0.0)))
+    return index, points
+
+
+def _brute(points, center, radius=None, allowed=None):
+    hits = []
+    for i, point in enumerate(points):
+        if allowed is not None and f"o{i}" not in allowed:
+            continue
+        d = math.dist(point, center)
+        if radius is None or d <= radius:
+            hits.append((d, f"o{i}"))
+    return [object_id for _, object_id in sorted(hits)]
+
+
+def test_radius_queries_match_brute_force():
+    index, points = _populated()
+    for center, radius in (((0.1, 0.2, 0.3), 0.8), ((4.9, -4.9, 0.0), 2.0), ((0.0, 0.0, 0.0), 50.0)):
+        found = index.within("a", _pos(center), radius)
+        assert [object_id for object_id, _ in found] == _brute(points, center, radius)
+        assert all(distance <= radius for _, distance in found)
+    assert [object_id for object_id, _ in index.within("a", _pos((0, 0, 0)), 3.0, limit=5)] == _brute(
+        points, (0, 0, 0), 3.0
+    )[:5]
+
+
+def test_nearest_matches_brute_force_including_far_and_restricted_queries():
+    index, points = _populated()
+    for center in ((0.0, 0.0, 0.0), (40.0, 40.0, 40.0)):
+        assert [object_id for object_id, _ in index.nearest("a", _pos(center), 7)] == _brute(points, center)[:7]
+    allowed = {f"o{i}" for i in range(0, 400, 9)}
+    assert [object_id for object_id, _ in index.nearest("a", _pos((1, 1, 1)), 4, allowed=allowed)] == _brute(
+        points, (1, 1, 1), allowed=allowed
+    )[:4]
+    assert [object_id for object_id, _ in index.nearest("a", _pos((1, 1, 1)), 4, max_radius=0.6)] == _brute(
+        points, (1, 1, 1), 0.6
+    )[:4]
+
+
+def test_upsert_moves_objects_and_scans_are_separate():
+    index = PositionIndex(cell=0.5)
+    index.upsert("cup", "a", _pos((0.0, 0.0, 0.0)))
+    index.upsert("cup", "a", _pos((3.0, 0.0, 0.0)))
+    assert index.within("a", _pos((0.0, 0.0, 0.0)), 1.0) == []
+    assert [object_id for object_id, _ in index.within("a", _pos((3.1, 0.0, 0.0)), 0.5)] == ["cup"]
+    assert index.within("b", _pos((3.0, 0.0, 0.0)), 1.0) == []
+
+    index.upsert("cup", "a", {"x": "nan", "y": 0, "z": 0})  # no usable position: removed
+    assert len(index) == 0 and index.stats()["voxels"] == 0
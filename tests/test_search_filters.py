@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.spatial_memory import SpatialMemory  # noqa: E402
+from services.vector_store import ChromaStore, LocalVectorStore  # noqa: E402
+
+
+def test_build_where_combines_filters():
+    assert SpatialMemory.build_where() is None
+    assert SpatialMemory.build_where(scan_id="a") == {"scan_id": {"$eq": "a"}}
+    assert SpatialMemory.build_where(scan_id="a", since=10, yolo_label=["cup", "mug"], min_confidence=0.5) == {
+        "$and": [
+            {"scan_id": {"$eq": "a"}},
+            {"timestamp": {"$gte": 10.0}},
+            {"yolo_label": {"$in": ["cup", "mug"]}},
+            {"confidence": {"$gte": 0.5}},
+        ]
+    }
+
+
+@pytest.fixture(params=["faiss", "chroma"])
+def store(request, tmp_path):
+    if request.param == "chroma":
+        pytest.importorskip("chromadb")
+        return ChromaStore(str(tmp_path / "chroma"))
+    return LocalVectorStore(str(tmp_path / "vectors"), hnsw_min=50)
+
+
+def test_scan_filter_returns_k_hits_when_other_scans_dominate(store):
+    rng = np.random.default_rng(0)
+    query = np.ones(8, dtype=np.float32) / np.sqrt(8)
+    # 200 near-duplicates of the query in scan "big", 5 far-away rows in scan "small".
+    near = query + rng.normal(scale=0.01, size=(200, 8)).astype(np.float32)
+    far = -query + rng.normal(scale=0.01, size=(5, 8)).astype(np.float32)
+    store.upsert([f"big{i}" for i in range(200)], near, ["big"] * 200,
+                 [{"scan_id": "big", "timestamp": float(i), "confidence": 0.9} for i in range(200)])
+    store.upsert([f"small{i}" for i in range(5)], far, ["small"] * 5,
+                 [{"scan_id": "small", "timestamp": float(i), "confidence": 0.2 * i} for i in range(5)])
+
+    hits = store.query(query, 3, SpatialMemory.build_where(scan_id="small"))
+    assert len(hits) == 3 and all(hit[0].startswith("small") for hit in hits)
+
+    hits = store.query(query, 5, SpatialMemory.build_where(scan_id="small", min_confidence=0.5, until=3))
+    assert sorted(hit[0] for hit in hits) == ["small3"]
+    store.close()
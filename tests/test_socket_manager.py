@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import services.socket_manager as socket_manager  # noqa: E402
+from services.socket_manager import ConnectionManager  # noqa: E402
+
+
+class _Socket:
+    """A WebSocket whose sends either complete at once or hang (a stalled phone)."""
+
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.sent = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(message)
+
+    async def send_text(self, payload):
+        await self.send_json(json.loads(payload))
+
+    async def close(self, code=1000):
+        self.closed = True
+
+
+def test_stalled_probe_does_not_block_acks_to_other_probes(monkeypatch):
+    monkeypatch.setattr(socket_manager, "PROBE_SEND_TIMEOUT_SEC", 0.05)
+
+    async def main():
+        manager = ConnectionManager()
+        stalled, healthy = _Socket(stalled=True), _Socket()
+        await manager.connect_probe(stalled, "stalled")
+        await manager.connect_probe(healthy, "healthy")
+        for frame in range(1, 4):
+            await asyncio.wait_for(manager.send_to_probe("stalled", {"type": "ack", "frame": frame}), 0.01)
+            await asyncio.wait_for(manager.send_to_probe("healthy", {"type": "ack", "frame": frame}), 0.01)
+        await asyncio.sleep(0.2)
+        return manager, stalled, healthy
+
+    manager, stalled, healthy = asyncio.run(main())
+    assert [m["frame"] for m in healthy.sent] == [1, 2, 3]
+    assert stalled.closed and "stalled" not in manager.probes
+    assert manager.probes_dropped["send_timeout"] == 1
+
+
+def test_full_probe_queue_drops_oldest_ack_but_keeps_other_messages():
+    conn = socket_manager.ProbeConnection(_Socket(), "p", maxsize=3)
+    assert conn.enqueue({"type": "error", "message": "bad frame"})
+    for frame in range(1, 5):
+        assert conn.enqueue({"type": "ack", "frame": frame})
+    assert [m.get("frame") for m in conn.queue] == [None, 3, 4]
+    assert conn.dropped == 2
+    assert conn.enqueue({"type": "auth_ack"})
+    assert conn.enqueue({"type": "auth_ack"})
+    assert [m["type"] for m in conn.queue] == ["error", "auth_ack", "auth_ack"]
+    assert not conn.enqueue({"type": "error", "message": "no room left"})
+
+
+def _detection(scan_id: str, frame: int) -> dict:
+    return {"type": "detection", "scan_id": scan_id, "source": "p", "frame_number": frame,
+            "objects": [], "state_vector": {}}
+
+
+def test_broadcast_serializes_once_and_never_waits_on_a_stalled_dashboard(monkeypatch):
+    monkeypatch.setattr(socket_manager, "DASHBOARD_SEND_TIMEOUT_SEC", 0.05)
+    encodes = []
+    real_encode = socket_manager.encode
+    monkeypatch.setattr(socket_manager, "encode", lambda m, e="json": encodes.append(e) or real_encode(m, e))
+
+    async def main():
+        manager = ConnectionManager()
+        stalled, healthy = _Socket(stalled=True), _Socket()
+        await manager.connect_dashboard(stalled, "stalled")
+        await manager.connect_dashboard(healthy, "healthy")
+        for frame in range(1, 4):
+            await asyncio.wait_for(manager.broadcast_to_dashboards(_detection("a", frame)), 0.01)
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.2)
+        return manager, stalled, healthy
+
+    manager, stalled, healthy = asyncio.run(main())
+    assert [m["frame_number"] for m in healthy.sent] == [1, 2, 3]
+    assert len(encodes) == 3  # one serialization per broadcast, shared by both dashboards
+    assert "stalled" not in manager.dashboards and manager.evicted["send_timeout"] == 1
+
+
+def test_queued_detections_for_a_scan_coalesce_newest_wins():
+    conn = socket_manager.DashboardConnection(_Socket(), "d", maxsize=4)
+    conn.enqueue(("detection", "a"), "frame 1")
+    conn.enqueue(None, "scan_completed b")
+    conn.enqueue(("detection", "a"), "frame 2")
+    assert [payload for _, payload in conn.queue] == ["frame 2", "scan_completed b"]
+    assert conn.coalesced == 1
@@ -0,0 +1,116 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import services.tracking as tracking  # noqa: E402
+import services.video_processor as video_processor  # noqa: E402
+from services.tracking import TrackerRegistry  # noqa: E402
+
+
+def _frame(x: float):
+    """One confident 'class 0' box whose left edge is at x."""
+    return (
+        np.array([[x, 0.0, x + 100.0, 100.0]], dtype=np.float32),
+        np.array([0.9], dtype=np.float32),
+        np.array([0], dtype=np.int64),
+    )
+
+
+class _BoxDetector:
+    """Each 'image' is just the x position of the single box it contains."""
+
+    names = {0: "object"}
+
+    def detect_batch(self, images, **kwargs):
+        return [_frame(float(img)) for img in images]
+
+
+def test_scheduler_associates_a_batch_in_frame_order(monkeypatch):
+    registry = TrackerRegistry(ttl_sec=0)
+    seen = []
+    original = registry.update
+
+    def update(stream_id, xyxy, conf, cls, order=None):
+        seen.append(order)
+        return original(stream_id, xyxy, conf, cls, order=order)
+
+    registry.update = update
+    monkeypatch.setattr(tracking, "_registry", registry)
+    monkeypatch.setattr(video_processor, "_get_detector", lambda: _BoxDetector())
+    monkeypatch.setattr(video_processor, "_detect_kwargs", lambda: {})
+
+    scheduler = video_processor.InferenceScheduler(max_batch=8, max_wait_ms=0)
+    futures = []
+    # Frame 2 reached the scheduler before frame 1 (two detect workers racing).
+    for order, x in ((2.0, 10.0), (1.0, 0.0), (3.0, 20.0)):
+        future = video_processor.Future()
+        futures.append(future)
+        scheduler._queue.put((0.0, x, future, "probe:scan", order))
+    scheduler._execute([scheduler._queue.get() for _ in range(3)])
+
+    assert seen == [1.0, 2.0, 3.0]
+    track_ids = [int(f.result()[3][0]) for f in futures]
+    assert len(set(track_ids)) == 1  # one object, one track
+
+
+def test_late_frame_is_matched_without_changing_tracks():
+    registry = TrackerRegistry(ttl_sec=0)
+    first = registry.update("s", *_frame(0.0), order=1.0)
+    second = registry.update("s", *_frame(300.0), order=3.0)  # a different object appears
+    # Frame 2 arrives after frame 3: it still gets the existing id ...
+    late = registry.update("s", *_frame(5.0), order=2.0)
+    assert int(late[0]) == int(first[0])
+    # ... but doesn't start tracks or move the track's box.
+    stray = registry.update("s", *_frame(600.0), order=2.5)
+    assert int(stray[0]) == -1
+    assert registry.late_frames == 2
+    tracker = registry._trackers["s"]
+    assert sorted(tracker.track_ids.tolist()) == sorted([int(first[0]), int(second[0])])
+    assert tracker.boxes[tracker.track_ids.tolist().index(int(first[0]))][0] == 0.0
+
+
+class _FlakyDetector(_BoxDetector):
+    """Raises on the first batch, then behaves."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect_batch(self, images, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("model crashed")
+        return super().detect_batch(images, **kwargs)
+
+
+def test_failed_batch_fails_its_callers_and_the_scheduler_keeps_running(monkeypatch):
+    monkeypatch.setattr(tracking, "_registry", TrackerRegistry(ttl_sec=0))
+    monkeypatch.setattr(video_processor, "_get_detector", lambda: detector)
+    monkeypatch.setattr(video_processor, "_detect_kwargs", lambda: {})
+    detector = _FlakyDetector()
+    scheduler = video_processor.InferenceScheduler(max_batch=8, max_wait_ms=0)
+    scheduler.timeout = 5.0
+
+    with pytest.raises(RuntimeError, match="model crashed"):
+        scheduler.detect(0.0)
+    xyxy, _, _, track_ids = scheduler.detect_and_track(10.0, "probe:scan", 1.0)
+    assert xyxy[0][0] == 10.0 and int(track_ids[0]) >= 0
+    assert scheduler.stats()["failed_batches"] == 1
+
+
+def test_bad_detect_config_does_not_kill_the_scheduler_thread(monkeypatch):
+    def broken_kwargs():
+        raise ValueError("SPATIAL_DETECT_CONF is not a number")
+
+    monkeypatch.setattr(video_processor, "_get_detector", lambda: _BoxDetector())
+    monkeypatch.setattr(video_processor, "_detect_kwargs", broken_kwargs)
+    scheduler = video_processor.InferenceScheduler(max_batch=8, max_wait_ms=0)
+    scheduler.timeout = 5.0
+
+    with pytest.raises(ValueError):
+        scheduler.detect(0.0)
+    assert scheduler._thread.is_alive()
+    monkeypatch.setattr(video_processor, "_detect_kwargs", lambda: {})
+    assert scheduler.detect(20.0)[0][0][0] == 20.0
@@ -0,0 +1,109 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.vector_store import LocalVectorStore, create_vector_store  # noqa: E402
+
+
+def _vectors(count: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _fill(store: LocalVectorStore, vectors: np.ndarray):
+    ids = [f"id{i}" for i in range(len(vectors))]
+    store.upsert(ids, vectors, [f"doc {i}" for i in ids], [{"scan_id": "a", "timestamp": float(i)} for i in range(len(ids))])
+
+
+def test_upserted_entity_is_found_by_its_new_vector_after_restart(tmp_path):
+    root = str(tmp_path / "vectors")
+    store = LocalVectorStore(root, hnsw_min=50, snapshot_rows=10**6, snapshot_sec=10**6)
+    vectors = _vectors(100)
+    _fill(store, vectors)
+    assert store.stats()["index"] == "hnsw"
+
+    moved = vectors[57]  # id1 now looks exactly like id57 did
+    store.upsert(["id57"], _vectors(1, seed=1), ["doc id57"], [{"scan_id": "a"}])
+    store.upsert(["id1"], moved[None, :], ["doc id1 merged"], [{"scan_id": "a"}])
+    assert store.query(moved, 1)[0][0] == "id1"
+    store.close()
+
+    reopened = LocalVectorStore(root, hnsw_min=50, snapshot_rows=10**6, snapshot_sec=10**6)
+    assert reopened.stats()["stale_index_rows"] == 2
+    hit = reopened.query(moved, 1)[0]
+    assert hit[0] == "id1" and hit[1] == "doc id1 merged"
+    reopened.close()
+
+
+def test_store_is_not_opened_with_several_workers(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert create_vector_store("faiss", str(tmp_path / "vectors")) is None
+
+
+def test_second_process_cannot_open_the_same_store_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.delenv("SPATIAL_WORKERS", raising=False)
+    root = str(tmp_path / "vectors")
+    owner = create_vector_store("faiss", root)
+    assert owner is not None
+    other = subprocess.run(
+        [sys.executable, "-c", "import sys; from services.vector_store import create_vector_store; "
+         f"sys.exit(0 if create_vector_store('faiss', {root!r}) is None else 1)"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+    )
+    assert other.returncode == 0
+    owner.close()
+
+
+def test_upsert_overwrites_in_place_and_reload_replays_the_log_tail(tmp_path):
+    root = str(tmp_path / "vectors")
+    store = LocalVectorStore(root, snapshot_rows=10**6, snapshot_sec=10**6)
+    vectors = _vectors(10)
+    _fill(store, vectors)
+    store.snapshot()
+    # Written after the snapshot: only in the log and the vector file.
+    store.upsert(["id3", "id10"], _vectors(2, seed=2), ["doc id3 v2", "doc id10"], [{"scan_id": "b"}, {"scan_id": "b"}])
+    assert store.count() == 11
+    assert store.get_by_ids(["id3"])[0][1] == "doc id3 v2"
+    store._vectors.flush()
+    store._log.flush()
+    del store  # no close(): the tail must come back from the log
+
+    reopened = LocalVectorStore(root, snapshot_rows=10**6, snapshot_sec=10**6)
+    assert reopened.count() == 11
+    assert reopened.stats()["unsnapshotted_writes"] == 2
+    assert [row[0] for row in reopened.get(0, 100, {"scan_id": {"$eq": "b"}})] == ["id3", "id10"]
+    assert reopened.query(vectors[5], 1)[0][:2] == ("id5", "doc id5")
+    reopened.close()
+
+
+def test_torn_final_log_line_is_dropped_on_reload(tmp_path):
+    root = str(tmp_path / "vectors")
+    store = LocalVectorStore(root)
+    _fill(store, _vectors(4))
+    store.close()
+    with open(os.path.join(root, "metadata.jsonl"), "ab") as f:
+        f.write(b'["id9", "half a wri')
+
+    reopened = LocalVectorStore(root)
+    assert reopened.count() == 4
+    reopened.upsert(["id4"], _vectors(1, seed=3), ["doc id4"], [{"scan_id": "a"}])
+    assert reopened.get_by_ids(["id4"])[0][1] == "doc id4"
+    reopened.close()
+
+
+def test_index_and_brute_force_agree(tmp_path):
+    vectors = _vectors(300)
+    exact = LocalVectorStore(str(tmp_path / "exact"), hnsw_min=10**6)
+    indexed = LocalVectorStore(str(tmp_path / "indexed"), hnsw_min=50)
+    for store in (exact, indexed):
+        _fill(store, vectors)
+    assert (exact.stats()["index"], indexed.stats()["index"]) == ("flat", "hnsw")
+    for row in (0, 123, 299):
+        assert exact.query(vectors[row], 1)[0][0] == indexed.query(vectors[row], 1)[0][0] == f"id{row}"
+    exact.close()
+    indexed.close()